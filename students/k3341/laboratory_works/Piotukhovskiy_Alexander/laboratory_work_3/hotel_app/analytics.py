@@ -0,0 +1,157 @@
+"""
+Загрузка и выручка за произвольный период: доля проданных ночей (occupancy), средняя цена проданной ночи (ADR)
+и выручка на доступную ночь (RevPAR) по дням, неделям или месяцам, по всем номерам или по типам. Считаются
+по таблице проданных ночей RoomNight, а не по броням: ночи не нужно разворачивать при каждом запросе.
+Таблицу обновляют сигналы бронирований и массовые пути (см. refresh_room_nights).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Reservation, Room, RoomType, RoomNight
+
+NIGHTS_BATCH_SIZE = 500
+BUCKETS = ['day', 'week', 'month']
+# Модели, от которых зависит закэшированная сводка (см. hotel_app.cache)
+ANALYTICS_CACHE_MODELS = [Reservation, Room, RoomType]
+
+
+def _stay_expressions():
+    # Число ночей брони и дата ночи с номером n в диалекте СУБД
+    if connection.vendor == 'sqlite':
+        return "CAST(julianday(departure) - julianday(arrival) AS INTEGER)", "date(arrival, '+' || n || ' days')"
+    return "departure - arrival", "arrival + n"
+
+
+def expand_stays(reservations):
+    """
+    Вставляет ночи броней одним INSERT ... SELECT: рекурсивный CTE даёт номера ночей от 0 до самого длинного
+    проживания, и соединение с ним разворачивает брони в ночи внутри базы. Итоговая цена делится поровну,
+    остаток от деления достаётся первым ночам, поэтому сумма ночей брони равна final_price.
+    """
+    stays = reservations.exclude(status='CANCELLED').filter(departure_date__gt=F('arrival_date')).values(
+        stay=F('id'), stay_room=F('room_id'), arrival=F('arrival_date'), departure=F('departure_date'),
+        total=F('final_price'),
+    ).order_by()
+    sql, params = stays.query.sql_with_params()
+    nights, night_date = _stay_expressions()
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(RoomNight._meta.get_field(name).column)
+                        for name in ('reservation', 'room', 'date', 'price'))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(RoomNight._meta.db_table)} ({columns}) '
+            f'WITH RECURSIVE stays AS (SELECT base.*, {nights} AS nights FROM ({sql}) base), '
+            f'offsets (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM offsets '
+            f'WHERE n + 1 < (SELECT MAX(nights) FROM stays)) '
+            f'SELECT stay, stay_room, {night_date}, total / nights + CASE WHEN n < total %% nights THEN 1 ELSE 0 END '
+            f'FROM stays JOIN offsets ON n < nights',
+            params,
+        )
+        return cursor.rowcount
+
+
+def refresh_room_nights(reservation_ids):
+    # Пересобирает ночи указанных броней; удалённые брони удаляют свои ночи каскадно
+    reservation_ids = sorted(set(reservation_ids))
+    with transaction.atomic():
+        for start in range(0, len(reservation_ids), NIGHTS_BATCH_SIZE):
+            batch = reservation_ids[start:start + NIGHTS_BATCH_SIZE]
+            RoomNight.objects.filter(reservation_id__in=batch).delete()
+            expand_stays(Reservation.objects.filter(pk__in=batch))
+
+
+def rebuild_room_nights():
+    with transaction.atomic():
+        RoomNight.objects.all().delete()
+        return expand_stays(Reservation.objects.all())
+
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_periods(start_date, end_date, bucket):
+    # Периоды сводки: дни, недели с понедельника или календарные месяцы, обрезанные границами диапазона
+    periods = []
+    day = start_date
+    while day <= end_date:
+        following = bucket_start(day, bucket) + timedelta(days={'day': 1, 'week': 7, 'month': 32}[bucket])
+        following = bucket_start(following, bucket)
+        periods.append((day, min(following - timedelta(days=1), end_date)))
+        day = following
+    return periods
+
+
+def stay_metrics(sold, revenue, available):
+    return {
+        "nights_available": available,
+        "nights_sold": sold,
+        "revenue": revenue,
+        "occupancy": round(sold / available, 4) if available else None,
+        "adr": round(revenue / sold, 2) if sold else None,
+        "revpar": round(revenue / available, 2) if available else None,
+    }
+
+
+def occupancy_report(start_date, end_date, bucket='day', room_type=None, by_room_type=False):
+    """
+    Сводка за [start_date, end_date] включительно: один агрегирующий запрос по индексу ночей и один подсчёт
+    номеров. Доступные ночи - число номеров на число дней периода: номера считаются по текущему фонду.
+    """
+    nights = RoomNight.objects.filter(date__gte=start_date, date__lte=end_date)
+    rooms = Room.objects.all()
+    if room_type is not None:
+        nights = nights.filter(room__type_id=room_type)
+        rooms = rooms.filter(type_id=room_type)
+
+    # Группировка по дате, а не по началу недели или месяца: усечение дат в SQLite - функция Python на каждую
+    # строку, а дат в периоде немного, и они сворачиваются в периоды здесь
+    group = ['date', 'room__type_id'] if by_room_type else ['date']
+    sold = defaultdict(lambda: [0, 0])
+    for row in nights.values(*group).annotate(nights=Count('date'), revenue=Sum('price')).order_by():
+        cell = sold[(bucket_start(row['date'], bucket), *(row[key] for key in group[1:]))]
+        cell[0] += row['nights']
+        cell[1] += row['revenue']
+
+    room_counts = dict(rooms.values_list('type_id').annotate(count=Count('id')).order_by())
+    if by_room_type:
+        types = sorted(room_counts.keys() | {key[1] for key in sold})
+        segments = [((type_id,), room_counts.get(type_id, 0)) for type_id in types]
+    else:
+        segments = [((), sum(room_counts.values()))]
+
+    periods = []
+    totals = defaultdict(lambda: [0, 0, 0])
+    for period_start, period_end in bucket_periods(start_date, end_date, bucket):
+        days = (period_end - period_start).days + 1
+        for segment, room_count in segments:
+            nights_sold, revenue = sold.get((bucket_start(period_start, bucket), *segment), (0, 0))
+            row = {"start_date": period_start, "end_date": period_end}
+            if by_room_type:
+                row["room_type"] = segment[0]
+            row.update(stay_metrics(nights_sold, revenue, room_count * days))
+            periods.append(row)
+            total = totals[segment]
+            total[0] += nights_sold
+            total[1] += revenue
+            total[2] += room_count * days
+
+    summary = []
+    for segment, _ in segments:
+        row = {"room_type": segment[0]} if by_room_type else {}
+        row.update(stay_metrics(*totals[segment]))
+        summary.append(row)
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "bucket": bucket,
+        "periods": periods,
+        "total": summary if by_room_type else summary[0],
+    }
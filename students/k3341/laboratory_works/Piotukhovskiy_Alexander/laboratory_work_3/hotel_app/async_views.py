@@ -0,0 +1,283 @@
+"""
+Асинхронные варианты читающих эндпоинтов для запуска под ASGI (/hotel/async/...).
+
+DRF 3.15 не поддерживает асинхронные представления, поэтому это обычные async-представления Django:
+аутентификация и формат JSON берутся из настроек DRF, параметры и ответы совпадают с синхронными
+эндпоинтами (без курсорной пагинации и потоковой выдачи). Лента изменений (events, events/stream)
+есть только здесь: ожидание событий не занимает поток воркера.
+"""
+import asyncio
+import time as clock
+from datetime import datetime, time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseBase, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import changefeed
+from .cache import acached
+from .changefeed import last_event_id, read_feed, sse_message
+from .conditional import request_params, set_validators, validators
+from .models import Client, Room
+from .reports import quarter_date_range, quarter_cells, floor_room_counts, build_quarterly_report
+from .throttling import throttle_wait
+from .serializers import ClientSerializer, RoomSerializer, ClientStayOverlapSerializer, QuarterlyReportSerializer, \
+    ChangeFeedSerializer, OutboxEventSerializer
+from .views import CLIENT_LIST_CACHE_MODELS, ROOM_LIST_CACHE_MODELS, QuarterlyReportView, client_search_params, \
+    parse_room_statuses
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def _authenticate(request, view):
+    authenticators = [authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    drf_request = Request(request, authenticators=authenticators)
+    try:
+        user = drf_request.user
+    except exceptions.AuthenticationFailed as error:
+        return error, authenticators
+    if not user or not user.is_authenticated:
+        return exceptions.NotAuthenticated(), authenticators
+    request.user = user
+
+    wait = throttle_wait(drf_request, view)
+    if wait is not None:
+        return exceptions.Throttled(wait), authenticators
+    return None, authenticators
+
+
+def async_api_view(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response({"detail": f'Метод "{request.method}" не разрешен.'}, status=405)
+
+        # Проверка токена не зависит от остального кода запроса: отдельный поток не ждёт общий поток ORM
+        error, authenticators = await sync_to_async(_in_own_connection, thread_sensitive=False)(
+            _authenticate, request, wrapper)
+        if isinstance(error, exceptions.Throttled):
+            response = json_response({"detail": error.detail}, status=error.status_code)
+            response['Retry-After'] = str(error.wait)
+            return response
+        if error is not None:
+            response = json_response({"detail": error.detail}, status=401)
+            response['WWW-Authenticate'] = authenticators[0].authenticate_header(request)
+            return response
+
+        result = await view(request, *args, **kwargs)
+        if isinstance(result, HttpResponseBase):
+            return result
+        data, status = result
+        return json_response(data, status=status)
+
+    return wrapper
+
+
+def conditional(models):
+    # Условный GET (см. hotel_app.conditional). Ставится под async_api_view: 304 отдаётся только
+    # после аутентификации и ограничения частоты
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            etag, last_modified = await sync_to_async(_in_own_connection, thread_sensitive=False)(
+                validators, models, request_params(request.GET))
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                data, status = await view(request, *args, **kwargs)
+                response = json_response(data, status=status)
+            return set_validators(response, etag, last_modified)
+
+        return wrapper
+
+    return decorator
+
+
+def _in_own_connection(func, *args):
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_concurrently(*calls):
+    """
+    Выполняет независимые запросы параллельно, каждый в отдельном потоке со своим соединением с базой.
+    Обычные async-методы ORM выполняются по очереди в одном общем потоке.
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_in_own_connection, thread_sensitive=False)(func, *args) for func, *args in calls
+    ))
+
+
+@async_api_view
+async def clients_list(request):
+    queryset = Client.objects.search(**client_search_params(request.GET))
+
+    async def compute():
+        return ClientSerializer([client async for client in queryset], many=True).data
+
+    clients = await acached('clients-list', CLIENT_LIST_CACHE_MODELS, client_search_params(request.GET), compute)
+    if not clients:
+        return {"detail": "Не найдено ни одного клиента по заданным фильтрам.", "count": 0, "clients": []}, 404
+    return {"count": len(clients), "clients": clients}, 200
+
+
+@async_api_view
+@conditional(ROOM_LIST_CACHE_MODELS)
+async def rooms_by_status(request):
+    status_list, error = parse_room_statuses(request.GET.get('status', None))
+    if error:
+        return error, 422
+
+    queryset = Room.objects.with_current_state()
+    if status_list is not None:
+        queryset = queryset.filter(status__in=status_list)
+
+    async def compute():
+        return RoomSerializer([room async for room in queryset], many=True).data
+
+    rooms = await acached('rooms-by-status', ROOM_LIST_CACHE_MODELS, status_list, compute)
+    return {"count": len(rooms), "rooms": rooms}, 200
+
+
+@async_api_view
+async def client_stay_overlap(request):
+    serializer = ClientStayOverlapSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return serializer.errors, 422
+
+    client_id = serializer.validated_data['client_id']
+    if not await Client.objects.filter(id=client_id).aexists():
+        return {"detail": f"Клиент с id {client_id} не найден."}, 404
+
+    clients = [
+        client async for client in Client.objects.overlapping_with(
+            client_id,
+            serializer.validated_data.get('start_date'),
+            serializer.validated_data.get('end_date'),
+        ).order_by('id')
+    ]
+    return {"count": len(clients), "clients": ClientSerializer(clients, many=True).data}, 200
+
+
+@async_api_view
+async def quarterly_report(request):
+    serializer = QuarterlyReportSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return serializer.errors, 422
+
+    quarter = serializer.validated_data['quarter']
+    year = serializer.validated_data['year']
+    cells, floors = await run_concurrently((quarter_cells, quarter, year), (floor_room_counts,))
+
+    start_date, end_date = quarter_date_range(quarter, year)
+    report = build_quarterly_report(cells, floors)
+    report["start_date"] = datetime.combine(start_date, time())
+    report["end_date"] = datetime.combine(end_date, time())
+    return report, 200
+
+
+quarterly_report.throttle_cost = QuarterlyReportView.throttle_cost
+
+
+class EventPoll:
+    """
+    Общий для процесса опрос MAX(id) outbox: сколько бы клиентов ни ждало ленту, база опрашивается
+    не чаще раза в POLL_INTERVAL.
+    """
+
+    def __init__(self):
+        self.last_id = 0
+        self.checked_at = None
+
+    async def current(self):
+        now = clock.monotonic()
+        if self.checked_at is None or now - self.checked_at >= changefeed.POLL_INTERVAL:
+            # Отметка ставится до запроса: параллельные ожидающие не повторяют его
+            self.checked_at = now
+            self.last_id = await sync_to_async(_in_own_connection, thread_sensitive=False)(last_event_id)
+        return self.last_id
+
+
+EVENT_POLL = EventPoll()
+
+
+async def wait_for_events(after, topics, limit, timeout):
+    """
+    Возвращает (события, курсор): события после after, как только они есть, или пустой список через
+    timeout секунд. Курсор сдвигается и через события других тем, чтобы не просматривать их снова, но не
+    дальше края changefeed.settled_event_id: пока край отстаёт от MAX(id), он пересчитывается на каждом опросе.
+    """
+    deadline = clock.monotonic() + timeout
+    cursor = after
+    # Первая проверка не ждёт общего опроса: уже записанные события отдаются сразу
+    last_id = await sync_to_async(_in_own_connection, thread_sensitive=False)(last_event_id)
+    while True:
+        if last_id > cursor:
+            events, cursor = await sync_to_async(_in_own_connection, thread_sensitive=False)(
+                read_feed, cursor, topics, limit)
+            if events:
+                return events, cursor
+        remaining = deadline - clock.monotonic()
+        if remaining <= 0:
+            return [], cursor
+        await asyncio.sleep(min(changefeed.POLL_INTERVAL, remaining))
+        last_id = await EVENT_POLL.current()
+
+
+async def event_stream(after, topics):
+    renderer = JSONRenderer()
+    yield sse_message(retry=changefeed.STREAM_RETRY, comment='hotel events')
+    cursor = sent = after
+    deadline = clock.monotonic() + changefeed.STREAM_DURATION
+    while (remaining := deadline - clock.monotonic()) > 0:
+        events, cursor = await wait_for_events(cursor, topics, changefeed.STREAM_BATCH,
+                                               min(changefeed.HEARTBEAT, remaining))
+        if events:
+            yield b''.join(sse_message(renderer.render(event), event_id=event['id'], event=event['topic'])
+                           for event in OutboxEventSerializer(events, many=True).data)
+        else:
+            # Сообщение без data не доставляется, но id в нём сдвигает Last-Event-ID переподключения
+            yield sse_message(comment='ping', event_id=cursor if cursor != sent else None)
+        sent = cursor
+
+
+@async_api_view
+async def change_feed(request):
+    # Long-poll: тот же ответ, что у /hotel/events, но при отсутствии событий запрос ждёт до wait секунд
+    serializer = ChangeFeedSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return serializer.errors, 422
+
+    params = serializer.validated_data
+    events, last_id = await wait_for_events(params['after'], params.get('topic'), params['limit'], params['wait'])
+    return {"last_id": last_id, "events": OutboxEventSerializer(events, many=True).data}, 200
+
+
+@async_api_view
+async def change_stream(request):
+    # Server-Sent Events: событие outbox - сообщение с id, event (тема) и data (как в /hotel/events)
+    serializer = ChangeFeedSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return serializer.errors, 422
+
+    after = serializer.validated_data['after']
+    # При переподключении EventSource передаёт id последнего полученного сообщения
+    last_event = request.headers.get('Last-Event-ID', '')
+    if last_event.isdigit():
+        after = int(last_event)
+
+    response = StreamingHttpResponse(event_stream(after, serializer.validated_data.get('topic')),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не буферизует поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
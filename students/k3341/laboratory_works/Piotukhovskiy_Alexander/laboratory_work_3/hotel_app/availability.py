@@ -0,0 +1,59 @@
+from django.db import connection
+from django.db.models import Exists, F, OuterRef
+
+from .models import Reservation, Room
+
+# Брони в этих статусах занимают номер на свои даты
+BLOCKING_STATUSES = ['BOOKED', 'CONFIRMED', 'CHECKED_IN']
+
+
+def overlapping_reservations(arrival_date, departure_date, room=None):
+    # Полуинтервалы [arrival, departure) пересекаются, если каждый начинается раньше конца другого
+    reservations = Reservation.objects.filter(
+        status__in=BLOCKING_STATUSES,
+        arrival_date__lt=departure_date,
+        departure_date__gt=arrival_date,
+    )
+    if room is not None:
+        reservations = reservations.filter(room=room)
+    return reservations
+
+
+def is_room_free(room, arrival_date, departure_date, exclude_reservation=None):
+    reservations = overlapping_reservations(arrival_date, departure_date, room)
+    if exclude_reservation is not None:
+        reservations = reservations.exclude(pk=exclude_reservation.pk)
+    return not reservations.exists()
+
+
+def lock_room(room):
+    """
+    Блокирует строку номера до конца текущей транзакции, чтобы параллельные брони
+    одного номера проверялись и записывались по очереди.
+    """
+    if connection.features.has_select_for_update:
+        return Room.objects.select_for_update().get(pk=room.pk)
+
+    # SQLite не поддерживает SELECT ... FOR UPDATE: холостой UPDATE сразу берёт блокировку на запись.
+    # updated_at переписывается сам в себя, чтобы блокировка не выглядела изменением комнаты
+    Room.objects.filter(pk=room.pk).update(updated_at=F('updated_at'))
+    return Room.objects.get(pk=room.pk)
+
+
+def lock_rooms(room_numbers):
+    # То же для нескольких номеров сразу; строки блокируются в порядке pk, чтобы пакеты не ждали друг друга по кругу
+    rooms = Room.objects.filter(number__in=room_numbers).order_by('pk')
+    if connection.features.has_select_for_update:
+        rooms = rooms.select_for_update()
+    else:
+        Room.objects.filter(number__in=room_numbers).update(updated_at=F('updated_at'))
+    return {room.number: room for room in rooms}
+
+
+def free_rooms(arrival_date, departure_date, room_type_id=None):
+    rooms = Room.objects.exclude(status='MAINTENANCE').exclude(
+        Exists(overlapping_reservations(arrival_date, departure_date).filter(room=OuterRef('pk')))
+    )
+    if room_type_id is not None:
+        rooms = rooms.filter(type_id=room_type_id)
+    return rooms.select_related('type').order_by('number')
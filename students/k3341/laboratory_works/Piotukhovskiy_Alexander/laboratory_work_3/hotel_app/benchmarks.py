@@ -0,0 +1,1018 @@
+import asyncio
+import io
+import random
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections, transaction, DatabaseError
+from django.db.models import Q
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.throttling import UserRateThrottle
+
+from .analytics import bucket_start, occupancy_report, rebuild_room_nights
+from .bulk import BULK_ENTITIES, parse_csv, import_rows
+from .changefeed import last_event_id
+from .cleaning import CLEANER_POSITION, active_cleaner_contracts, build_plan, plan_cleaning
+from .fastpath import FastJSONRenderer
+from .models import RoomType, RoomPriceHistory, Room, Client, Reservation, Employee, EmployeePosition, \
+    EmploymentContract, CleaningSchedule
+from .pricing import get_price_periods, price_stay, quote_stay
+from .views import RoomsByStatusView, ClientsListView, EmployeeViewSet, ReservationManagementView, \
+    BatchReservationView, QuarterlyReportView, ReservationViewSet, RoomViewSet, OutboxEventsView, \
+    EmployeeRosterView
+from .seeding import HotelDataGenerator
+from .serializers import ClientSerializer, CleaningScheduleSerializer, CLIENT_VALUES, CLEANING_SCHEDULE_VALUES
+from .state import transition_rooms
+from .throttling import ClientRateThrottle, EndpointRateThrottle
+from .reports import quarter_date_range, rebuild_quarterly_report, read_quarterly_report, live_quarterly_report
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+@contextmanager
+def scratch_data():
+    # Всё, что создаёт бенчмарк, откатывается и не попадает в рабочую базу
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "repeat": len(timings),
+        "min_ms": round(timings[0] * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+    }
+
+
+def seed_reservations(reservations_count, rooms_count=200, clients_count=10000, first_day=date(2023, 1, 1),
+                      days=730, batch_size=10000):
+    rng = random.Random(42)
+    admin = User.objects.create_user(username=f'benchmark-{time.monotonic_ns()}')
+    room_type = RoomType.objects.create(name=f'benchmark-{time.monotonic_ns()}', capacity=2)
+    max_number = Room.objects.order_by('-number').values_list('number', flat=True).first() or 0
+    rooms = Room.objects.bulk_create(
+        Room(number=max_number + 1 + i, type=room_type, phone='0000000000') for i in range(rooms_count)
+    )
+    clients = Client.objects.bulk_create(
+        Client(passport_number=f'BM{i:08d}', first_name='Иван', last_name='Иванов', city_from='Москва')
+        for i in range(clients_count)
+    )
+
+    statuses = [choice[0] for choice in Reservation.STATUS_CHOICES]
+    payment_statuses = [choice[0] for choice in Reservation.PAYMENT_STATUS_CHOICES]
+    batch = []
+    for _ in range(reservations_count):
+        arrival_date = first_day + timedelta(days=rng.randrange(days))
+        price = rng.randrange(1000, 20000)
+        batch.append(Reservation(
+            room=rng.choice(rooms),
+            client=rng.choice(clients),
+            admin=admin,
+            arrival_date=arrival_date,
+            departure_date=arrival_date + timedelta(days=rng.randint(1, 14)),
+            status=rng.choice(statuses),
+            payment_status=rng.choice(payment_statuses),
+            price_at_booking=price,
+            final_price=price,
+        ))
+        if len(batch) == batch_size:
+            Reservation.objects.bulk_create(batch)
+            batch = []
+    Reservation.objects.bulk_create(batch)
+    return rooms, clients
+
+
+def _legacy_total_price(room_type_id, arrival_date, departure_date):
+    # Прежний алгоритм: перебор всех периодов на каждую ночь
+    total_price = 0
+    current_date = arrival_date
+    price_history = RoomPriceHistory.objects.filter(room_type_id=room_type_id).order_by('start_date')
+
+    while current_date < departure_date:
+        for price_period in price_history:
+            if price_period.start_date <= current_date and (
+                    price_period.end_date is None or price_period.end_date >= current_date):
+                total_price += price_period.price
+                break
+        current_date += timedelta(days=1)
+    return total_price
+
+
+@benchmark('pricing')
+def bench_pricing(repeat=20, scale=1):
+    results = []
+    period_days = 3
+
+    with scratch_data():
+        for periods_count in (100, 1000, 5000 * scale):
+            room_type = RoomType.objects.create(name=f'benchmark-{periods_count}', capacity=1)
+            first_day = date(2000, 1, 1)
+            RoomPriceHistory.objects.bulk_create(
+                RoomPriceHistory(
+                    room_type=room_type,
+                    start_date=first_day + timedelta(days=i * period_days),
+                    end_date=first_day + timedelta(days=i * period_days + period_days - 1),
+                    price=1000 + i % 500,
+                )
+                for i in range(periods_count)
+            )
+            arrival_date = first_day + timedelta(days=periods_count * period_days // 2)
+
+            for nights in (1, 30, 365):
+                departure_date = arrival_date + timedelta(days=nights)
+                quote = quote_stay(room_type.id, arrival_date, departure_date)
+                legacy_total = _legacy_total_price(room_type.id, arrival_date, departure_date)
+                assert quote.total == legacy_total, (quote.total, legacy_total)
+
+                results.append({
+                    "case": f"periods={periods_count} nights={nights}",
+                    "engine": measure(lambda: quote_stay(room_type.id, arrival_date, departure_date), repeat),
+                    # Без тарифов в памяти: периоды проживания читаются из базы на каждый расчёт
+                    "query": measure(lambda: price_stay(get_price_periods(room_type.id, arrival_date, departure_date),
+                                                        arrival_date, departure_date), repeat),
+                    "legacy": measure(
+                        lambda: _legacy_total_price(room_type.id, arrival_date, departure_date),
+                        max(1, repeat // 10)
+                    ),
+                })
+
+    return results
+
+
+@benchmark('quarterly_report')
+def bench_quarterly_report(repeat=20, scale=1):
+    reservations_count = 100000 * scale
+    quarter, year = 2, 2024
+
+    with scratch_data():
+        seed_reservations(reservations_count)
+
+        started = time.perf_counter()
+        cells = rebuild_quarterly_report()
+        rebuild_ms = round((time.perf_counter() - started) * 1000, 3)
+
+        start_date, end_date = quarter_date_range(quarter, year)
+        return [{
+            "case": f"reservations={reservations_count} cells={cells} rebuild={rebuild_ms} ms",
+            "materialized": measure(lambda: read_quarterly_report(quarter, year), repeat),
+            "live": measure(lambda: live_quarterly_report(start_date, end_date), repeat),
+        }]
+
+
+def _legacy_occupancy(start_date, end_date, bucket):
+    # Расчёт без таблицы ночей: каждая бронь, пересекающая период, разворачивается в ночи в Python
+    sold = defaultdict(lambda: [0, 0])
+    stays = Reservation.objects.exclude(status='CANCELLED').filter(
+        arrival_date__lte=end_date, departure_date__gt=start_date,
+    ).values_list('arrival_date', 'departure_date', 'final_price')
+    for arrival_date, departure_date, price in stays:
+        nights = (departure_date - arrival_date).days
+        for night in range(nights):
+            day = arrival_date + timedelta(days=night)
+            if start_date <= day <= end_date:
+                cell = sold[bucket_start(day, bucket)]
+                cell[0] += 1
+                cell[1] += price // nights + (night < price % nights)
+    return sold
+
+
+@benchmark('occupancy')
+def bench_occupancy(repeat=20, scale=1):
+    reservations_count = 100000 * scale
+    results = []
+
+    with scratch_data():
+        seed_reservations(reservations_count)
+
+        started = time.perf_counter()
+        nights = rebuild_room_nights()
+        rebuild_seconds = time.perf_counter() - started
+        results.append({
+            "case": f"rebuild reservations={reservations_count} nights={nights}",
+            "rebuild": _with_rows_per_sec(summarize([rebuild_seconds]), nights),
+        })
+
+        for label, start_date, end_date, bucket in (
+            ('year by month', date(2023, 1, 1), date(2023, 12, 31), 'month'),
+            ('quarter by day', date(2024, 4, 1), date(2024, 6, 30), 'day'),
+            ('two years by week', date(2023, 1, 2), date(2024, 12, 29), 'week'),
+        ):
+            total = occupancy_report(start_date, end_date, bucket)['total']
+            legacy_cells = _legacy_occupancy(start_date, end_date, bucket).values()
+            assert [total['nights_sold'], total['revenue']] == [sum(column) for column in zip(*legacy_cells)]
+            results.append({
+                "case": label,
+                "nights_table": measure(lambda: occupancy_report(start_date, end_date, bucket), repeat),
+                "by_room_type": measure(
+                    lambda: occupancy_report(start_date, end_date, bucket, by_room_type=True), repeat),
+                "legacy": measure(lambda: _legacy_occupancy(start_date, end_date, bucket), max(1, repeat // 5)),
+            })
+
+    return results
+
+
+def _legacy_overlapping_clients(client_id):
+    # Прежний алгоритм: OR по всем проживаниям клиента и отдельный COUNT
+    overlapping_filter = Q()
+    for reservation in Reservation.objects.filter(client_id=client_id):
+        overlapping_filter |= Q(arrival_date__lt=reservation.departure_date) & Q(
+            departure_date__gt=reservation.arrival_date)
+
+    overlapping_ids = Reservation.objects.filter(overlapping_filter).exclude(client_id=client_id).values_list(
+        'client_id', flat=True).distinct()
+    clients = Client.objects.filter(id__in=overlapping_ids)
+    return list(clients), clients.count()
+
+
+@benchmark('stay_overlap')
+def bench_stay_overlap(repeat=20, scale=1):
+    results = []
+
+    with scratch_data():
+        rooms, clients = seed_reservations(50000 * scale)
+        admin = User.objects.order_by('-id').first()
+
+        for stays in (10, 100, 500):
+            frequent_guest = Client.objects.create(passport_number=f'BF{stays:08d}', first_name='Иван',
+                                                   last_name='Иванов', city_from='Москва')
+            Reservation.objects.bulk_create(
+                Reservation(room=rooms[i % len(rooms)], client=frequent_guest, admin=admin,
+                            arrival_date=date(2023, 1, 1) + timedelta(days=i * 700 // stays),
+                            departure_date=date(2023, 1, 3) + timedelta(days=i * 700 // stays),
+                            price_at_booking=1000, final_price=1000)
+                for i in range(stays)
+            )
+
+            def engine():
+                return list(Client.objects.overlapping_with(frequent_guest.id).order_by('id'))
+
+            try:
+                # Огромный OR из прежнего алгоритма может не поместиться в ограничения СУБД
+                with transaction.atomic():
+                    legacy_ids = sorted(client.id for client in _legacy_overlapping_clients(frequent_guest.id)[0])
+                    legacy = measure(lambda: _legacy_overlapping_clients(frequent_guest.id), max(1, repeat // 5))
+            except DatabaseError as error:
+                legacy_ids, legacy = None, {"error": str(error)}
+
+            assert legacy_ids is None or [client.id for client in engine()] == legacy_ids
+            results.append({
+                "case": f"stays={stays}",
+                "engine": measure(engine, repeat),
+                "legacy": legacy,
+            })
+
+    return results
+
+
+def _legacy_client_search(room=None, start_date=None, end_date=None, city=None):
+    # Прежний поиск: отдельные подзапросы для комнаты и дат и city_from__icontains без индекса
+    queryset = Client.objects.all()
+    if room:
+        queryset = queryset.filter(id__in=Reservation.objects.filter(room__number=room).values('client_id'))
+    if start_date or end_date:
+        reservations = Reservation.objects.all()
+        if start_date:
+            reservations = reservations.filter(departure_date__gte=start_date)
+        if end_date:
+            reservations = reservations.filter(arrival_date__lte=end_date)
+        queryset = queryset.filter(id__in=reservations.values('client_id'))
+    if city:
+        queryset = queryset.filter(city_from__icontains=city)
+    return queryset
+
+
+# Целевое время поиска гостей на первую страницу, миллисекунд
+CLIENT_SEARCH_TARGET_MS = 50
+
+
+@benchmark('client_search')
+def bench_client_search(repeat=20, scale=1):
+    """
+    Поиск гостей /hotel/clients на базе в 200 000 клиентов (scale=5 - миллион): редкий город по началу
+    названия, номер комнаты, комната и даты одного проживания, даты. Замер - первые page_size строк,
+    как их читает страница списка, в сравнении с прежним поиском.
+    """
+    results = []
+    page_size = 50
+
+    with temporary_database():
+        HotelDataGenerator(rooms=500 * scale, clients=200000 * scale, reservations=60000 * scale,
+                           cleaners=5, cleaning_days=1).generate()
+        Client.objects.filter(id__in=Client.objects.order_by('id').values('id')[:20]).update(city_from='Тверь')
+        room, arrival_date = Reservation.objects.order_by('id').values_list('room__number', 'arrival_date').first()
+
+        cases = [
+            ('city=тверь', {'city': 'тверь'}),
+            ('city=моск', {'city': 'моск'}),
+            (f'room={room}', {'room': room}),
+            (f'room={room} dates', {'room': room, 'start_date': arrival_date,
+                                    'end_date': arrival_date + timedelta(days=30)}),
+            ('dates', {'start_date': arrival_date, 'end_date': arrival_date + timedelta(days=7)}),
+        ]
+        for label, params in cases:
+            def engine():
+                return list(Client.objects.search(**params).order_by('id').values_list('id', flat=True)[:page_size])
+
+            def legacy():
+                return list(_legacy_client_search(**params).order_by('id').values_list('id', flat=True)[:page_size])
+
+            # Результаты совпадают, кроме города (icontains в SQLite не различает регистр только для ASCII)
+            # и комнаты с датами (прежний поиск брал их из разных проживаний)
+            if 'city' not in params and not ('room' in params and 'start_date' in params):
+                assert engine() == legacy()
+            summary = measure(engine, repeat)
+            results.append({
+                "case": f"{label} target<{CLIENT_SEARCH_TARGET_MS}ms",
+                "engine": {**summary, "within_target": summary["p95_ms"] < CLIENT_SEARCH_TARGET_MS},
+                "legacy": measure(legacy, max(1, repeat // 5)),
+            })
+
+    return results
+
+
+@benchmark('bulk_import')
+def bench_bulk_import(repeat=20, scale=1):
+    rows_count = 100000 * scale
+    body = "passport_number,first_name,last_name,middle_name,city_from\n" + "".join(
+        f"BI{i:08d},Иван,Иванов,,Москва\n" for i in range(rows_count)
+    )
+    body = body.encode()
+
+    def run():
+        # Каждый замер в своей откатываемой транзакции: иначе со второго повтора строки только обновляются
+        with scratch_data():
+            report = import_rows(BULK_ENTITIES['clients'], parse_csv(io.BytesIO(body)))
+            assert report.error_count == 0 and report.created == rows_count, report.as_dict()
+
+    return [{
+        "case": f"clients csv rows={rows_count}",
+        "import": measure(run, max(1, repeat // 10)),
+    }]
+
+
+def call_view(view, path, user, params=None):
+    request = APIRequestFactory().get(path, params)
+    force_authenticate(request, user=user)
+    response = view(request)
+    response.render()
+    assert response.status_code == 200, response.status_code
+    return response
+
+
+@benchmark('read_cache')
+def bench_read_cache(repeat=20, scale=1):
+    results = []
+    with scratch_data():
+        seed_reservations(20000 * scale, rooms_count=300, clients_count=2000 * scale)
+        admin = User.objects.order_by('-id').first()
+        position = EmployeePosition.objects.create(name=f'benchmark-{time.monotonic_ns()}', salary=30000)
+        employees = Employee.objects.bulk_create(
+            Employee(passport_number=f'BE{i:08d}', first_name='Анна', last_name='Петрова')
+            for i in range(1000 * scale)
+        )
+        EmploymentContract.objects.bulk_create(
+            EmploymentContract(employee=employee, position=position, contract_type='PERMANENT',
+                               start_date=date(2024, 1, 1))
+            for employee in employees
+        )
+
+        cases = [
+            ("rooms", RoomsByStatusView.as_view(), '/hotel/rooms', None),
+            ("clients city=Москва", ClientsListView.as_view(), '/hotel/clients', {'city': 'Москва'}),
+            ("employees", EmployeeViewSet.as_view({'get': 'list'}), '/hotel/api/employees/', None),
+        ]
+        for case, view, path, params in cases:
+            def cold():
+                cache.clear()
+                call_view(view, path, admin, params)
+
+            results.append({
+                "case": case,
+                "cold": measure(cold, repeat),
+                "warm": measure(lambda: call_view(view, path, admin, params), repeat),
+            })
+
+    # В кэше остались ответы по откаченным данным бенчмарка
+    cache.clear()
+    return results
+
+
+def _conditional_get(view, path, user, etag):
+    request = APIRequestFactory().get(path, HTTP_IF_NONE_MATCH=etag)
+    force_authenticate(request, user=user)
+    response = view(request)
+    assert response.status_code == 304, response.status_code
+    return response
+
+
+@benchmark('conditional_get')
+def bench_conditional_get(repeat=20, scale=1):
+    results = []
+    with scratch_data():
+        seed_reservations(10000 * scale, rooms_count=200 * scale, clients_count=1000 * scale)
+        admin = User.objects.create_user(username=f'benchmark-{time.monotonic_ns()}')
+        for path, view in (('/hotel/api/rooms/', RoomViewSet.as_view({'get': 'list'})),
+                           ('/hotel/api/reservations/', ReservationViewSet.as_view({'get': 'list'}))):
+            etag = call_view(view, path, admin)['ETag']
+            not_modified = measure(lambda: _conditional_get(view, path, admin, etag), repeat)
+            # cache.clear() сбрасывает и версии моделей, поэтому полный ответ замеряется последним
+            results.append({
+                "case": f"GET {path}",
+                "full": measure(lambda: (cache.clear(), call_view(view, path, admin)), max(1, repeat // 10)),
+                "not_modified": not_modified,
+            })
+    cache.clear()
+    return results
+
+
+@benchmark('change_feed')
+def bench_change_feed(repeat=20, scale=1):
+    """Опрос панели ресепшена: полный список комнат против событий ленты после курсора."""
+    with scratch_data():
+        rooms, _ = seed_reservations(10000 * scale, rooms_count=200 * scale, clients_count=1000 * scale)
+        admin = User.objects.create_user(username=f'benchmark-{time.monotonic_ns()}')
+        cursor = last_event_id()
+        transition_rooms({room.id: 'REQUIRES_CLEANING' for room in rooms[:10]}, force=True)
+        rooms_view, feed_view = RoomsByStatusView.as_view(), OutboxEventsView.as_view()
+        result = {
+            "case": f"{len(rooms)} комнат, 10 изменений",
+            "rooms": measure(lambda: (cache.clear(), call_view(rooms_view, '/hotel/rooms', admin)), repeat),
+            "feed": measure(lambda: call_view(feed_view, '/hotel/events', admin, {'after': cursor}), repeat),
+            "feed_idle": measure(lambda: call_view(feed_view, '/hotel/events', admin, {'after': last_event_id()}),
+                                 repeat),
+        }
+    cache.clear()
+    return [result]
+
+
+def _legacy_employee_positions(employees):
+    # Прежний EmployeeSerializer.get_position: контракт и затем должность отдельными запросами на сотрудника
+    positions = {}
+    for employee in employees:
+        contract = EmploymentContract.objects.filter(employee=employee, is_active=True).first()
+        positions[employee.id] = contract and {'id': contract.position.id, 'name': contract.position.name,
+                                               'salary': contract.position.salary}
+    return positions
+
+
+@benchmark('employee_roster')
+def bench_employee_roster(repeat=20, scale=1):
+    with scratch_data():
+        admin = User.objects.create_user(username=f'benchmark-{time.monotonic_ns()}')
+        position = EmployeePosition.objects.create(name=f'benchmark-{time.monotonic_ns()}', salary=30000)
+        employees = Employee.objects.bulk_create(
+            Employee(passport_number=f'BR{i:08d}', first_name='Анна', last_name='Петрова') for i in range(2000 * scale)
+        )
+        EmploymentContract.objects.bulk_create(
+            EmploymentContract(employee=employee, position=position, contract_type='PERMANENT',
+                               start_date=date(2024, 1, 1))
+            for employee in employees
+        )
+        employees_view = EmployeeViewSet.as_view({'get': 'list'})
+        result = {
+            "case": f"{len(employees)} сотрудников",
+            "legacy": measure(lambda: _legacy_employee_positions(Employee.objects.all()), max(1, repeat // 10)),
+            "api_cold": measure(lambda: (cache.clear(), call_view(employees_view, '/hotel/api/employees/', admin)),
+                                repeat),
+            "roster": measure(lambda: call_view(EmployeeRosterView.as_view(), '/hotel/employees/roster', admin),
+                              repeat),
+        }
+    cache.clear()
+    return [result]
+
+
+def _with_rows_per_sec(summary, rows):
+    summary["rows_per_sec"] = round(rows / summary["median_ms"] * 1000) if summary["median_ms"] else None
+    return summary
+
+
+@benchmark('serializers')
+def bench_serializers(repeat=20, scale=1):
+    """
+    Сериализация и рендеринг длинных списков: ModelSerializer и JSONRenderer против быстрого пути
+    hotel_app.fastpath (values_list и FastJSONRenderer; orjson, если установлен).
+    """
+    results = []
+    with scratch_data():
+        rooms, _ = seed_reservations(0, rooms_count=200 * scale, clients_count=20000 * scale)
+        position, _ = EmployeePosition.objects.get_or_create(name=CLEANER_POSITION, defaults={'salary': 30000})
+        employee = Employee.objects.create(passport_number=f'BS{time.monotonic_ns() % 10 ** 8:08d}',
+                                           first_name='Анна', last_name='Петрова')
+        contract = EmploymentContract.objects.create(employee=employee, position=position,
+                                                     contract_type='PERMANENT', start_date=date(2024, 1, 1))
+        CleaningSchedule.objects.bulk_create(
+            CleaningSchedule(cleaner=contract, room=room, cleaning_date=date(2030, 1, 1) + timedelta(days=day))
+            for day in range(25) for room in rooms
+        )
+
+        cases = [
+            ("clients", Client.objects.order_by('id'), ClientSerializer, CLIENT_VALUES),
+            ("cleaning-schedules", CleaningSchedule.objects.order_by('id'), CleaningScheduleSerializer,
+             CLEANING_SCHEDULE_VALUES),
+        ]
+        for case, queryset, serializer_class, mapper in cases:
+            rows = queryset.count()
+            results.append({
+                "case": f"{case}, {rows} строк",
+                "drf": _with_rows_per_sec(measure(
+                    lambda: JSONRenderer().render(serializer_class(queryset, many=True).data), max(1, repeat // 5)
+                ), rows),
+                "values": _with_rows_per_sec(measure(
+                    lambda: JSONRenderer().render(mapper.serialize(queryset)), repeat
+                ), rows),
+                "values_fast_renderer": _with_rows_per_sec(measure(
+                    lambda: FastJSONRenderer().render(mapper.serialize(queryset)), repeat
+                ), rows),
+            })
+    return results
+
+
+def _rolled_back(func):
+    def run():
+        with transaction.atomic():
+            func()
+            transaction.set_rollback(True)
+
+    return run
+
+
+def _legacy_cleaning_schedule(rooms, contract_ids, days):
+    # Прежний PATCH cleaning-schedules/manage: удалить и заново создать все строки уборщика
+    size = -(-len(rooms) // len(contract_ids))
+    for index, contract_id in enumerate(contract_ids):
+        chunk = rooms[index * size:(index + 1) * size]
+        CleaningSchedule.objects.filter(cleaner_id=contract_id, cleaning_date__in=days, room__in=chunk).delete()
+        CleaningSchedule.objects.bulk_create(
+            CleaningSchedule(cleaner_id=contract_id, room=room, cleaning_date=day) for day in days for room in chunk
+        )
+
+
+@benchmark('cleaning_plan')
+def bench_cleaning_plan(repeat=20, scale=1):
+    start_date, end_date = date(2030, 1, 1), date(2030, 1, 30)
+    days = [start_date + timedelta(days=offset) for offset in range(30)]
+    with scratch_data():
+        rooms, _ = seed_reservations(0, rooms_count=1000 * scale, clients_count=0)
+        Room.objects.filter(pk__in=[room.pk for room in rooms]).update(status='REQUIRES_CLEANING')
+        position, _ = EmployeePosition.objects.get_or_create(name=CLEANER_POSITION, defaults={'salary': 30000})
+        employees = Employee.objects.bulk_create(
+            Employee(passport_number=f'BC{i:08d}', first_name='Анна', last_name='Петрова') for i in range(20 * scale)
+        )
+        contracts = EmploymentContract.objects.bulk_create(
+            EmploymentContract(employee=employee, position=position, contract_type='PERMANENT',
+                               start_date=date(2024, 1, 1))
+            for employee in employees
+        )
+
+        room_ids = list(Room.objects.filter(status='REQUIRES_CLEANING').order_by('number').values_list('id', flat=True))
+        active = active_cleaner_contracts(start_date, end_date)
+        results = [
+            {"case": f"compute {len(room_ids)} rooms x {len(days)} days",
+             "plan": measure(lambda: build_plan(start_date, end_date, room_ids, active), repeat)},
+            {"case": "empty schedule",
+             "legacy": measure(_rolled_back(lambda: _legacy_cleaning_schedule(
+                 rooms, [contract.id for contract in contracts], days)), max(1, repeat // 5)),
+             "plan": measure(_rolled_back(lambda: plan_cleaning(start_date, end_date)), max(1, repeat // 5))},
+        ]
+
+        plan_cleaning(start_date, end_date)
+        results.append({
+            "case": "replan unchanged schedule",
+            "legacy": measure(_rolled_back(lambda: _legacy_cleaning_schedule(
+                rooms, [contract.id for contract in contracts], days)), max(1, repeat // 5)),
+            "plan": measure(_rolled_back(lambda: plan_cleaning(start_date, end_date)), max(1, repeat // 5)),
+        })
+
+    cache.clear()
+    return results
+
+
+def _book_rooms(admin, room_numbers, passport_prefix):
+    view = ReservationManagementView.as_view()
+    factory = APIRequestFactory()
+    timings, failures = [], 0
+    try:
+        for index, room_number in enumerate(room_numbers):
+            request = factory.post('/hotel/reservation', {
+                "passport_number": f'{passport_prefix}{index:04d}',
+                "first_name": "Иван",
+                "last_name": "Иванов",
+                "city_from": "Москва",
+                "room_number": room_number,
+                "arrival_date": "2030-01-10",
+                "departure_date": "2030-01-15",
+            }, format='json')
+            force_authenticate(request, user=admin)
+
+            started = time.perf_counter()
+            response = view(request)
+            timings.append(time.perf_counter() - started)
+            failures += response.status_code != 201
+    finally:
+        connections.close_all()
+    return timings, failures
+
+
+def _group_booking(room_numbers, passport_prefix):
+    return [
+        {"passport_number": f'{passport_prefix}{index:06d}', "first_name": "Иван", "last_name": "Иванов",
+         "city_from": "Москва", "room_number": room_number, "arrival_date": "2030-01-10",
+         "departure_date": "2030-01-15"}
+        for index, room_number in enumerate(room_numbers)
+    ]
+
+
+def _post(view, path, user, data):
+    request = APIRequestFactory().post(path, data, format='json')
+    force_authenticate(request, user=user)
+    response = view(request)
+    assert response.status_code == 201, response.data
+    return response
+
+
+@benchmark('batch_booking')
+def bench_batch_booking(repeat=20, scale=1):
+    single_view, batch_view = ReservationManagementView.as_view(), BatchReservationView.as_view()
+    results = []
+    with scratch_data():
+        admin = User.objects.create_user(username=f'benchmark-{time.monotonic_ns()}')
+        rooms, _ = seed_reservations(0, rooms_count=200 * scale, clients_count=0)
+        numbers = [room.number for room in rooms]
+        for size in (10, 50 * scale):
+            items = _group_booking(numbers[:size], 'GB')
+            results.append({
+                "case": f"{size} reservations",
+                "single": measure(_rolled_back(lambda: [
+                    _post(single_view, '/hotel/reservation', admin, item) for item in items
+                ]), max(1, repeat // 5)),
+                "batch": measure(_rolled_back(lambda: _post(
+                    batch_view, '/hotel/reservation/batch', admin, {"reservations": items}
+                )), max(1, repeat // 5)),
+            })
+    cache.clear()
+    return results
+
+
+@benchmark('throttle')
+def bench_throttle(repeat=20, scale=1):
+    """
+    Накладные расходы ограничителя частоты на один запрос (времена в ms на вызов). Частота задана
+    так, чтобы запросы не отклонялись; для сравнения - UserRateThrottle из DRF, который хранит
+    отметку времени каждого запроса окна.
+    """
+    calls = 1000 * scale
+    unlimited = f'{10 ** 9}/day'
+    throttles = {
+        "client": [type('Client', (ClientRateThrottle,), {'rate': unlimited})],
+        "client+endpoint": [type('Client', (ClientRateThrottle,), {'rate': unlimited}),
+                            type('Endpoint', (EndpointRateThrottle,), {'rate': unlimited})],
+        "drf_user": [type('User', (UserRateThrottle,), {'rate': unlimited})],
+    }
+
+    results = []
+    with scratch_data():
+        request = Request(APIRequestFactory().get('/hotel/reports/quarterly'))
+        request.user = User.objects.create_user(username=f'benchmark-{time.monotonic_ns()}')
+        view = QuarterlyReportView()
+        cache.clear()
+        row = {"case": f"allow_request, window with up to {calls * repeat} requests"}
+        for label, throttle_classes in throttles.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for _ in range(calls):
+                    # DRF создаёт троттлы заново на каждый запрос
+                    for throttle_class in throttle_classes:
+                        throttle_class().allow_request(request, view)
+                timings.append((time.perf_counter() - started) / calls)
+            row[label] = summarize(timings)
+        results.append(row)
+    cache.clear()
+    return results
+
+
+@benchmark('write_throughput')
+def bench_write_throughput(repeat=20, scale=1):
+    """
+    Нагрузочный тест записи: параллельные бронирования через ReservationManagementView на текущей базе
+    (профиль задаётся HOTEL_DB_ENGINE). Потоки должны видеть данные друг друга, поэтому они
+    коммитятся и удаляются в конце, а не откатываются как в остальных бенчмарках.
+    """
+    bookings_per_thread = 25 * scale
+    thread_counts = (1, 4, 8)
+    run_id = time.monotonic_ns() % 1000
+
+    admin = User.objects.create_user(username=f'benchmark-{time.monotonic_ns()}')
+    room_type = RoomType.objects.create(name=f'benchmark-{time.monotonic_ns()}', capacity=1)
+    RoomPriceHistory.objects.create(room_type=room_type, start_date=date(2030, 1, 1), price=3000)
+    max_number = Room.objects.order_by('-number').values_list('number', flat=True).first() or 0
+    rooms = Room.objects.bulk_create(
+        Room(number=max_number + 1 + i, type=room_type, phone='0000000000')
+        for i in range(sum(thread_counts) * bookings_per_thread)
+    )
+    room_numbers = iter(room.number for room in rooms)
+
+    results = []
+    try:
+        for threads in thread_counts:
+            batches = [[next(room_numbers) for _ in range(bookings_per_thread)] for _ in range(threads)]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                outcomes = list(executor.map(
+                    lambda args: _book_rooms(admin, *args),
+                    [(batch, f'L{run_id:03d}{threads}{index}') for index, batch in enumerate(batches)]
+                ))
+            elapsed = time.perf_counter() - started
+
+            timings = [timing for batch_timings, _ in outcomes for timing in batch_timings]
+            failures = sum(batch_failures for _, batch_failures in outcomes)
+            results.append({
+                "case": f"{connection.vendor} threads={threads} bookings={len(timings)} failed={failures} "
+                        f"throughput={round((len(timings) - failures) / elapsed, 1)}/s",
+                "booking": summarize(timings),
+            })
+    finally:
+        Reservation.objects.filter(room__type=room_type).delete()
+        Client.objects.filter(passport_number__startswith=f'L{run_id:03d}').delete()
+        room_type.delete()
+        admin.delete()
+
+    return results
+
+
+def _wsgi_get(app, path, params, token):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': urlencode(params),
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'HTTP_AUTHORIZATION': f'Token {token}',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.url_scheme': 'http',
+    }
+    statuses = []
+    started = time.perf_counter()
+    response = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return int(statuses[0][:3]), time.perf_counter() - started
+
+
+async def _asgi_get(app, path, params, token):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': urlencode(params).encode(),
+        'headers': [(b'host', b'localhost'), (b'authorization', f'Token {token}'.encode())],
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+    body_sent = False
+    messages = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Клиент не отключается: обработчик сам отменит ожидание после отправки ответа
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return messages[0]['status'], time.perf_counter() - started
+
+
+def _run_wsgi_load(path, params, token, requests_count, concurrency):
+    app = get_wsgi_application()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda _: _wsgi_get(app, path, params, token), range(requests_count)))
+
+
+def _run_asgi_load(path, params, token, requests_count, concurrency):
+    app = get_asgi_application()
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                return await _asgi_get(app, path, params, token)
+
+        return await asyncio.gather(*(one() for _ in range(requests_count)))
+
+    return asyncio.run(run())
+
+
+@benchmark('asgi_load')
+def bench_asgi_load(repeat=20, scale=1):
+    """
+    Нагрузка на читающие эндпоинты: синхронные представления через WSGI-обработчик в пуле потоков
+    против async-представлений (/hotel/async/...) через ASGI-обработчик в цикле событий.
+    Данные коммитятся, чтобы их видели все соединения, и удаляются в конце.
+    """
+    requests_count = 10 * repeat
+    concurrency = 16
+
+    rooms, clients = seed_reservations(5000 * scale, rooms_count=100, clients_count=1000, batch_size=5000)
+    rebuild_quarterly_report()
+    admin = User.objects.order_by('-id').first()
+    token = Token.objects.create(user=User.objects.create_user(username=f'benchmark-{time.monotonic_ns()}')).key
+
+    cases = [
+        ('reports/quarterly', {'quarter': 2, 'year': 2024}),
+        ('clients/stay-overlap', {'client_id': clients[0].id}),
+        ('rooms', {'status': 'AVAILABLE'}),
+    ]
+    results = []
+    try:
+        for path, params in cases:
+            row = {"case": f"{path} requests={requests_count} concurrency={concurrency}"}
+            for label, runner, prefix in (('wsgi', _run_wsgi_load, '/hotel/'), ('asgi', _run_asgi_load, '/hotel/async/')):
+                started = time.perf_counter()
+                outcomes = runner(prefix + path, params, token, requests_count, concurrency)
+                elapsed = time.perf_counter() - started
+
+                failed = [status for status, _ in outcomes if status != 200]
+                if failed:
+                    row[label] = {"error": f"{len(failed)} ответов с кодами {sorted(set(failed))}"}
+                    continue
+                row[label] = summarize([timing for _, timing in outcomes])
+                row["case"] += f" {label}={round(requests_count / elapsed, 1)} rps"
+            results.append(row)
+    finally:
+        Reservation.objects.filter(room__in=rooms).delete()
+        Client.objects.filter(id__in=[client.id for client in clients]).delete()
+        Room.objects.filter(id__in=[room.id for room in rooms]).delete()
+        User.objects.filter(id__in=[admin.id, Token.objects.get(key=token).user_id]).delete()
+        cache.clear()
+
+    return results
+
+
+@contextmanager
+def temporary_database():
+    """
+    Отдельная пустая база с миграциями (как у тестов) на время замера. Данные в ней коммитятся,
+    поэтому их видят все соединения, включая потоки асинхронных представлений, а рабочая база не меняется.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    cache.clear()
+    try:
+        yield
+    finally:
+        cache.clear()
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def hotel_get_urls():
+    # Все маршруты hotel_app, отвечающие на GET: (имя маршрута, класс представления, именованные параметры)
+    from . import urls
+
+    routes = []
+    for pattern in urls.urlpatterns:
+        callback = pattern.callback
+        actions = getattr(callback, 'actions', None)
+        view_class = getattr(callback, 'cls', None)
+        if actions is not None:
+            allows_get = 'get' in actions
+        elif view_class is not None:
+            allows_get = hasattr(view_class, 'get')
+        else:
+            # Функции из async_views принимают только GET
+            allows_get = True
+
+        kwargs = list(pattern.pattern.regex.groupindex)
+        # Поток SSE открыт до STREAM_DURATION: его время ответа не измерить одним запросом
+        if pattern.name == 'async-change-stream':
+            continue
+        if allows_get and 'format' not in kwargs:
+            routes.append((pattern.name, view_class, kwargs))
+    return routes
+
+
+def hotel_url(name, kwargs):
+    # Имена маршрутов вроде api-root есть и в других приложениях: ищем внутри hotel_app.urls и добавляем префикс include
+    prefix = next(
+        str(pattern.pattern) for pattern in get_resolver().url_patterns
+        if isinstance(pattern, URLResolver) and getattr(pattern.urlconf_module, '__name__', None) == 'hotel_app.urls'
+    )
+    return '/' + prefix + reverse(name, urlconf='hotel_app.urls', kwargs=kwargs).lstrip('/')
+
+
+def _url_params(name, view_class, kwargs, sample):
+    # Значения параметров маршрута и строки запроса, при которых эндпоинт возвращает непустой ответ
+    model = getattr(getattr(view_class, 'queryset', None), 'model', None)
+    path_kwargs = {}
+    for kwarg in kwargs:
+        if kwarg == 'pk' and model is not None:
+            path_kwargs['pk'] = model.objects.order_by('pk').values_list('pk', flat=True).first()
+        elif kwarg == 'entity':
+            path_kwargs['entity'] = 'clients'
+
+    query = {
+        'clients-list': {'city': 'Москва'},
+        'client-stay-overlap': {'client_id': sample['client_id']},
+        'async-client-stay-overlap': {'client_id': sample['client_id']},
+        'client-room-cleaning': {'client_id': sample['client_id'], 'day_of_week': 'MONDAY'},
+        'quarterly-report': sample['quarter'],
+        'async-quarterly-report': sample['quarter'],
+        'free-rooms': {'start_date': sample['today'], 'end_date': sample['today'] + timedelta(days=7)},
+        'async-change-feed': {'wait': 0},
+        'occupancy-report': {'start_date': sample['today'] - timedelta(days=90), 'end_date': sample['today'],
+                             'bucket': 'week'},
+    }.get(name, {})
+    return hotel_url(name, path_kwargs), query
+
+
+@benchmark('urls')
+def bench_urls(repeat=20, scale=1):
+    """
+    Время ответа каждого GET-маршрута hotel_app (обычных и /hotel/async/) через WSGI-обработчик со всеми
+    middleware на двух объёмах данных. Каждая ступень заполняется seed_hotel во временной базе; кэш
+    сбрасывается перед каждым запросом, чтобы замер отражал работу с базой.
+    """
+    app = get_wsgi_application()
+    levels = (scale, 10 * scale)
+    results = {}
+
+    for level in levels:
+        with temporary_database():
+            HotelDataGenerator(rooms=50 * level, clients=1000 * level, reservations=10000 * level,
+                               cleaners=5 * level).generate()
+            token = Token.objects.create(user=User.objects.create_user(username='benchmark')).key
+            today = date.today()
+            quarter_start = date(today.year, (today.month - 1) // 3 * 3 + 1, 1) - timedelta(days=1)
+            sample = {
+                'client_id': Reservation.objects.filter(room__cleaningschedule__isnull=False).values_list(
+                    'client_id', flat=True).first(),
+                'quarter': {'quarter': (quarter_start.month - 1) // 3 + 1, 'year': quarter_start.year},
+                'today': today,
+            }
+
+            for name, view_class, kwargs in hotel_get_urls():
+                path, params = _url_params(name, view_class, kwargs, sample)
+                timings, statuses = [], set()
+                for _ in range(repeat):
+                    cache.clear()
+                    status, elapsed = _wsgi_get(app, path, params, token)
+                    timings.append(elapsed)
+                    statuses.add(status)
+
+                row = results.setdefault(name, {"case": f"GET {path}" + (f"?{urlencode(params)}" if params else "")})
+                label = f"scale={level}"
+                if any(status >= 500 for status in statuses):
+                    row[label] = {"error": f"коды ответа {sorted(statuses)}"}
+                else:
+                    row[label] = {**summarize(timings), "status": sorted(statuses)}
+
+    return list(results.values())
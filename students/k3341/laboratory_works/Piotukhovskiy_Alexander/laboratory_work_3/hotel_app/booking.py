@@ -0,0 +1,173 @@
+"""
+Пакетное бронирование для групп и турагентств. Весь пакет обрабатывается за фиксированное число
+запросов: комнаты блокируются и читаются одним запросом, занятость и цены читаются одним запросом
+каждая, клиенты обновляются одним upsert по номеру паспорта, брони вставляются через bulk_create.
+"""
+from datetime import datetime
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .analytics import refresh_room_nights
+from .availability import BLOCKING_STATUSES, lock_rooms
+from .cache import invalidate
+from .models import Client, Reservation
+from .pricing import tariff_tables
+from .reports import refresh_report_cells, report_cell
+from .serializers import BookingItemSerializer
+from .state import record_reservation_statuses, transition_rooms
+
+CLIENT_FIELDS = ['first_name', 'last_name', 'middle_name', 'city_from']
+
+
+class BookingBatch:
+    def __init__(self, items, admin):
+        self.items = items
+        self.admin = admin
+        self.errors = {}
+        self.valid = []
+
+    def add_error(self, index, errors):
+        self.errors[index] = errors
+
+    def validate_items(self):
+        # Один экземпляр на пакет, как в hotel_app.bulk: поля сериализатора строятся один раз
+        serializer = BookingItemSerializer()
+        for index, item in enumerate(self.items):
+            try:
+                self.valid.append((index, dict(serializer.run_validation(item))))
+            except serializers.ValidationError as error:
+                self.add_error(index, serializers.as_serializer_error(error))
+
+    def check_rooms(self):
+        rooms = lock_rooms({data['room_number'] for _, data in self.valid})
+        checked = []
+        for index, data in self.valid:
+            room = rooms.get(data['room_number'])
+            if room is None:
+                self.add_error(index, {"room_number": [f"Комната с номером {data['room_number']} не найдена."]})
+            elif room.status != 'AVAILABLE':
+                self.add_error(index, {"room_number": ["Комната недоступна для заселения."]})
+            else:
+                data['room'] = room
+                checked.append((index, data))
+        self.valid = checked
+
+    def check_overlaps(self):
+        if not self.valid:
+            return
+        first_day = min(data['arrival_date'] for _, data in self.valid)
+        last_day = max(data['departure_date'] for _, data in self.valid)
+        busy = {}
+        for room_id, arrival_date, departure_date in Reservation.objects.filter(
+            status__in=BLOCKING_STATUSES,
+            room_id__in={data['room'].id for _, data in self.valid},
+            arrival_date__lt=last_day,
+            departure_date__gt=first_day,
+        ).values_list('room_id', 'arrival_date', 'departure_date'):
+            busy.setdefault(room_id, []).append((arrival_date, departure_date, None))
+
+        # Брони пакета занимают комнату для следующих броней пакета так же, как уже сохранённые
+        free = []
+        for index, data in self.valid:
+            stays = busy.setdefault(data['room'].id, [])
+            conflict = next((other for arrival_date, departure_date, other in stays
+                             if arrival_date < data['departure_date'] and departure_date > data['arrival_date']), False)
+            if conflict is False:
+                if data.get('status', 'BOOKED') in BLOCKING_STATUSES:
+                    stays.append((data['arrival_date'], data['departure_date'], index))
+                free.append((index, data))
+            elif conflict is None:
+                self.add_error(index, {"room_number": [
+                    f"Комната {data['room'].number} уже забронирована на указанные даты."]})
+            else:
+                self.add_error(index, {"room_number": [
+                    f"Комната {data['room'].number} на эти даты уже занята бронью {conflict} пакета."]})
+        self.valid = free
+
+    def upsert_clients(self):
+        # Для повторяющегося паспорта действуют данные последней брони, как при последовательных запросах
+        clients = {
+            data['passport_number']: Client(passport_number=data['passport_number'], first_name=data['first_name'],
+                                            last_name=data['last_name'], middle_name=data.get('middle_name'),
+                                            city_from=data['city_from'])
+            for _, data in self.valid
+        }
+        Client.objects.bulk_create(clients.values(), update_conflicts=True, unique_fields=['passport_number'],
+                                   update_fields=CLIENT_FIELDS)
+        return dict(Client.objects.filter(passport_number__in=clients).values_list('passport_number', 'id'))
+
+    def save(self):
+        tariffs = tariff_tables({data['room'].type_id for _, data in self.valid})
+        client_ids = self.upsert_clients()
+
+        booking_date = datetime.now()
+        quotes, reservations = [], []
+        for _, data in self.valid:
+            quote = tariffs[data['room'].type_id].quote(data['arrival_date'], data['departure_date'])
+            quotes.append(quote)
+            reservations.append(Reservation(
+                client_id=client_ids[data['passport_number']],
+                room=data['room'],
+                admin=self.admin,
+                booking_date=booking_date,
+                arrival_date=data['arrival_date'],
+                departure_date=data['departure_date'],
+                status=data.get('status') or Reservation._meta.get_field('status').get_default(),
+                payment_status=data.get('payment_status') or Reservation._meta.get_field('payment_status').get_default(),
+                price_at_booking=quote.total,
+                final_price=quote.total,
+            ))
+        Reservation.objects.bulk_create(reservations)
+
+        # bulk_create не отправляет сигналы: отчёт, outbox и кэш обновляются явно
+        record_reservation_statuses(reservations)
+        transition_rooms({reservation.room_id: 'OCCUPIED' for reservation in reservations})
+        refresh_report_cells({
+            report_cell(reservation.room_id, reservation.arrival_date, reservation.departure_date)
+            for reservation in reservations
+        } - {None})
+        refresh_room_nights(reservation.id for reservation in reservations)
+        invalidate(Client, Reservation)
+        return list(zip(reservations, quotes))
+
+    def results(self, saved):
+        results = [{"index": index, "errors": errors} for index, errors in self.errors.items()]
+        results += [
+            {
+                "index": index,
+                "reservation_id": reservation.id,
+                "client_id": reservation.client_id,
+                "room_number": reservation.room.number,
+                "arrival_date": reservation.arrival_date,
+                "departure_date": reservation.departure_date,
+                "status": reservation.status,
+                "price_at_booking": reservation.price_at_booking,
+                "price_breakdown": [line.as_dict() for line in quote.breakdown],
+            }
+            for (index, _), (reservation, quote) in zip(self.valid, saved)
+        ]
+        return sorted(results, key=lambda result: result["index"])
+
+
+def book_batch(items, admin, all_or_nothing=False):
+    """
+    Создаёт брони пакета в одной транзакции и возвращает (created, results) с результатом для каждой
+    брони в порядке запроса. Статус комнаты проверяется на начало пакета, поэтому одну комнату можно
+    забронировать в пакете несколько раз на непересекающиеся даты. С all_or_nothing при любой
+    ошибке не сохраняется ничего.
+    """
+    batch = BookingBatch(items, admin)
+    batch.validate_items()
+    saved = []
+    with transaction.atomic():
+        if batch.valid:
+            batch.check_rooms()
+            batch.check_overlaps()
+        if batch.errors and all_or_nothing:
+            for index, _ in batch.valid:
+                batch.add_error(index, {"non_field_errors": ["Пакет не сохранён: в других бронях пакета есть ошибки."]})
+            batch.valid = []
+        if batch.valid:
+            saved = batch.save()
+    return len(saved), batch.results(saved)
@@ -0,0 +1,246 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction, IntegrityError
+from rest_framework import serializers
+
+from .cache import invalidate
+from .models import Client, Room, RoomType, RoomPriceHistory, CleaningSchedule, EmploymentContract
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+CSV_CONTENT_TYPE = 'text/csv'
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+class ClientImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Client
+        fields = ['passport_number', 'first_name', 'last_name', 'middle_name', 'city_from']
+        # Уникальность паспорта проверяется пачкой, а не запросом на каждую строку
+        extra_kwargs = {'passport_number': {'validators': []}}
+
+
+class RoomImportSerializer(serializers.ModelSerializer):
+    type_id = serializers.IntegerField()
+
+    class Meta:
+        model = Room
+        fields = ['number', 'type_id', 'status', 'phone']
+        extra_kwargs = {'number': {'validators': []}}
+
+
+class RoomPriceHistoryImportSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    room_type_id = serializers.IntegerField()
+
+    class Meta:
+        model = RoomPriceHistory
+        fields = ['id', 'room_type_id', 'start_date', 'end_date', 'price']
+
+    def validate(self, data):
+        if data.get('end_date') and data['end_date'] < data['start_date']:
+            raise serializers.ValidationError({"end_date": "Дата окончания не может быть раньше даты начала."})
+        return data
+
+
+class CleaningScheduleImportSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    cleaner_id = serializers.IntegerField()
+    room_id = serializers.IntegerField()
+
+    class Meta:
+        model = CleaningSchedule
+        fields = ['id', 'cleaner_id', 'room_id', 'cleaning_date', 'status']
+
+
+class BulkEntity:
+    def __init__(self, model, serializer_class, key_field='id', foreign_keys=None):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.key_field = key_field
+        self.foreign_keys = foreign_keys or {}
+        self.import_fields = [name for name in serializer_class.Meta.fields if name != 'id']
+        self.export_fields = ['id'] + self.import_fields
+
+    def nullable_fields(self):
+        return {
+            name for name in self.import_fields
+            if getattr(self.model._meta.get_field(name.removesuffix('_id')), 'null', False)
+        }
+
+
+BULK_ENTITIES = {
+    'clients': BulkEntity(Client, ClientImportSerializer, key_field='passport_number'),
+    'rooms': BulkEntity(Room, RoomImportSerializer, key_field='number', foreign_keys={'type_id': RoomType}),
+    'price-history': BulkEntity(RoomPriceHistory, RoomPriceHistoryImportSerializer,
+                                foreign_keys={'room_type_id': RoomType}),
+    'cleaning-schedules': BulkEntity(CleaningSchedule, CleaningScheduleImportSerializer,
+                                     foreign_keys={'cleaner_id': EmploymentContract, 'room_id': Room}),
+}
+
+
+def parse_csv(lines):
+    reader = csv.DictReader(line.decode('utf-8-sig') for line in lines)
+    for row in reader:
+        yield reader.line_num, row, None
+
+
+def parse_ndjson(lines):
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield line_number, None, f"Некорректный JSON: {error}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Строка должна быть JSON-объектом."
+            continue
+        yield line_number, row, None
+
+
+PARSERS = {
+    CSV_CONTENT_TYPE: parse_csv,
+    NDJSON_CONTENT_TYPE: parse_ndjson,
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+def _validate_batch(entity, batch, report):
+    nullable = entity.nullable_fields()
+    # Один экземпляр на пачку: построение полей ModelSerializer дороже самой проверки строки
+    serializer = entity.serializer_class()
+    valid = []
+    for line, row, parse_error in batch:
+        if parse_error:
+            report.add_error(line, {"non_field_errors": [parse_error]})
+            continue
+
+        # В CSV пустая ячейка означает отсутствие значения
+        row = {
+            key: None if value == '' and key in nullable else value
+            for key, value in row.items() if key and not (value == '' and key == 'id')
+        }
+        try:
+            valid.append((line, dict(serializer.run_validation(row))))
+        except serializers.ValidationError as error:
+            report.add_error(line, serializers.as_serializer_error(error))
+
+    for field, related_model in entity.foreign_keys.items():
+        existing = set(related_model.objects.filter(
+            pk__in={data[field] for _, data in valid}
+        ).values_list('pk', flat=True))
+        for line, data in valid:
+            if data[field] not in existing:
+                report.add_error(line, {field: [f"Объект с id {data[field]} не найден."]})
+        valid = [(line, data) for line, data in valid if data[field] in existing]
+
+    seen = {}
+    unique = []
+    for line, data in valid:
+        key = data.get(entity.key_field)
+        if key is not None and key in seen:
+            report.add_error(line, {entity.key_field: [f"Повторяет строку {seen[key]}."]})
+            continue
+        if key is not None:
+            seen[key] = line
+        unique.append((line, data))
+    return unique
+
+
+def _write_batch(entity, valid, report):
+    model = entity.model
+    keys = [data[entity.key_field] for _, data in valid if data.get(entity.key_field) is not None]
+    existing = dict(model.objects.filter(**{f'{entity.key_field}__in': keys}).values_list(entity.key_field, 'pk'))
+
+    to_create, to_update, lines = [], [], []
+    for line, data in valid:
+        key = data.get(entity.key_field)
+        if key is not None and key in existing:
+            data['id'] = existing[key]
+            to_update.append(model(**data))
+        elif entity.key_field == 'id' and key is not None:
+            report.add_error(line, {"id": [f"Объект с id {key} не найден."]})
+            continue
+        else:
+            to_create.append(model(**data))
+        lines.append(line)
+
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(to_create)
+            if to_update:
+                model.objects.bulk_update(to_update, entity.import_fields)
+            # bulk_create и bulk_update не отправляют сигналы, поэтому кэш сбрасывается явно
+            invalidate(model)
+    except IntegrityError as error:
+        for line in lines:
+            report.add_error(line, {"non_field_errors": [f"Пачка не сохранена: {error}"]})
+        return
+
+    report.created += len(to_create)
+    report.updated += len(to_update)
+
+
+def import_rows(entity, rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Загружает строки пачками: каждая пачка проверяется целиком (внешние ключи и существующие
+    записи - одним запросом на пачку) и записывается bulk_create/bulk_update в своей транзакции.
+    Ошибочные строки пропускаются и попадают в отчёт с номером строки.
+    """
+    report = ImportReport()
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return report
+        valid = _validate_batch(entity, batch, report)
+        if valid:
+            _write_batch(entity, valid, report)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_export(entity, export_format, chunk_size=2000):
+    rows = entity.model.objects.order_by('pk').values_list(*entity.export_fields).iterator(chunk_size=chunk_size)
+
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(entity.export_fields).encode()
+        while chunk := list(islice(rows, chunk_size)):
+            yield ''.join(writer.writerow(row) for row in chunk).encode()
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        while chunk := list(islice(rows, chunk_size)):
+            yield ''.join(
+                encoder.encode(dict(zip(entity.export_fields, row))) + '\n' for row in chunk
+            ).encode()
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+from django.utils import timezone
+
+KEY_PREFIX = 'hotel'
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+
+def _version_key(model):
+    return f'{KEY_PREFIX}:version:{model._meta.label_lower}'
+
+
+def model_versions(models):
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Версия могла быть вытеснена: начинаем с метки времени, чтобы не совпасть со старыми записями
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _changed_key(model):
+    return f'{KEY_PREFIX}:changed:{model._meta.label_lower}'
+
+
+def _bump(models):
+    now = time.time()
+    for model in models:
+        key = _version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+    cache.set_many({_changed_key(model): now for model in models}, timeout=None)
+
+
+def models_changed_at(models):
+    # Время последнего invalidate() моделей, unix time
+    keys = [_changed_key(model) for model in models]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            # Отметка вытеснена или ещё не ставилась: как и для версий, считаем, что модель изменилась сейчас
+            cache.add(key, time.time(), timeout=None)
+            stamps[key] = cache.get(key)
+    return max(stamps.values())
+
+
+def _store_versions(models):
+    # Версии в базе общие для всех воркеров. Случайная версия не повторяет значение, которое видел
+    # параллельный запрос до отката
+    from .models import ModelVersion
+
+    version, now = secrets.randbits(63), timezone.now()
+    ModelVersion.objects.bulk_create(
+        [ModelVersion(model=model._meta.label_lower, version=version, changed_at=now)
+         for model in sorted(models, key=lambda model: model._meta.label_lower)],
+        update_conflicts=True, unique_fields=['model'], update_fields=['version', 'changed_at'],
+    )
+
+
+def stored_versions(models):
+    """
+    Возвращает (версии, время последнего изменения в unix time или None) моделей из базы одним запросом.
+    Версия меняется после коммита, а не в транзакции записи: строки версий не блокируются до коммита, и
+    параллельные записи не ждут друг друга и не попадают во взаимную блокировку на них.
+    """
+    from .models import ModelVersion
+
+    labels = [model._meta.label_lower for model in models]
+    rows = {label: (version, changed_at) for label, version, changed_at in ModelVersion.objects.filter(
+        model__in=labels).values_list('model', 'version', 'changed_at')}
+    changed = [changed_at.timestamp() for _, changed_at in rows.values()]
+    return [rows.get(label, (None,))[0] for label in labels], max(changed, default=None)
+
+
+def _after_commit(models):
+    _bump(models)
+    _store_versions(models)
+
+
+def invalidate(*models):
+    """
+    Сбрасывает закэшированные ответы, зависящие от моделей. Версия в кэше повышается сразу и ещё раз
+    после коммита: иначе параллельный запрос мог бы сохранить под новой версией данные,
+    прочитанные до коммита. Версия в базе (для условных GET) меняется после коммита.
+    """
+    _bump(models)
+    transaction.on_commit(lambda: _after_commit(models))
+
+
+def _cache_key(name, versions, params):
+    digest = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{KEY_PREFIX}:{name}:{'.'.join(str(version) for version in versions)}:{digest}"
+
+
+def _count(name, hits, misses):
+    with _stats_lock:
+        _stats[name]['hits'] += hits
+        _stats[name]['misses'] += misses
+
+
+def cached(name, models, params, compute, timeout=DEFAULT_TIMEOUT):
+    key = _cache_key(name, model_versions(models), params)
+    value = cache.get(key)
+    _count(name, value is not None, value is None)
+    if value is not None:
+        return value
+
+    value = compute()
+    cache.set(key, value, timeout=timeout)
+    return value
+
+
+async def amodel_versions(models):
+    keys = [_version_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+async def acached(name, models, params, compute, timeout=DEFAULT_TIMEOUT):
+    # То же, что cached(), для асинхронных представлений: ключи и счётчики общие
+    key = _cache_key(name, await amodel_versions(models), params)
+    value = await cache.aget(key)
+    _count(name, value is not None, value is None)
+    if value is not None:
+        return value
+
+    value = await compute()
+    await cache.aset(key, value, timeout=timeout)
+    return value
+
+
+def cached_many(name, models, ids, compute, timeout=DEFAULT_TIMEOUT):
+    # Значения по объектам: одно чтение get_many на список, недостающие считаются одним вызовом compute
+    versions = '.'.join(str(version) for version in model_versions(models))
+    keys = {object_id: f'{KEY_PREFIX}:{name}:{versions}:{object_id}' for object_id in ids}
+
+    found = cache.get_many(keys.values())
+    values = {object_id: found[key] for object_id, key in keys.items() if key in found}
+    missing = [object_id for object_id in keys if object_id not in values]
+    _count(name, len(values), len(missing))
+
+    if missing:
+        computed = compute(missing)
+        fresh = {object_id: computed.get(object_id) for object_id in missing}
+        cache.set_many({keys[object_id]: value for object_id, value in fresh.items()}, timeout=timeout)
+        values.update(fresh)
+    return values
+
+
+def cache_stats():
+    with _stats_lock:
+        stats = {name: dict(counters) for name, counters in sorted(_stats.items())}
+
+    for counters in stats.values():
+        total = counters['hits'] + counters['misses']
+        counters['hit_ratio'] = round(counters['hits'] / total, 4) if total else None
+    return stats
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
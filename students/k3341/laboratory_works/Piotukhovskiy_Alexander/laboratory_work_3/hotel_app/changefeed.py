@@ -0,0 +1,99 @@
+"""
+Лента изменений для панелей ресепшена: события outbox (см. hotel_app.state) после курсора вместо
+повторной выдачи всех комнат. Курсор - id события: журнал только дописывается, поэтому чтение после
+курсора - диапазон по первичному ключу, а появление новых событий видно по MAX(id), чтению края индекса.
+Ожидание событий (long-poll и SSE в hotel_app.async_views) опрашивает MAX(id), поэтому записи всех
+воркеров видны без брокера сообщений.
+
+id выдаётся при INSERT, а событие становится видно при COMMIT, поэтому курсор сдвигается только до края,
+за которым лента уже не изменится (settled_event_id). В SQLite это MAX(id): транзакции начинаются с
+BEGIN IMMEDIATE (transaction_mode в настройках) и пишут по очереди, так что незакоммиченное событие всегда
+последнее, и раньше его коммита новых id не появляется. В PostgreSQL транзакция может держать выданный id,
+пока более поздние события уже закоммичены: пропуск в id - либо такая транзакция, либо откат, и курсор
+не переходит через пропуск, пока событию после него меньше GAP_TIMEOUT секунд.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+FEED_TOPICS = [choice[0] for choice in OutboxEvent.TOPIC_CHOICES]
+
+# Интервал опроса MAX(id), секунд: событие доставляется не позже чем через интервал после коммита
+POLL_INTERVAL = 0.5
+# Поток SSE закрывается через STREAM_DURATION секунд, и браузер переподключается с Last-Event-ID:
+# соединение не держится бесконечно. Раз в HEARTBEAT секунд тихий поток получает комментарий,
+# чтобы прокси не закрывали соединение по таймауту
+STREAM_DURATION = 300
+HEARTBEAT = 15
+STREAM_BATCH = 500
+# Задержка переподключения EventSource, миллисекунд
+STREAM_RETRY = 1000
+# Сколько секунд пропуск в id считается незакоммиченной транзакцией, а не откатом: событие транзакции
+# длиннее этого курсор может пропустить. Пропуски ищутся не дальше GAP_SCAN событий за курсором
+GAP_TIMEOUT = 30
+GAP_SCAN = 1000
+
+
+def read_events(after, topics=None, limit=100, until=None):
+    events = OutboxEvent.objects.filter(id__gt=after).order_by('id')
+    if until is not None:
+        events = events.filter(id__lte=until)
+    if topics:
+        events = events.filter(topic__in=topics)
+    return list(events[:limit])
+
+
+def last_event_id():
+    return OutboxEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def settled_event_id(after):
+    # Край ленты: события с id не больше него уже видны или откатились и не появятся позже
+    if connection.vendor == 'sqlite':
+        return max(last_event_id(), after)
+    return _settled_after_gaps(after)
+
+
+def _settled_after_gaps(after):
+    # Сдвигается по подряд идущим id; через пропуск - только если событию за ним больше GAP_TIMEOUT секунд.
+    # created_at ставится перед вставкой, поэтому пропущенный id выдан не позже этого времени
+    settled_before = timezone.now() - timedelta(seconds=GAP_TIMEOUT)
+    settled = after
+    events = OutboxEvent.objects.filter(id__gt=after).order_by('id').values_list('id', 'created_at')
+    for event_id, created_at in events[:GAP_SCAN]:
+        if event_id != settled + 1 and created_at > settled_before:
+            break
+        settled = event_id
+    return settled
+
+
+def read_feed(after, topics=None, limit=100):
+    """
+    Возвращает (события, курсор): до limit событий после after, но не дальше края settled_event_id.
+    Если событий меньше limit, курсор - сам край: события других тем второй раз не просматриваются.
+    """
+    settled = settled_event_id(after)
+    if settled <= after:
+        return [], after
+    events = read_events(after, topics, limit, settled)
+    return events, events[-1].id if len(events) == limit else settled
+
+
+def sse_message(data=None, event_id=None, event=None, comment=None, retry=None):
+    # Одно сообщение text/event-stream; data - уже сериализованный JSON в одну строку
+    lines = []
+    if comment is not None:
+        lines.append(f': {comment}')
+    if retry is not None:
+        lines.append(f'retry: {retry}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    if data is not None:
+        lines.append(f'data: {data.decode()}')
+    return ('\n'.join(lines) + '\n\n').encode()
@@ -0,0 +1,162 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+
+from .cache import invalidate
+from .models import CleaningSchedule, EmploymentContract, Room
+
+CLEANER_POSITION = 'Уборщик'
+
+# Строки со статусом PENDING можно перепланировать, начатые и завершённые уборки не трогаем
+PLANNABLE_STATUS = 'PENDING'
+
+DELETE_BATCH_SIZE = 500
+
+
+class PlanningError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+@dataclass
+class ScheduleDiff:
+    created: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+
+@dataclass
+class CleaningPlan:
+    start_date: object
+    end_date: object
+    rooms: list
+    # {(room_id, дата): contract_id}
+    assignments: dict = field(default_factory=dict)
+
+    def rows(self):
+        return {(contract_id, room_id, day) for (room_id, day), contract_id in self.assignments.items()}
+
+    def load(self):
+        return Counter(self.assignments.values())
+
+
+def date_range(start_date, end_date):
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+
+def active_cleaner_contracts(start_date, end_date):
+    # Контракты уборщиков, действующие хотя бы в один день периода
+    return list(
+        EmploymentContract.objects.filter(
+            position__name=CLEANER_POSITION,
+            is_active=True,
+            start_date__lte=end_date,
+        ).filter(
+            Q(end_date__isnull=True) | Q(end_date__gte=start_date),
+            Q(termination_date__isnull=True) | Q(termination_date__gt=start_date),
+        ).order_by('id').values_list('id', 'start_date', 'end_date', 'termination_date')
+    )
+
+
+def _works_on(contract, day):
+    _, start_date, end_date, termination_date = contract
+    return (start_date <= day
+            and (end_date is None or end_date >= day)
+            and (termination_date is None or termination_date > day))
+
+
+def split_evenly(room_ids, contract_ids):
+    # Соседние номера подряд, размеры частей отличаются не больше чем на один
+    size, extra = divmod(len(room_ids), len(contract_ids))
+    assignment, start = {}, 0
+    for index, contract_id in enumerate(contract_ids):
+        end = start + size + (index < extra)
+        assignment.update((room_id, contract_id) for room_id in room_ids[start:end])
+        start = end
+    return assignment
+
+
+def build_plan(start_date, end_date, rooms, contracts, locked=frozenset()):
+    """
+    Распределяет комнаты по уборщикам на каждый день периода. rooms — id комнат в порядке номеров,
+    contracts — строки active_cleaner_contracts(), locked — пары (room_id, дата), уже занятые
+    начатыми уборками. Для одинакового состава смены разбиение считается один раз, поэтому
+    за уборщиком остаются одни и те же комнаты.
+    """
+    plan = CleaningPlan(start_date, end_date, rooms)
+    splits = {}
+    for day in date_range(start_date, end_date):
+        room_ids = [room_id for room_id in rooms if (room_id, day) not in locked] if locked else rooms
+        contract_ids = tuple(contract[0] for contract in contracts if _works_on(contract, day))
+        if not room_ids or not contract_ids:
+            continue
+        key = (contract_ids, tuple(room_ids)) if locked else contract_ids
+        if key not in splits:
+            splits[key] = split_evenly(room_ids, contract_ids)
+        plan.assignments.update(((room_id, day), contract_id) for room_id, contract_id in splits[key].items())
+    return plan
+
+
+def validate_plan(plan, contracts, locked=frozenset()):
+    required = {(room_id, day) for day in date_range(plan.start_date, plan.end_date) for room_id in plan.rooms}
+    uncovered = required - locked - plan.assignments.keys()
+    errors = {}
+    if uncovered:
+        errors['unassigned_dates'] = sorted({day for _, day in uncovered})
+
+    contracts_by_id = {contract[0]: contract for contract in contracts}
+    off_duty = {(room_id, day) for (room_id, day), contract_id in plan.assignments.items()
+                if not _works_on(contracts_by_id[contract_id], day)}
+    if off_duty or plan.assignments.keys() & locked:
+        errors['conflicts'] = sorted(off_duty | (plan.assignments.keys() & locked))
+    return errors
+
+
+def apply_schedule(scope, desired, dry_run=False):
+    """
+    Приводит строки scope (queryset CleaningSchedule) к набору desired из троек (contract_id, room_id, дата):
+    недостающие строки вставляются, лишние удаляются, совпадающие остаются как есть вместе со статусом.
+    С dry_run только считает изменения.
+    """
+    keep, stale = set(), []
+    for row_id, contract_id, room_id, day in scope.values_list('id', 'cleaner_id', 'room_id', 'cleaning_date'):
+        row = (contract_id, room_id, day)
+        if row in desired and row not in keep:
+            keep.add(row)
+        else:
+            stale.append(row_id)
+
+    inserts = desired - keep
+    if dry_run:
+        return ScheduleDiff(created=len(inserts), deleted=len(stale), unchanged=len(keep))
+
+    for start in range(0, len(stale), DELETE_BATCH_SIZE):
+        CleaningSchedule.objects.filter(pk__in=stale[start:start + DELETE_BATCH_SIZE]).delete()
+    created = CleaningSchedule.objects.bulk_create(
+        CleaningSchedule(cleaner_id=contract_id, room_id=room_id, cleaning_date=day)
+        for contract_id, room_id, day in inserts
+    )
+    if stale or created:
+        # bulk_create не вызывает сигналы модели
+        invalidate(CleaningSchedule)
+    return ScheduleDiff(created=len(created), deleted=len(stale), unchanged=len(keep))
+
+
+def plan_cleaning(start_date, end_date, dry_run=False):
+    with transaction.atomic():
+        rooms = list(Room.objects.filter(status='REQUIRES_CLEANING').order_by('number').values_list('id', flat=True))
+        contracts = active_cleaner_contracts(start_date, end_date)
+        window = CleaningSchedule.objects.filter(room_id__in=rooms, cleaning_date__range=(start_date, end_date))
+        locked = frozenset(window.exclude(status=PLANNABLE_STATUS).values_list('room_id', 'cleaning_date'))
+
+        plan = build_plan(start_date, end_date, rooms, contracts, locked)
+        errors = validate_plan(plan, contracts, locked)
+        if errors:
+            raise PlanningError(errors)
+
+        diff = apply_schedule(window.filter(status=PLANNABLE_STATUS), plan.rows(), dry_run=dry_run)
+    return plan, diff
@@ -0,0 +1,76 @@
+"""
+Условные GET: ETag и Last-Modified для комнат и броней и ответ 304, если с прошлого запроса ничего
+не изменилось. Для таблиц с отметкой изменения (Room.updated_at, Reservation.last_updated_date)
+максимум отметки читается из базы по индексу, поэтому вставки и правки видны всем воркерам.
+Удаления и изменения остальных моделей, от которых зависит ответ (клиенты, уборки, сотрудники),
+учитываются по версиям моделей в базе (ModelVersion, их меняет hotel_app.cache.invalidate после коммита):
+они тоже общие для всех воркеров при любом бэкенде кэша. Версии в кэше процесса добавляются к ETag,
+чтобы свои записи воркера были видны ещё до коммита.
+"""
+import hashlib
+import json
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import model_versions, models_changed_at, stored_versions
+from .models import Reservation, Room
+
+STAMP_FIELDS = {
+    Room: 'updated_at',
+    Reservation: 'last_updated_date',
+}
+
+
+def request_params(query_params):
+    # Все параметры запроса (фильтры, курсор, stream) меняют тело ответа
+    return sorted((key, sorted(values)) for key, values in query_params.lists())
+
+
+def validators(models, params=None):
+    """Возвращает (ETag, Last-Modified в unix time) для ответа, зависящего от models и params."""
+    versions, stored_changed = stored_versions(models)
+    parts = [params, model_versions(models), versions]
+    last_modified = max(models_changed_at(models), stored_changed or 0)
+    for model in models:
+        if model in STAMP_FIELDS:
+            # Один MAX на запрос: так SQLite и PostgreSQL читают только край индекса
+            changed = model.objects.aggregate(changed=Max(STAMP_FIELDS[model]))['changed']
+            parts.append(changed)
+            if changed is not None:
+                last_modified = max(last_modified, changed.timestamp())
+
+    digest = hashlib.md5(json.dumps(parts, default=str).encode()).hexdigest()
+    return quote_etag(digest), int(last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code == 304 or 200 <= response.status_code < 300:
+        response.headers.setdefault('ETag', etag)
+        if last_modified:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+    return response
+
+
+def conditional_get(request, models, params, render):
+    # render() строит ответ, только если у клиента нет актуальной версии (иначе 304 или 412)
+    etag, last_modified = validators(models, params)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = render()
+    return set_validators(response, etag, last_modified)
+
+
+class ConditionalGetMixin:
+    """Условные GET для list и retrieve ViewSet: conditional_models - модели, от которых зависит ответ."""
+    conditional_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return conditional_get(request, self.conditional_models, request_params(request.query_params),
+                               lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        params = [kwargs, request_params(request.query_params)]
+        return conditional_get(request, self.conditional_models, params,
+                               lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
@@ -0,0 +1,118 @@
+"""
+Быстрая выдача больших списков в обход ModelSerializer. ValuesMapper читает строки через values_list()
+и собирает словари функцией, скомпилированной один раз по схеме полей: без экземпляров моделей и полей
+DRF на каждую строку. FastJSONRenderer рендерит ответ через orjson, если он установлен. Вывод совпадает
+с ModelSerializer и JSONRenderer байт в байт; представления включают быстрый путь явно (ValuesListMixin).
+"""
+from datetime import date
+from operator import itemgetter
+
+from django.db import models
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .metrics import timed_serialization
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def field_converter(model, lookup):
+    # Преобразование значения из базы в представление ModelSerializer; None - значение выдаётся как есть
+    field = None
+    for name in lookup.split('__'):
+        field = model._meta.get_field(name)
+        model = field.related_model
+    if isinstance(field, models.DateTimeField):
+        return serializers.DateTimeField().to_representation
+    if isinstance(field, models.DateField):
+        return date.isoformat
+    if isinstance(field, models.DecimalField):
+        return serializers.DecimalField(field.max_digits, field.decimal_places).to_representation
+    return None
+
+
+class ValuesMapper:
+    """
+    Схема {ключ ответа: lookup поля или вложенная схема}. Например, для уборки:
+    {'id': 'id', 'room': {'id': 'room__id', 'number': 'room__number'}, 'cleaning_date': 'cleaning_date'}.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.lookups = []
+        namespace = {}
+        self.convert = eval(f'lambda row: {self._compile(fields, namespace)}', namespace)
+
+    def _compile(self, fields, namespace):
+        items = []
+        for key, spec in fields.items():
+            if isinstance(spec, dict):
+                value = self._compile(spec, namespace)
+            else:
+                value = f'row[{len(self.lookups)}]'
+                converter = field_converter(self.model, spec)
+                if converter is not None:
+                    name = f'convert_{len(self.lookups)}'
+                    namespace[name] = converter
+                    value = f'(None if {value} is None else {name}({value}))'
+                self.lookups.append(spec)
+            items.append(f'{key!r}: {value}')
+        return '{' + ', '.join(items) + '}'
+
+    def values(self, queryset):
+        # Для пагинации: курсор читает id строки из словаря
+        return queryset.values(*self.lookups)
+
+    def map_rows(self, rows):
+        return list(map(self.convert, rows))
+
+    def map_dicts(self, rows):
+        getter = itemgetter(*self.lookups)
+        return [self.convert(getter(row)) for row in rows]
+
+    def serialize(self, queryset):
+        # То же, что ModelSerializer(queryset, many=True).data
+        with timed_serialization():
+            return self.map_rows(queryset.values_list(*self.lookups))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer через orjson, если он установлен. Даты, Decimal и остальные типы, которых нет в JSON,
+    преобразует тот же JSONEncoder DRF, поэтому вывод совпадает байт в байт. С отступами (?indent=)
+    и для данных, которые orjson не принимает, работает обычный JSONRenderer. Числа с плавающей точкой
+    в экспоненциальной записи orjson пишет иначе (1e16 вместо 1e+16), поэтому рендерер подключается
+    только к ответам без float.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or not self.compact or self.ensure_ascii or not self.strict
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=self.encoder_class().default,
+                                   option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer экранирует разделители строк U+2028 и U+2029, недопустимые в строках JavaScript
+        return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class ValuesListMixin:
+    """list() из values_mapper вместо serializer_class; потоковую выдачу переключает StreamingListMixin."""
+    values_mapper = None
+    renderer_classes = [FastJSONRenderer] + [renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+                                             if renderer is not JSONRenderer]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(self.values_mapper.values(queryset))
+        if page is not None:
+            with timed_serialization():
+                return self.get_paginated_response(self.values_mapper.map_dicts(page))
+        return Response(self.values_mapper.serialize(queryset))
@@ -0,0 +1,100 @@
+import json
+import subprocess
+from contextlib import nullcontext
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from hotel_app.benchmarks import BENCHMARKS
+
+# Медиана выросла больше чем на столько относительно сохранённого прогона - считаем регрессией
+REGRESSION_THRESHOLD = 1.2
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as file:
+        report = json.load(file)
+    # Файлы без meta сохранены до её появления: в них сразу результаты по бенчмаркам
+    return report.get('meta', {}), report.get('results', report)
+
+
+class Command(BaseCommand):
+    help = "Запускает бенчмарки hotel_app. Данные бенчмарков создаются во временной транзакции и откатываются."
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Имена бенчмарков: {', '.join(sorted(BENCHMARKS))}")
+        parser.add_argument('--repeat', type=int, default=20, help="Число повторов каждого замера")
+        parser.add_argument('--scale', type=int, default=1, help="Множитель объёма тестовых данных")
+        parser.add_argument('--json', dest='json_path', help="Сохранить результаты в JSON-файл")
+        parser.add_argument('--compare', dest='compare_path',
+                            help="JSON-файл предыдущего прогона (--json): вывести изменение медиан")
+        parser.add_argument('--throttle', action='store_true',
+                            help="Не выключать ограничение частоты запросов (по умолчанию выключено, "
+                                 "иначе нагрузочные бенчмарки упираются в лимиты)")
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Неизвестные бенчмарки: {unknown}. Доступные: {sorted(BENCHMARKS)}")
+
+        baseline = None
+        if options['compare_path']:
+            try:
+                baseline_meta, baseline = load_report(options['compare_path'])
+            except (OSError, ValueError) as error:
+                raise CommandError(f"Не удалось прочитать {options['compare_path']}: {error}")
+            self.stdout.write(f"Сравнение с прогоном {baseline_meta.get('commit') or options['compare_path']}")
+
+        report = {}
+        throttling = nullcontext() if options['throttle'] else override_settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}})
+        with throttling:
+            for name in names:
+                self.run_benchmark(name, options, baseline, report)
+
+        if options['json_path']:
+            meta = {
+                "commit": current_commit(),
+                "created_at": datetime.now().isoformat(timespec='seconds'),
+                "database": connection.vendor,
+                "repeat": options['repeat'],
+                "scale": options['scale'],
+                "throttle": options['throttle'],
+            }
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump({"meta": meta, "results": report}, file, ensure_ascii=False, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['json_path']}"))
+
+    def run_benchmark(self, name, options, baseline, report):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        results = BENCHMARKS[name](repeat=options['repeat'], scale=options['scale'])
+        previous = {result['case']: result for result in (baseline or {}).get(name, [])}
+        for result in results:
+            timings = ', '.join(
+                f"{key}: {value['error']}" if 'error' in value
+                else f"{key}: median {value['median_ms']} ms, p95 {value['p95_ms']} ms"
+                     + (f", {value['rows_per_sec']} строк/с" if value.get('rows_per_sec') else '')
+                     + self.format_change(value, previous.get(result['case'], {}).get(key))
+                for key, value in result.items() if isinstance(value, dict)
+            )
+            self.stdout.write(f"  {result['case']}: {timings}")
+        report[name] = results
+
+    def format_change(self, value, previous):
+        if not previous or 'median_ms' not in previous or not previous['median_ms']:
+            return ''
+        ratio = value['median_ms'] / previous['median_ms']
+        text = f" ({ratio:.2f}x к {previous['median_ms']} ms)"
+        return self.style.WARNING(text) if ratio > REGRESSION_THRESHOLD else text
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from hotel_app.reports import rebuild_quarterly_report
+
+
+class Command(BaseCommand):
+    help = "Полностью пересобирает предрасчитанный квартальный отчёт по таблице бронирований."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Размер пачки при вставке строк отчёта")
+
+    def handle(self, *args, **options):
+        cells = rebuild_quarterly_report(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Квартальный отчёт пересобран: {cells} ячеек."))
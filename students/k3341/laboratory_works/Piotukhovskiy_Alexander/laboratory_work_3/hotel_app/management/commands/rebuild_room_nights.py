@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from hotel_app.analytics import rebuild_room_nights
+
+
+class Command(BaseCommand):
+    help = "Полностью пересобирает таблицу проданных ночей (RoomNight) по таблице бронирований."
+
+    def handle(self, *args, **options):
+        nights = rebuild_room_nights()
+        self.stdout.write(self.style.SUCCESS(f"Таблица ночей пересобрана: {nights} ночей."))
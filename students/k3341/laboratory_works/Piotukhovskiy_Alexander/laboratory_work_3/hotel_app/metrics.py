@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы задержек, мс
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+DEFAULT_QUERY_BUDGET = 30
+
+_current = ContextVar('hotel_request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self._lock = threading.Lock()
+
+    def add_query(self, duration):
+        # Асинхронные представления выполняют запросы параллельно в разных потоках
+        with self._lock:
+            self.sql_count += 1
+            self.sql_time += duration
+
+
+def current_metrics():
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Обёртка ставится на каждое соединение, а метрики запроса берутся из контекста: так учитываются
+    и запросы из потоков sync_to_async, у которых свои соединения.
+    В начало списка, чтобы не мешать execute_wrapper(), который снимает последнюю обёртку.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def query_budget():
+    return getattr(settings, 'HOTEL_QUERY_BUDGET', DEFAULT_QUERY_BUDGET)
+
+
+class RouteHistogram:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, total_ms, metrics, over_budget):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    'count': 0,
+                    'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'sql_count': 0,
+                    'max_sql_count': 0,
+                    'sql_ms': 0.0,
+                    'serializer_ms': 0.0,
+                    'over_budget': 0,
+                }
+            stats['count'] += 1
+            stats['buckets'][bisect_left(LATENCY_BUCKETS_MS, total_ms)] += 1
+            stats['total_ms'] += total_ms
+            stats['max_ms'] = max(stats['max_ms'], total_ms)
+            stats['sql_count'] += metrics.sql_count
+            stats['max_sql_count'] = max(stats['max_sql_count'], metrics.sql_count)
+            stats['sql_ms'] += metrics.sql_time * 1000
+            stats['serializer_ms'] += metrics.serializer_time * 1000
+            stats['over_budget'] += over_budget
+
+    def snapshot(self):
+        with self._lock:
+            routes = {route: dict(stats, buckets=list(stats['buckets'])) for route, stats in self._routes.items()}
+
+        report = {}
+        for route, stats in sorted(routes.items()):
+            count = stats['count']
+            report[route] = {
+                'count': count,
+                'latency_ms': {
+                    'avg': round(stats['total_ms'] / count, 3),
+                    'max': round(stats['max_ms'], 3),
+                    # Накопительные счётчики, как в гистограммах Prometheus
+                    'buckets': {
+                        str(bound): sum(stats['buckets'][:index + 1])
+                        for index, bound in enumerate(LATENCY_BUCKETS_MS + ['+Inf'])
+                    },
+                },
+                'sql': {
+                    'avg_count': round(stats['sql_count'] / count, 2),
+                    'max_count': stats['max_sql_count'],
+                    'avg_ms': round(stats['sql_ms'] / count, 3),
+                },
+                'serializer_avg_ms': round(stats['serializer_ms'] / count, 3),
+                'over_budget': stats['over_budget'],
+            }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+HISTOGRAM = RouteHistogram()
+
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    # Для нераспознанных адресов одна метка, чтобы гистограмма не росла от произвольных URL
+    return f"{request.method} {match.route if match else '<unresolved>'}"
+
+
+class QueryMetricsMiddleware:
+    """
+    Считает для каждого запроса число и время SQL-запросов, время сериализации и общую задержку,
+    отдаёт их в заголовке Server-Timing и копит в гистограмме для /hotel/metrics.
+    Запросы сверх HOTEL_QUERY_BUDGET помечаются заголовком X-Query-Budget-Exceeded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        total_ms = (time.perf_counter() - metrics.started) * 1000
+        budget = query_budget()
+        over_budget = metrics.sql_count > budget
+        HISTOGRAM.observe(route_label(request), total_ms, metrics, over_budget)
+
+        # Для потоковых ответов учитывается только подготовка ответа, без запросов во время отдачи тела
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total_ms:.1f}',
+            f'sql;dur={metrics.sql_time * 1000:.1f};desc="{metrics.sql_count} queries"',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+        ])
+        if over_budget:
+            response['X-Query-Budget-Exceeded'] = f'{metrics.sql_count}/{budget}'
+            logger.warning("%s %s: %s SQL-запросов при бюджете %s", request.method, request.path,
+                           metrics.sql_count, budget)
+        return response
+
+
+class SerializerTimingMixin:
+    """
+    Добавляет время to_representation во время сериализации текущего запроса.
+    Вложенные сериализаторы не учитываются повторно; SQL внутри сериализации входит в это время.
+    """
+
+    def to_representation(self, instance):
+        metrics = current_metrics()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializing = False
+
+
+@contextmanager
+def timed_serialization():
+    # То же время сериализации, что у SerializerTimingMixin, для кода, собирающего ответ без сериализаторов DRF
+    metrics = current_metrics()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+
+    metrics.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - started
+        metrics.serializing = False
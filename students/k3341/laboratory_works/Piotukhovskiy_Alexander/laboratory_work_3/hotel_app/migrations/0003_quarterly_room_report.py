@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0002_reservation_room_dates_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuarterlyRoomReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(verbose_name='Год')),
+                ('quarter', models.PositiveSmallIntegerField(verbose_name='Квартал')),
+                ('client_count', models.PositiveIntegerField(default=0, verbose_name='Число клиентов')),
+                ('paid_count', models.PositiveIntegerField(default=0, verbose_name='Число оплаченных бронирований')),
+                ('income', models.PositiveBigIntegerField(default=0, verbose_name='Доход')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hotel_app.room', verbose_name='Комната')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year', 'quarter', 'room'), name='quarterly_report_cell_unique')],
+            },
+        ),
+    ]
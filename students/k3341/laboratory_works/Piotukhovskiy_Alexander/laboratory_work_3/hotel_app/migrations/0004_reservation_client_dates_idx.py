@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0003_quarterly_room_report'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['client', 'arrival_date', 'departure_date'], name='reservation_client_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0004_reservation_client_dates_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(choices=[('room.status', 'Статус комнаты'), ('reservation.status', 'Статус бронирования')], max_length=50, verbose_name='Тема')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID объекта')),
+                ('payload', models.JSONField(default=dict, verbose_name='Данные события')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время события')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['topic', 'id'], name='outbox_topic_id_idx')],
+            },
+        ),
+    ]
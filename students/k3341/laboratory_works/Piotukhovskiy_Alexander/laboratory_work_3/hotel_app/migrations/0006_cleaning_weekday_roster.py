@@ -0,0 +1,53 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractIsoWeekDay
+
+
+def fill_weekday_and_roster(apps, schema_editor):
+    CleaningSchedule = apps.get_model('hotel_app', 'CleaningSchedule')
+    RoomCleaningRoster = apps.get_model('hotel_app', 'RoomCleaningRoster')
+
+    CleaningSchedule.objects.update(weekday=ExtractIsoWeekDay('cleaning_date'))
+    RoomCleaningRoster.objects.bulk_create(
+        (
+            RoomCleaningRoster(**row)
+            for row in CleaningSchedule.objects.values('room_id', 'weekday', 'cleaner_id')
+            .annotate(cleanings=Count('id')).order_by()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0005_outbox_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cleaningschedule',
+            name='weekday',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='День недели'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='cleaningschedule',
+            index=models.Index(fields=['room', 'weekday'], name='cleaning_room_weekday_idx'),
+        ),
+        migrations.CreateModel(
+            name='RoomCleaningRoster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(verbose_name='День недели')),
+                ('cleanings', models.PositiveIntegerField(verbose_name='Число уборок')),
+                ('cleaner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hotel_app.employmentcontract', verbose_name='Сотрудник')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hotel_app.room', verbose_name='Комната')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('room', 'weekday', 'cleaner'), name='cleaning_roster_unique')],
+            },
+        ),
+        migrations.RunPython(fill_weekday_and_roster, migrations.RunPython.noop),
+    ]
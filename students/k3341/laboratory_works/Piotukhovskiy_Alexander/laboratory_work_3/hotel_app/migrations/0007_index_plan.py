@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def deactivate_duplicate_contracts(apps, schema_editor):
+    # Перед уникальным индексом у каждого сотрудника остаётся активным только последний контракт
+    EmploymentContract = apps.get_model('hotel_app', 'EmploymentContract')
+    latest = {}
+    duplicates = []
+    for contract_id, employee_id in EmploymentContract.objects.filter(is_active=True).order_by(
+            '-start_date', '-id').values_list('id', 'employee_id'):
+        if employee_id in latest:
+            duplicates.append(contract_id)
+        else:
+            latest[employee_id] = contract_id
+    EmploymentContract.objects.filter(id__in=duplicates).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0006_cleaning_weekday_roster'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cleaningschedule',
+            index=models.Index(fields=['room', 'cleaning_date'], name='cleaning_room_date_idx'),
+        ),
+        # Отдельного индекса по status и payment_status нет: условия status__in и payment_status__in всегда идут
+        # вместе с диапазоном дат или номером и проверяются на строках, уже найденных по индексам дат, а сами
+        # по себе почти не отсекают строк. На 100 000 броней seed_hotel статусы отчёта (CLIENT_STATUSES)
+        # у 93% броней, оплаченные (PAID_STATUSES) у 82%, а занимающие номер (BLOCKING_STATUSES) - у 61% броней,
+        # которые заканчиваются после начала проверяемого периода. EXPLAIN квартального отчёта и проверки занятости показывает
+        # SEARCH по reservation_dates_idx и reservation_room_dates_idx; частичный индекс
+        # WHERE status IN (...) SQLite не выбирает, потому что список статусов передаётся параметрами
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['arrival_date', 'departure_date'], name='reservation_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['status'], name='room_status_idx'),
+        ),
+        migrations.RunPython(deactivate_duplicate_contracts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='employmentcontract',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('employee',), name='one_active_contract_per_employee'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0008_room_version_and_update_stamps'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='topic',
+            field=models.CharField(choices=[('room.status', 'Статус комнаты'), ('reservation.status', 'Статус бронирования'), ('reservation.updated', 'Изменение бронирования')], max_length=50, verbose_name='Тема'),
+        ),
+    ]
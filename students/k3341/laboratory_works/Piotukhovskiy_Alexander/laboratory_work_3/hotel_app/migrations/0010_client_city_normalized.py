@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+def fill_city_normalized(apps, schema_editor):
+    # Городов немного: один UPDATE на каждое различное название (нормализация как в models.normalize_city)
+    Client = apps.get_model('hotel_app', 'Client')
+    for city in Client.objects.values_list('city_from', flat=True).distinct():
+        normalized = ' '.join(city.split()).casefold().replace('ё', 'е') if city else ''
+        Client.objects.filter(city_from=city).update(city_normalized=normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0009_outbox_reservation_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='city_normalized',
+            field=models.CharField(default='', editable=False, max_length=50, verbose_name='Город для поиска'),
+        ),
+        migrations.RunPython(fill_city_normalized, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['city_normalized'], name='client_city_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
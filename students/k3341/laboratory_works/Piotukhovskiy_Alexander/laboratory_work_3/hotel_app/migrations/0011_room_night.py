@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0010_client_city_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Ночь')),
+                ('price', models.PositiveIntegerField(verbose_name='Стоимость ночи')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hotel_app.reservation', verbose_name='Бронирование')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hotel_app.room', verbose_name='Комната')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'room', 'price'], name='room_night_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reservation', 'date'), name='room_night_unique')],
+            },
+        ),
+    ]
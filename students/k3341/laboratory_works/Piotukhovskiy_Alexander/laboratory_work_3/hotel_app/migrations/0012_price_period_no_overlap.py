@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:38
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def trim_overlapping_periods(apps, schema_editor):
+    # Прежний расчёт брал цену ночи из первого по (start_date, id) периода, который её покрывает.
+    # Начало каждого периода сдвигается за уже покрытые ночи, полностью перекрытые периоды удаляются:
+    # цены всех ночей остаются прежними, а периоды перестают пересекаться
+    RoomPriceHistory = apps.get_model('hotel_app', 'RoomPriceHistory')
+    to_delete, to_update = [], []
+    covered_until, room_type_id = None, None
+    for period in RoomPriceHistory.objects.order_by('room_type_id', 'start_date', 'id'):
+        if period.room_type_id != room_type_id:
+            covered_until, room_type_id = None, period.room_type_id
+        if period.end_date is not None and period.end_date < period.start_date:
+            # Период без единой ночи не участвовал в расчёте
+            to_delete.append(period.pk)
+            continue
+        if covered_until == 'open':
+            to_delete.append(period.pk)
+            continue
+        elif covered_until is not None and covered_until >= period.start_date:
+            period.start_date = covered_until + timedelta(days=1)
+            if period.end_date is not None and period.end_date < period.start_date:
+                to_delete.append(period.pk)
+                continue
+            to_update.append(period)
+
+        if period.end_date is None:
+            covered_until = 'open'
+        elif covered_until is None or period.end_date > covered_until:
+            covered_until = period.end_date
+
+    RoomPriceHistory.objects.filter(pk__in=to_delete).delete()
+    RoomPriceHistory.objects.bulk_update(to_update, ['start_date'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0011_room_night'),
+    ]
+
+    operations = [
+        migrations.RunPython(trim_overlapping_periods, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='roompricehistory',
+            constraint=models.UniqueConstraint(fields=('room_type', 'start_date'), name='price_period_start_unique'),
+        ),
+    ]
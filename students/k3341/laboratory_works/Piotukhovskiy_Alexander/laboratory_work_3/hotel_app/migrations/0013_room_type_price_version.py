@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0012_price_period_no_overlap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomtype',
+            name='price_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия цен'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 21:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0013_room_type_price_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='roomtype',
+            name='price_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Версия цен'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_app', '0014_room_type_price_version_stamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelVersion',
+            fields=[
+                ('model', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Модель')),
+                ('version', models.PositiveBigIntegerField(verbose_name='Версия')),
+                ('changed_at', models.DateTimeField(verbose_name='Время изменения')),
+            ],
+        ),
+    ]
@@ -1,9 +1,15 @@
+import secrets
+
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Exists, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Cast, ExtractIsoWeekDay
+
+from .cache import invalidate
 
 
 class RoomType(models.Model):
@@ -21,6 +27,94 @@ class RoomType(models.Model):
     has_air_conditioning = models.BooleanField(default=False, verbose_name='Система кондиционирования')
     has_bathrobe_slippers = models.BooleanField(default=False, verbose_name='Халат и тапочки')
     has_balcony = models.BooleanField(default=False, verbose_name='Балкон')
+    # Меняется в транзакции каждой записи периодов цен: по ней воркеры сверяют тарифы в памяти (hotel_app.pricing)
+    price_version = models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Версия цен')
+
+
+class PriceOverlapError(IntegrityError):
+    pass
+
+
+def find_price_overlap(periods):
+    # periods - (id, start_date, end_date) одного типа номера, отсортированные по началу; end_date включительно
+    previous = None
+    for period in periods:
+        if period[2] is not None and period[2] < period[1]:
+            return period, None
+        if previous is not None and (previous[2] is None or previous[2] >= period[1]):
+            return previous, period
+        previous = period
+    return None
+
+
+def bump_price_versions(room_type_ids):
+    # Случайная, а не следующая версия: после отката транзакции её значение не выдаётся снова другим периодам,
+    # и тарифы, загруженные внутри откаченной транзакции, не совпадут с версией
+    RoomType.objects.filter(pk__in=room_type_ids).update(price_version=secrets.randbits(63))
+
+
+def check_price_periods(room_type_ids):
+    """
+    Проверяет, что периоды цен каждого типа номера не пересекаются, и бросает PriceOverlapError, если нет.
+    Вызывается после записи внутри её транзакции; строки типов номеров блокируются (select_for_update),
+    поэтому параллельные записи периодов одного типа проверяются по очереди. Версия цен типов меняется
+    в той же транзакции и становится видна вместе с новыми периодами.
+    """
+    room_type_ids = sorted(set(room_type_ids))
+    list(RoomType.objects.select_for_update().filter(pk__in=room_type_ids).values_list('pk', flat=True))
+    bump_price_versions(room_type_ids)
+    rows = RoomPriceHistory.objects.filter(room_type_id__in=room_type_ids).order_by(
+        'room_type_id', 'start_date', 'id').values_list('room_type_id', 'id', 'start_date', 'end_date')
+    by_type = {}
+    for room_type_id, *period in rows:
+        by_type.setdefault(room_type_id, []).append(tuple(period))
+    for room_type_id, periods in by_type.items():
+        overlap = find_price_overlap(periods)
+        if overlap is None:
+            continue
+        first, second = overlap
+        if second is None:
+            raise PriceOverlapError(f"Период цены {first[0]} заканчивается раньше, чем начинается.")
+        raise PriceOverlapError(f"Периоды цены {first[0]} и {second[0]} типа номера {room_type_id} пересекаются: "
+                                f"{first[1]} - {first[2] or 'бессрочно'} и {second[1]} - {second[2] or 'бессрочно'}.")
+
+
+class RoomPriceHistoryQuerySet(models.QuerySet):
+    """
+    Периоды цен одного типа номера не пересекаются: каждая запись (save(), bulk_create, bulk_update,
+    update) проверяется check_price_periods, которая меняет версию цен типов (см. hotel_app.pricing).
+    Закэшированные ответы сбрасываются после коммита, когда новые периоды уже видны.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            check_price_periods(period.room_type_id for period in objs)
+            transaction.on_commit(lambda: invalidate(RoomPriceHistory), using=self.db)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            room_types = set(self.filter(pk__in=[period.pk for period in objs]).values_list('room_type_id', flat=True))
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            check_price_periods(room_types | {period.room_type_id for period in objs})
+            transaction.on_commit(lambda: invalidate(RoomPriceHistory), using=self.db)
+        return updated
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            # Строки запоминаются до записи: после неё фильтр запроса может их уже не находить
+            rows = list(self.values_list('pk', 'room_type_id'))
+            updated = super().update(**kwargs)
+            room_types = {room_type_id for _, room_type_id in rows}
+            if 'room_type' in kwargs or 'room_type_id' in kwargs:
+                room_types |= set(self.model.objects.filter(pk__in=[pk for pk, _ in rows]).values_list(
+                    'room_type_id', flat=True))
+            check_price_periods(room_types)
+            transaction.on_commit(lambda: invalidate(RoomPriceHistory), using=self.db)
+        return updated
 
 
 class RoomPriceHistory(models.Model):
@@ -29,6 +123,84 @@ class RoomPriceHistory(models.Model):
     end_date = models.DateField(null=True, blank=True, verbose_name='Конец действия цены')
     price = models.PositiveIntegerField(verbose_name='Стоимость за сутки')
 
+    objects = RoomPriceHistoryQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Индекс поиска периода по типу номера и дате; у непересекающихся периодов начала различны
+            models.UniqueConstraint(fields=['room_type', 'start_date'], name='price_period_start_unique'),
+        ]
+
+    def clean(self):
+        # Та же проверка, что и при записи, но с ошибкой формы (админка)
+        if self.room_type_id is None or self.start_date is None:
+            return
+        periods = list(RoomPriceHistory.objects.filter(room_type_id=self.room_type_id).exclude(pk=self.pk).values_list(
+            'id', 'start_date', 'end_date'))
+        periods.append((self.pk, self.start_date, self.end_date))
+        overlap = find_price_overlap(sorted(periods, key=lambda period: period[1]))
+        if overlap is not None and overlap[1] is None:
+            raise ValidationError("Дата окончания не может быть раньше даты начала.")
+        if overlap is not None:
+            other = overlap[0] if overlap[1][0] == self.pk else overlap[1]
+            raise ValidationError(f"Период пересекается с периодом {other[1]} - {other[2] or 'бессрочно'}.")
+
+    def save(self, *args, **kwargs):
+        # При переносе периода на другой тип номера версия цен прежнего типа тоже меняется: его тарифы изменились
+        with transaction.atomic():
+            room_types = {self.room_type_id}
+            if self.pk is not None:
+                room_types |= set(RoomPriceHistory.objects.filter(pk=self.pk).values_list('room_type_id', flat=True))
+            super().save(*args, **kwargs)
+            check_price_periods(room_types)
+
+
+def room_state_prefetches(prefix=''):
+    # Текущая бронь и последняя уборка каждой комнаты загружаются двумя запросами на весь список
+    current_reservation = Reservation.objects.filter(
+        room=OuterRef('room'),
+        status__in=Reservation.CURRENT_STATUSES
+    ).order_by('-arrival_date', '-id')
+    last_cleaning = CleaningSchedule.objects.filter(
+        room=OuterRef('room')
+    ).order_by('-cleaning_date', '-id')
+
+    return [
+        Prefetch(
+            f'{prefix}reservation_set',
+            queryset=Reservation.objects.filter(
+                id=Subquery(current_reservation.values('id')[:1])
+            ).select_related('client'),
+            to_attr='current_reservations'
+        ),
+        Prefetch(
+            f'{prefix}cleaningschedule_set',
+            queryset=CleaningSchedule.objects.filter(
+                id=Subquery(last_cleaning.values('id')[:1])
+            ).select_related('cleaner__employee'),
+            to_attr='last_cleanings'
+        ),
+    ]
+
+
+class RoomQuerySet(models.QuerySet):
+    def with_current_state(self):
+        return self.select_related('type').prefetch_related(*room_state_prefetches())
+
+    # update() и bulk_update() не вызывают save(), поэтому отметку изменения для ETag ставят сами
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs, fields = list(objs), list(fields)
+        now = timezone.now()
+        for room in objs:
+            room.updated_at = now
+        if 'updated_at' not in fields:
+            fields.append('updated_at')
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
 
 class Room(models.Model):
     STATUS_CHOICES = [
@@ -43,6 +215,95 @@ class Room(models.Model):
     type = models.ForeignKey(RoomType, on_delete=models.CASCADE, verbose_name='Тип комнаты')
     status = models.CharField(max_length=len(max(STATUS_CHOICES, key=lambda x: len(x[0]))[0]), choices=STATUS_CHOICES, default='AVAILABLE', verbose_name='Статус комнаты')
     phone = models.CharField(max_length=11, verbose_name='Телефон в номере')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Время изменения')
+
+    objects = RoomQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='room_status_idx'),
+            models.Index(fields=['updated_at'], name='room_updated_idx'),
+        ]
+
+
+def normalize_city(city):
+    # Регистр, ё и лишние пробелы не влияют на поиск по городу
+    return ' '.join(city.split()).casefold().replace('ё', 'е') if city else ''
+
+
+def city_prefix_filter(prefix):
+    """
+    Города, начинающиеся с prefix, по индексу client_city_idx. SQLite сравнивает строки побайтно, и начало
+    строки задаётся диапазоном; в PostgreSQL порядок строк зависит от правил сортировки базы, поэтому там
+    используется LIKE 'prefix%' по индексу с varchar_pattern_ops.
+    """
+    if connection.vendor == 'sqlite':
+        return models.Q(city_normalized__gte=prefix, city_normalized__lt=prefix + '\U0010ffff')
+    return models.Q(city_normalized__startswith=prefix)
+
+
+class ClientQuerySet(models.QuerySet):
+    def overlapping_with(self, client_id, start_date=None, end_date=None):
+        # Клиенты, чьи проживания пересекаются хотя бы с одним проживанием заданного клиента, одним запросом
+        target_stays = Reservation.objects.filter(client_id=client_id)
+        if start_date:
+            target_stays = target_stays.filter(arrival_date__gte=start_date)
+        if end_date:
+            target_stays = target_stays.filter(departure_date__lte=end_date)
+
+        overlapping_stays = Reservation.objects.filter(client_id=OuterRef('pk')).filter(
+            Exists(target_stays.filter(
+                arrival_date__lt=OuterRef('departure_date'),
+                departure_date__gt=OuterRef('arrival_date'),
+            ))
+        )
+        return self.filter(Exists(overlapping_stays)).exclude(pk=client_id)
+
+    def search(self, room=None, start_date=None, end_date=None, city=None):
+        """
+        Поиск гостей одним запросом. Комната и даты относятся к одному проживанию и проверяются одним
+        подзапросом по броням; город ищется по началу нормализованного названия по индексу.
+        Подзапрос - id IN (...), а не коррелированный EXISTS: SQLite выполняет EXISTS отдельно для каждого
+        клиента, а IN - один раз (PostgreSQL планирует оба как одно полусоединение).
+        """
+        queryset = self
+        if room or start_date or end_date:
+            stays = Reservation.objects.all()
+            if room:
+                stays = stays.filter(room__number=room)
+            if start_date:
+                stays = stays.filter(departure_date__gte=start_date)
+            if end_date:
+                stays = stays.filter(arrival_date__lte=end_date)
+            queryset = queryset.filter(id__in=stays.values('client_id'))
+
+        if city:
+            queryset = queryset.filter(city_prefix_filter(normalize_city(city)))
+        return queryset
+
+    # bulk_create, bulk_update и update не вызывают save(), поэтому нормализованный город заполняют сами
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for client in objs:
+            client.city_normalized = normalize_city(client.city_from)
+        update_fields = kwargs.get('update_fields')
+        if update_fields and 'city_from' in update_fields and 'city_normalized' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'city_normalized']
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs, fields = list(objs), list(fields)
+        if 'city_from' in fields:
+            for client in objs:
+                client.city_normalized = normalize_city(client.city_from)
+            fields.append('city_normalized')
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        # bulk_update передаёт сюда выражения CASE и уже посчитанный city_normalized
+        if isinstance(kwargs.get('city_from'), str) and 'city_normalized' not in kwargs:
+            kwargs['city_normalized'] = normalize_city(kwargs['city_from'])
+        return super().update(**kwargs)
 
 
 class Client(models.Model):
@@ -51,6 +312,31 @@ class Client(models.Model):
     last_name = models.CharField(max_length=50, verbose_name="Фамилия")
     middle_name = models.CharField(max_length=50, blank=True, null=True, verbose_name="Отчество")
     city_from = models.CharField(max_length=50, verbose_name='Город')
+    # Город для поиска (см. normalize_city); заполняется в save() и массовых операциях ClientQuerySet
+    city_normalized = models.CharField(max_length=50, default='', editable=False, verbose_name='Город для поиска')
+
+    objects = ClientQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['city_normalized'], name='client_city_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.city_normalized = normalize_city(self.city_from)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'city_from' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'city_normalized'}
+        super().save(*args, **kwargs)
+
+
+class ReservationQuerySet(models.QuerySet):
+    def with_room_state(self):
+        return self.select_related('client', 'room__type').prefetch_related(*room_state_prefetches('room__'))
+
+    def update(self, **kwargs):
+        kwargs.setdefault('last_updated_date', timezone.now())
+        return super().update(**kwargs)
 
 
 class Reservation(models.Model):
@@ -67,13 +353,14 @@ class Reservation(models.Model):
         ('UNPAID', 'Не оплачен'),
         ('REFUNDED', 'Возврат')
     ]
+    CURRENT_STATUSES = ['CONFIRMED', 'CHECKED_IN']
 
     room = models.ForeignKey(Room, on_delete=models.CASCADE, verbose_name='Комната')
     client = models.ForeignKey(Client, on_delete=models.CASCADE, verbose_name='Клиент')
     admin = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Администратор', related_name="reservations_created")
     booking_date = models.DateField(default=timezone.now, verbose_name='Дата бронирования')
     updated_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Обновивший администратор", related_name="reservations_updated")
-    last_updated_date = models.DateTimeField(default=timezone.now, verbose_name="Дата последнего обновления")
+    last_updated_date = models.DateTimeField(auto_now=True, verbose_name="Дата последнего обновления")
 
     arrival_date = models.DateField(verbose_name='Дата заселения')
     departure_date = models.DateField(verbose_name='Дата выселения')
@@ -82,6 +369,27 @@ class Reservation(models.Model):
     price_at_booking = models.PositiveIntegerField(verbose_name='Стоимость при бронировании')
     final_price = models.PositiveIntegerField(verbose_name='Стоимость при бронировании')
 
+    objects = ReservationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'arrival_date', 'departure_date'], name='reservation_room_dates_idx'),
+            models.Index(fields=['client', 'arrival_date', 'departure_date'], name='reservation_client_dates_idx'),
+            # Брони, попадающие в период без привязки к номеру и клиенту: живой квартальный отчёт, поиск клиентов
+            models.Index(fields=['arrival_date', 'departure_date'], name='reservation_dates_idx'),
+            # max(last_updated_date) для ETag читается из конца индекса
+            models.Index(fields=['last_updated_date'], name='reservation_updated_idx'),
+            # status и payment_status не индексируются: они фильтруют строки, найденные по датам или номеру,
+            # и почти ничего не отсекают (см. 0007_index_plan)
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Значения из базы нужны обработчикам сигналов, чтобы обновить и старую, и новую ячейку отчёта
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class EmployeePosition(models.Model):
     name = models.CharField(max_length=50, unique=True, verbose_name='Название должности')
@@ -103,6 +411,13 @@ class EmploymentContract(models.Model):
     termination_date = models.DateField(null=True, blank=True, verbose_name='Дата расторжения')
     is_active = models.BooleanField(default=True, verbose_name='Активный контракт')
 
+    class Meta:
+        constraints = [
+            # Частичный уникальный индекс: у сотрудника не больше одного активного контракта,
+            # он же обслуживает поиск активного контракта по сотруднику
+            models.UniqueConstraint(fields=['employee'], condition=models.Q(is_active=True),
+                                    name='one_active_contract_per_employee'),
+        ]
 
     def terminate_contract(self, termination_date=None):
         if termination_date is None:
@@ -114,12 +429,103 @@ class EmploymentContract(models.Model):
         self.save()
 
 
+class EmployeeQuerySet(models.QuerySet):
+    def with_current_position(self):
+        # Активный контракт (он у сотрудника один) с должностью загружается одним запросом на весь список
+        return self.prefetch_related(Prefetch(
+            'employmentcontract_set',
+            queryset=EmploymentContract.objects.filter(is_active=True).select_related('position'),
+            to_attr='active_contracts'
+        ))
+
+
 class Employee(models.Model):
     passport_number = models.CharField(max_length=10, unique=True, verbose_name='Номер паспорта')
     first_name = models.CharField(max_length=50, verbose_name="Имя")
     last_name = models.CharField(max_length=50, verbose_name="Фамилия")
     middle_name = models.CharField(max_length=50, blank=True, null=True, verbose_name="Отчество")
 
+    objects = EmployeeQuerySet.as_manager()
+
+
+ROSTER_BATCH_SIZE = 500
+
+
+def refresh_cleaning_roster(room_ids):
+    """
+    Пересобирает строки RoomCleaningRoster по всем уборкам указанных комнат. Сводка вставляется
+    одним INSERT ... SELECT на пачку комнат: SELECT с GROUP BY строит ORM, строки не проходят через Python.
+    """
+    room_ids = sorted(set(room_ids))
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(RoomCleaningRoster._meta.get_field(name).column)
+                        for name in ('room', 'weekday', 'cleaner', 'cleanings'))
+    for start in range(0, len(room_ids), ROSTER_BATCH_SIZE):
+        batch = room_ids[start:start + ROSTER_BATCH_SIZE]
+        RoomCleaningRoster.objects.filter(room_id__in=batch).delete()
+        summary = CleaningSchedule.objects.filter(room_id__in=batch).values(
+            'room_id', 'weekday', 'cleaner_id'
+        ).annotate(cleanings=models.Count('id')).order_by()
+        sql, params = summary.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {quote(RoomCleaningRoster._meta.db_table)} ({columns}) {sql}', params)
+
+
+class CleaningScheduleQuerySet(models.QuerySet):
+    """
+    Массовые операции сами заполняют weekday и обновляют RoomCleaningRoster,
+    так что bulk_create/bulk_update/update/delete можно вызывать из любого места.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for schedule in objs:
+            schedule.weekday = schedule.cleaning_date.isoweekday()
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            refresh_cleaning_roster(schedule.room_id for schedule in objs)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs, fields = list(objs), list(fields)
+        if 'cleaning_date' in fields:
+            for schedule in objs:
+                schedule.weekday = schedule.cleaning_date.isoweekday()
+            fields.append('weekday')
+        with transaction.atomic(using=self.db):
+            rooms = set(self.filter(pk__in=[schedule.pk for schedule in objs]).values_list('room_id', flat=True))
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            refresh_cleaning_roster(rooms | {schedule.room_id for schedule in objs})
+        return updated
+
+    def update(self, **kwargs):
+        if 'cleaning_date' in kwargs:
+            cleaning_date = kwargs['cleaning_date']
+            # Выражения вроде F('cleaning_date') + timedelta(...) считаются базой по той же строке;
+            # дата плюс интервал имеет тип даты-времени, поэтому выражение приводится к дате
+            if hasattr(cleaning_date, 'resolve_expression'):
+                cleaning_date = Cast(cleaning_date, models.DateField())
+            else:
+                cleaning_date = Value(cleaning_date, output_field=models.DateField())
+            kwargs['weekday'] = ExtractIsoWeekDay(cleaning_date)
+        with transaction.atomic(using=self.db):
+            # Строки запоминаются до записи: после неё фильтр запроса может их уже не находить
+            rows = list(self.values_list('pk', 'room_id'))
+            updated = super().update(**kwargs)
+            rooms = {room_id for _, room_id in rows}
+            if 'room' in kwargs or 'room_id' in kwargs:
+                rooms |= set(self.model.objects.filter(pk__in=[pk for pk, _ in rows]).values_list(
+                    'room_id', flat=True))
+            refresh_cleaning_roster(rooms)
+        return updated
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            rooms = set(self.values_list('room_id', flat=True))
+            deleted = super().delete()
+            refresh_cleaning_roster(rooms)
+        return deleted
+
 
 class CleaningSchedule(models.Model):
     STATUS_CHOICES = [
@@ -131,4 +537,116 @@ class CleaningSchedule(models.Model):
     cleaner = models.ForeignKey(EmploymentContract, on_delete=models.CASCADE, verbose_name='Сотрудник')
     room = models.ForeignKey(Room, on_delete=models.CASCADE, verbose_name='Комната')
     cleaning_date = models.DateField(verbose_name='Дата уборки')
+    # День недели даты уборки (1 - понедельник, 7 - воскресенье): фильтр по нему идёт по индексу
+    weekday = models.PositiveSmallIntegerField(editable=False, verbose_name='День недели')
     status = models.CharField(max_length=len(max(STATUS_CHOICES, key=lambda x: len(x[0]))[0]), choices=STATUS_CHOICES, default='PENDING', verbose_name='Статус уборки')
+
+    objects = CleaningScheduleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'weekday'], name='cleaning_room_weekday_idx'),
+            # Последняя уборка номера и окно планировщика по датам
+            models.Index(fields=['room', 'cleaning_date'], name='cleaning_room_date_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Прежняя комната нужна, чтобы при переносе уборки обновить расписание обеих комнат
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.weekday = self.cleaning_date.isoweekday()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            rooms = {self.room_id, getattr(self, '_loaded_values', {}).get('room_id')}
+            refresh_cleaning_roster(rooms - {None})
+        self._loaded_values = {'room_id': self.room_id}
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            refresh_cleaning_roster([self.room_id])
+        return deleted
+
+
+class RoomCleaningRoster(models.Model):
+    """
+    Кто и в какие дни недели убирает комнату: сводка CleaningSchedule по (комната, день недели, уборщик).
+    Обновляется при каждой записи расписания (см. CleaningScheduleQuerySet) и удаляется каскадно вместе
+    с комнатой или контрактом.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, verbose_name='Комната')
+    weekday = models.PositiveSmallIntegerField(verbose_name='День недели')
+    cleaner = models.ForeignKey(EmploymentContract, on_delete=models.CASCADE, verbose_name='Сотрудник')
+    cleanings = models.PositiveIntegerField(verbose_name='Число уборок')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'weekday', 'cleaner'], name='cleaning_roster_unique'),
+        ]
+
+
+class QuarterlyRoomReport(models.Model):
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, verbose_name='Комната')
+    year = models.PositiveIntegerField(verbose_name='Год')
+    quarter = models.PositiveSmallIntegerField(verbose_name='Квартал')
+    client_count = models.PositiveIntegerField(default=0, verbose_name='Число клиентов')
+    paid_count = models.PositiveIntegerField(default=0, verbose_name='Число оплаченных бронирований')
+    income = models.PositiveBigIntegerField(default=0, verbose_name='Доход')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'quarter', 'room'], name='quarterly_report_cell_unique'),
+        ]
+
+
+class RoomNight(models.Model):
+    """
+    Проданная ночь: строка на каждую ночь проживания (кроме отменённых броней) с долей итоговой цены брони.
+    Заполняется и обновляется hotel_app.analytics; по таблице считаются загрузка, ADR и RevPAR за любой период.
+    """
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, verbose_name='Бронирование')
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, verbose_name='Комната')
+    date = models.DateField(verbose_name='Ночь')
+    price = models.PositiveIntegerField(verbose_name='Стоимость ночи')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reservation', 'date'], name='room_night_unique'),
+        ]
+        indexes = [
+            # Сводки за период читают только индекс
+            models.Index(fields=['date', 'room', 'price'], name='room_night_date_idx'),
+        ]
+
+
+class OutboxEvent(models.Model):
+    """Журнал изменений комнат и броней: потребители читают события по возрастанию id, не опрашивая таблицы целиком."""
+    TOPIC_CHOICES = [
+        ('room.status', 'Статус комнаты'),
+        ('reservation.status', 'Статус бронирования'),
+        ('reservation.updated', 'Изменение бронирования'),
+    ]
+
+    topic = models.CharField(max_length=50, choices=TOPIC_CHOICES, verbose_name='Тема')
+    object_id = models.PositiveBigIntegerField(verbose_name='ID объекта')
+    payload = models.JSONField(default=dict, verbose_name='Данные события')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Время события')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['topic', 'id'], name='outbox_topic_id_idx'),
+        ]
+
+
+class ModelVersion(models.Model):
+    """
+    Версия и время последнего изменения модели в базе (см. hotel_app.cache.invalidate): по ним условные GET
+    всех воркеров видят удаления и изменения моделей без отметки изменения, каким бы ни был бэкенд кэша.
+    """
+    model = models.CharField(max_length=100, primary_key=True, verbose_name='Модель')
+    version = models.PositiveBigIntegerField(verbose_name='Версия')
+    changed_at = models.DateTimeField(verbose_name='Время изменения')
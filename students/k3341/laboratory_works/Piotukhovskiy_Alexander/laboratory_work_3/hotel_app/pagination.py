@@ -0,0 +1,16 @@
+from rest_framework.pagination import CursorPagination
+
+
+class HotelCursorPagination(CursorPagination):
+    # Keyset-пагинация по первичному ключу: страница выбирается по индексу, без OFFSET
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Постраничный вывод включается только явно, чтобы не ломать клиентов, ожидающих полный список
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,142 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.db.models import Q
+
+from .models import RoomPriceHistory, RoomType
+
+
+class PriceLine(NamedTuple):
+    start_date: object
+    end_date: object
+    nights: int
+    price: int
+
+    @property
+    def subtotal(self):
+        return self.nights * self.price
+
+    def as_dict(self):
+        return {
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "nights": self.nights,
+            "price": self.price,
+            "subtotal": self.subtotal,
+        }
+
+
+class StayQuote(NamedTuple):
+    total: int
+    breakdown: list
+
+
+def get_price_periods(room_type_id, arrival_date, departure_date):
+    # Только периоды, пересекающиеся с проживанием: их число не зависит от количества ночей
+    return list(
+        RoomPriceHistory.objects.filter(
+            Q(end_date__isnull=True) | Q(end_date__gte=arrival_date),
+            room_type_id=room_type_id,
+            start_date__lt=departure_date,
+        )
+        .order_by('start_date', 'id')
+        .values_list('start_date', 'end_date', 'price')
+    )
+
+
+def price_stay(periods, arrival_date, departure_date):
+    """
+    Пересекает интервал проживания [arrival_date, departure_date) с ценовыми периодами.
+
+    periods - последовательность (start_date, end_date, price), отсортированная по start_date;
+    end_date включительно, None - бессрочный период. Если периоды пересекаются, ночь
+    оплачивается по первому подходящему периоду, ночи без цены стоят 0.
+    """
+    uncovered = [(arrival_date, departure_date)] if arrival_date < departure_date else []
+    breakdown = []
+
+    for start_date, end_date, price in periods:
+        if not uncovered:
+            break
+
+        period_end = departure_date if end_date is None else end_date + timedelta(days=1)
+        remaining = []
+        for segment_start, segment_end in uncovered:
+            lo = max(segment_start, start_date)
+            hi = min(segment_end, period_end)
+            if lo >= hi:
+                remaining.append((segment_start, segment_end))
+                continue
+
+            breakdown.append(PriceLine(lo, hi, (hi - lo).days, price))
+            if segment_start < lo:
+                remaining.append((segment_start, lo))
+            if hi < segment_end:
+                remaining.append((hi, segment_end))
+        uncovered = remaining
+
+    breakdown.sort(key=lambda line: line.start_date)
+    return StayQuote(sum(line.subtotal for line in breakdown), breakdown)
+
+
+class TariffTable:
+    """
+    Периоды цен одного типа номера, отсортированные по началу. Периоды не пересекаются (см. check_price_periods),
+    поэтому период, действующий в день заезда, - последний начавшийся не позже него: он и остальные периоды
+    проживания находятся бинарным поиском по началам, за O(log n) от числа периодов.
+    """
+
+    def __init__(self, periods):
+        self.periods = periods
+        self.starts = [start_date for start_date, _, _ in periods]
+
+    def covering(self, arrival_date, departure_date):
+        first = max(bisect_right(self.starts, arrival_date) - 1, 0)
+        return self.periods[first:bisect_left(self.starts, departure_date)]
+
+    def quote(self, arrival_date, departure_date):
+        return price_stay(self.covering(arrival_date, departure_date), arrival_date, departure_date)
+
+
+_tariffs_lock = threading.Lock()
+# {room_type_id: (price_version, TariffTable)}
+_tariffs = {}
+
+
+def tariff_tables(room_type_ids):
+    """
+    Тарифы типов номеров из памяти процесса: {room_type_id: TariffTable}. Запись периодов меняет
+    price_version типа номера в своей транзакции (см. check_price_periods), и таблицы сверяются с ней
+    одним запросом по первичному ключу: периоды загружаются заново, только когда версия изменилась.
+    Версия хранится в базе, а не в кэше, поэтому изменения цен из других воркеров видны сразу после
+    коммита и с кэшем в памяти процесса.
+    """
+    room_type_ids = set(room_type_ids)
+    # Версия читается раньше периодов: таблица не бывает старше своей версии
+    versions = dict(RoomType.objects.filter(pk__in=room_type_ids).values_list('pk', 'price_version'))
+    with _tariffs_lock:
+        tables = {
+            room_type_id: _tariffs[room_type_id][1] for room_type_id in room_type_ids
+            if room_type_id in _tariffs and _tariffs[room_type_id][0] == versions.get(room_type_id)
+        }
+
+    missing = room_type_ids - tables.keys()
+    if missing:
+        periods = defaultdict(list)
+        rows = RoomPriceHistory.objects.filter(room_type_id__in=missing).order_by(
+            'room_type_id', 'start_date').values_list('room_type_id', 'start_date', 'end_date', 'price')
+        for room_type_id, *period in rows:
+            periods[room_type_id].append(tuple(period))
+        loaded = {room_type_id: TariffTable(periods[room_type_id]) for room_type_id in missing}
+        with _tariffs_lock:
+            _tariffs.update((room_type_id, (versions.get(room_type_id), table))
+                            for room_type_id, table in loaded.items())
+        tables.update(loaded)
+    return tables
+
+
+def quote_stay(room_type_id, arrival_date, departure_date):
+    return tariff_tables([room_type_id])[room_type_id].quote(arrival_date, departure_date)
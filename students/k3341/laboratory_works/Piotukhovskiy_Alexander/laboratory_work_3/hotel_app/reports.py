@@ -0,0 +1,195 @@
+import calendar
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Q, Sum, Count, F, ExpressionWrapper, IntegerField
+from django.db.models.functions import Substr, ExtractYear, ExtractQuarter
+
+from .models import Reservation, Room, QuarterlyRoomReport
+
+CLIENT_STATUSES = ['BOOKED', 'CONFIRMED', 'CHECKED_IN', 'CHECKED_OUT']
+PAID_STATUSES = ['PREPAID', 'PAID']
+
+
+def quarter_date_range(quarter, year):
+    start_month = (quarter - 1) * 3 + 1
+    end_month = start_month + 2
+    return date(year, start_month, 1), date(year, end_month, calendar.monthrange(year, end_month)[1])
+
+
+def report_cell(room_id, arrival_date, departure_date):
+    # Бронь попадает в отчёт квартала, только если заезд и выезд лежат в одном квартале
+    quarter = (arrival_date.month - 1) // 3 + 1
+    if arrival_date.year != departure_date.year or quarter != (departure_date.month - 1) // 3 + 1:
+        return None
+    return room_id, arrival_date.year, quarter
+
+
+def reservation_cells(reservation):
+    cells = {report_cell(reservation.room_id, reservation.arrival_date, reservation.departure_date)}
+
+    loaded = getattr(reservation, '_loaded_values', None)
+    if loaded and {'room_id', 'arrival_date', 'departure_date'} <= loaded.keys():
+        cells.add(report_cell(loaded['room_id'], loaded['arrival_date'], loaded['departure_date']))
+
+    cells.discard(None)
+    return cells
+
+
+def refresh_report_cells(cells):
+    """
+    Пересчитывает ячейки отчёта: на каждый квартал один агрегирующий запрос по броням затронутых
+    номеров (идёт по индексу (room, arrival_date)) и один upsert, так что пакет броней обновляет
+    отчёт за число запросов, не зависящее от числа номеров.
+    """
+    by_quarter = defaultdict(set)
+    for room_id, year, quarter in cells:
+        by_quarter[year, quarter].add(room_id)
+
+    with transaction.atomic():
+        for (year, quarter), room_ids in by_quarter.items():
+            start_date, end_date = quarter_date_range(quarter, year)
+            totals = Reservation.objects.filter(
+                room_id__in=room_ids,
+                arrival_date__gte=start_date,
+                departure_date__lte=end_date,
+            ).values('room_id').annotate(
+                client_count=Count('id', filter=Q(status__in=CLIENT_STATUSES)),
+                paid_count=Count('id', filter=Q(payment_status__in=PAID_STATUSES)),
+                income=Sum('price_at_booking', filter=Q(payment_status__in=PAID_STATUSES)),
+            ).filter(Q(client_count__gt=0) | Q(paid_count__gt=0)).order_by()
+
+            rows = [
+                QuarterlyRoomReport(room_id=row['room_id'], year=year, quarter=quarter,
+                                    client_count=row['client_count'], paid_count=row['paid_count'],
+                                    income=row['income'] or 0)
+                for row in totals
+            ]
+            QuarterlyRoomReport.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['year', 'quarter', 'room'],
+                update_fields=['client_count', 'paid_count', 'income'],
+            )
+            empty = room_ids - {row.room_id for row in rows}
+            if empty:
+                QuarterlyRoomReport.objects.filter(room_id__in=empty, year=year, quarter=quarter).delete()
+
+
+def rebuild_quarterly_report(batch_size=5000):
+    cells = (
+        Reservation.objects.annotate(
+            year=ExtractYear('arrival_date'),
+            quarter=ExtractQuarter('arrival_date'),
+            departure_year=ExtractYear('departure_date'),
+            departure_quarter=ExtractQuarter('departure_date'),
+        )
+        .filter(year=F('departure_year'), quarter=F('departure_quarter'))
+        .values('room_id', 'year', 'quarter')
+        .annotate(
+            client_count=Count('id', filter=Q(status__in=CLIENT_STATUSES)),
+            paid_count=Count('id', filter=Q(payment_status__in=PAID_STATUSES)),
+            income=Sum('price_at_booking', filter=Q(payment_status__in=PAID_STATUSES)),
+        )
+        .filter(Q(client_count__gt=0) | Q(paid_count__gt=0))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        QuarterlyRoomReport.objects.all().delete()
+        rows = [
+            QuarterlyRoomReport(
+                room_id=cell['room_id'],
+                year=cell['year'],
+                quarter=cell['quarter'],
+                client_count=cell['client_count'],
+                paid_count=cell['paid_count'],
+                income=cell['income'] or 0,
+            )
+            for cell in cells.iterator(chunk_size=batch_size)
+        ]
+        QuarterlyRoomReport.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def quarter_cells(quarter, year):
+    return list(
+        QuarterlyRoomReport.objects.filter(year=year, quarter=quarter)
+        .order_by('room__number')
+        .values_list('room__number', 'client_count', 'paid_count', 'income')
+    )
+
+
+def floor_room_counts():
+    return Counter(int(str(number)[0]) for number in Room.objects.values_list('number', flat=True))
+
+
+def read_quarterly_report(quarter, year):
+    return build_quarterly_report(quarter_cells(quarter, year), floor_room_counts())
+
+
+def build_quarterly_report(cells, floors):
+    return {
+        "clients_per_room": [
+            {"room__number": number, "client_count": client_count}
+            for number, client_count, _, _ in cells if client_count
+        ],
+        "rooms_per_floor": [{"floor": floor, "room_count": floors[floor]} for floor in sorted(floors)],
+        "income_per_room": [
+            {"room__number": number, "total_income": income}
+            for number, _, paid_count, income in cells if paid_count
+        ],
+        "total_income": sum(income for _, _, _, income in cells),
+    }
+
+
+def live_quarterly_report(start_date, end_date):
+    # Расчёт отчёта напрямую по Reservation, без предрасчитанной таблицы
+    clients_per_room = (
+        Reservation.objects.filter(
+            arrival_date__gte=start_date,
+            departure_date__lte=end_date,
+            status__in=CLIENT_STATUSES
+        )
+        .values('room__number')
+        .annotate(client_count=Count('id'))
+        .order_by('room__number')
+    )
+
+    rooms_per_floor = (
+        Room.objects.annotate(
+            floor=ExpressionWrapper(
+                Substr(F('number'), 1, 1),
+                output_field=IntegerField()
+            )
+        )
+        .values('floor')
+        .annotate(room_count=Count('id'))
+        .order_by('floor')
+    )
+
+    income_per_room = (
+        Reservation.objects.filter(
+            arrival_date__gte=start_date,
+            departure_date__lte=end_date,
+            payment_status__in=PAID_STATUSES,
+        )
+        .values('room__number')
+        .annotate(total_income=Sum('price_at_booking'))
+        .order_by('room__number')
+    )
+
+    total_income = (
+        Reservation.objects.filter(
+            arrival_date__gte=start_date,
+            departure_date__lte=end_date,
+            payment_status__in=PAID_STATUSES
+        )
+        .aggregate(total_income=Sum('price_at_booking'))['total_income']
+    ) or 0
+
+    return {
+        "clients_per_room": list(clients_per_room),
+        "rooms_per_floor": list(rooms_per_floor),
+        "income_per_room": list(income_per_room),
+        "total_income": total_income,
+    }
@@ -0,0 +1,220 @@
+"""
+Генератор правдоподобных данных гостиницы для нагрузочных замеров: типы номеров с сезонными ценами,
+номера по этажам, клиенты, непересекающиеся брони с согласованными статусами и ценами,
+уборщики и расписание уборок. Всё пишется через bulk_create пачками, поэтому объём
+ограничен только временем; производные таблицы (квартальный отчёт, статусы номеров) пересчитываются в конце.
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .analytics import rebuild_room_nights
+from .cache import invalidate
+from .cleaning import CLEANER_POSITION, split_evenly
+from .models import RoomType, RoomPriceHistory, Room, Client, Reservation, Employee, EmployeePosition, \
+    EmploymentContract, CleaningSchedule
+from .pricing import price_stay
+from .reports import rebuild_quarterly_report
+
+ROOM_TYPES = [
+    # название, мест, базовая цена
+    ('Одноместный', 1, 3000),
+    ('Двухместный', 2, 4500),
+    ('Семейный', 4, 7000),
+    ('Люкс', 2, 12000),
+]
+CITIES = ['Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск', 'Екатеринбург', 'Нижний Новгород', 'Самара',
+          'Краснодар', 'Владивосток', 'Калининград']
+FIRST_NAMES = ['Иван', 'Анна', 'Пётр', 'Мария', 'Алексей', 'Елена', 'Дмитрий', 'Ольга']
+LAST_NAMES = ['Иванов', 'Петрова', 'Сидоров', 'Смирнова', 'Кузнецов', 'Попова', 'Соколов', 'Морозова']
+# Наценка по месяцам: лето и новогодние праздники дороже
+SEASON_MARKUP = {1: 1.2, 6: 1.3, 7: 1.4, 8: 1.4, 12: 1.3}
+ROOMS_PER_FLOOR = 50
+
+
+def _month_start(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _free_passport_prefix(model):
+    # Двухсимвольный префикс, которого ещё нет среди паспортов: повторные запуски не нарушают уникальность
+    for prefix in (f'{letter}{digit}' for letter in 'SGXYZ' for digit in range(10)):
+        if not model.objects.filter(passport_number__startswith=prefix).exists():
+            return prefix
+    raise RuntimeError("Свободные префиксы номеров паспорта закончились.")
+
+
+class HotelDataGenerator:
+    def __init__(self, rooms=200, clients=10000, reservations=100000, cleaners=20, days=None, cleaning_days=30,
+                 seed=42, batch_size=10000, today=None, log=None):
+        self.rooms_count = rooms
+        self.clients_count = clients
+        self.reservations_count = reservations
+        self.cleaners_count = cleaners
+        self.today = today or date.today()
+        # По умолчанию период подбирается под загрузку номеров около 75%; пятая часть периода - будущие брони
+        self.days = days or max(60, reservations // max(1, rooms) * 7)
+        self.first_day = _month_start(self.today - timedelta(days=self.days * 4 // 5), 0)
+        self.cleaning_days = cleaning_days
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+    def generate(self):
+        with transaction.atomic():
+            self.admin = User.objects.create_user(username=f'seed-admin-{time.time_ns()}')
+            self.prices = self.create_room_types()
+            self.rooms = self.create_rooms()
+            self.client_ids = self.create_clients()
+            self.create_reservations()
+            self.create_cleaning_schedule()
+
+            # bulk_create не отправляет сигналы: производные данные и кэш обновляются явно
+            self.counts['quarterly_report_cells'] = rebuild_quarterly_report()
+            self.counts['room_nights'] = rebuild_room_nights()
+            invalidate(RoomType, RoomPriceHistory, Room, Client, Reservation, Employee, EmploymentContract,
+                       CleaningSchedule)
+        return self.counts
+
+    def _bulk_create(self, model, objs):
+        created = 0
+        batch = []
+        for obj in objs:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                created += len(model.objects.bulk_create(batch))
+                batch = []
+        created += len(model.objects.bulk_create(batch))
+        self.counts[model._meta.model_name] = self.counts.get(model._meta.model_name, 0) + created
+        self.log(f"{model._meta.model_name}: {created}")
+        return created
+
+    def create_room_types(self):
+        # По периоду цены на каждый месяц с сезонной наценкой; последний период бессрочный
+        tag = time.time_ns()
+        prices = {}
+        periods = []
+        months = (self.days + self.first_day.day) // 28 + 2
+        for name, capacity, base_price in ROOM_TYPES:
+            room_type = RoomType.objects.create(name=f'{name} {tag}', capacity=capacity, has_wifi=True,
+                                                has_tv=capacity > 1, has_safe=base_price > 5000)
+            prices[room_type.id] = []
+            for month in range(months):
+                start_date = _month_start(self.first_day, month)
+                end_date = None if month == months - 1 else _month_start(self.first_day, month + 1) - timedelta(days=1)
+                price = int(base_price * SEASON_MARKUP.get(start_date.month, 1.0)) // 100 * 100
+                prices[room_type.id].append((start_date, end_date, price))
+                periods.append(RoomPriceHistory(room_type=room_type, start_date=start_date, end_date=end_date,
+                                                price=price))
+        self._bulk_create(RoomPriceHistory, periods)
+        return prices
+
+    def create_rooms(self):
+        max_number = Room.objects.order_by('-number').values_list('number', flat=True).first() or 0
+        first_floor = max_number // 100 + 1
+        room_type_ids = list(self.prices)
+        rooms = [
+            Room(number=(first_floor + index // ROOMS_PER_FLOOR) * 100 + index % ROOMS_PER_FLOOR + 1,
+                 type_id=self.rng.choices(room_type_ids, weights=[5, 8, 3, 1])[0],
+                 phone=f'8{index:010d}')
+            for index in range(self.rooms_count)
+        ]
+        self._bulk_create(Room, rooms)
+        return list(Room.objects.filter(number__in=[room.number for room in rooms]).values_list('id', 'type_id'))
+
+    def create_clients(self):
+        prefix = _free_passport_prefix(Client)
+        self._bulk_create(Client, (
+            Client(passport_number=f'{prefix}{index:08d}', first_name=self.rng.choice(FIRST_NAMES),
+                   last_name=self.rng.choice(LAST_NAMES), city_from=self.rng.choice(CITIES))
+            for index in range(self.clients_count)
+        ))
+        return list(Client.objects.filter(passport_number__startswith=prefix).values_list('id', flat=True))
+
+    def _stay_status(self, arrival_date, departure_date):
+        if self.rng.random() < 0.07:
+            return 'CANCELLED', 'REFUNDED' if self.rng.random() < 0.5 else 'UNPAID'
+        if departure_date <= self.today:
+            return 'CHECKED_OUT', 'PAID'
+        if arrival_date <= self.today:
+            return 'CHECKED_IN', 'PAID'
+        return self.rng.choice(['BOOKED', 'CONFIRMED']), self.rng.choice(['UNPAID', 'PREPAID'])
+
+    def _reservations(self):
+        # Брони каждого номера идут друг за другом с промежутками, поэтому номер никогда не занят дважды
+        per_room, extra = divmod(self.reservations_count, len(self.rooms))
+        # Средняя бронь около 5 ночей, средний промежуток gap / 2: брони номера укладываются примерно в days дней
+        gap = max(1, 2 * (self.days // max(1, per_room) - 5))
+        for index, (room_id, type_id) in enumerate(self.rooms):
+            day = self.first_day + timedelta(days=self.rng.randint(0, gap))
+            for _ in range(per_room + (index < extra)):
+                arrival_date = day
+                departure_date = arrival_date + timedelta(days=self.rng.choice([1, 2, 3, 3, 4, 5, 7, 10, 14]))
+                status, payment_status = self._stay_status(arrival_date, departure_date)
+                price = price_stay(self.prices[type_id], arrival_date, departure_date).total
+                yield Reservation(
+                    room_id=room_id,
+                    client_id=self.rng.choice(self.client_ids),
+                    admin=self.admin,
+                    booking_date=arrival_date - timedelta(days=self.rng.randint(0, 60)),
+                    arrival_date=arrival_date,
+                    departure_date=departure_date,
+                    status=status,
+                    payment_status=payment_status,
+                    price_at_booking=price,
+                    final_price=price,
+                )
+                day = departure_date + timedelta(days=self.rng.randint(0, gap))
+
+    def create_reservations(self):
+        self._bulk_create(Reservation, self._reservations())
+
+        # Статус номера согласован с текущими бронями: занятые номера OCCUPIED, часть свободных ждёт уборки
+        room_ids = [room_id for room_id, _ in self.rooms]
+        occupied = set(Reservation.objects.filter(
+            room_id__in=room_ids, status='CHECKED_IN'
+        ).values_list('room_id', flat=True))
+        free = [room_id for room_id in room_ids if room_id not in occupied]
+        requires_cleaning = set(self.rng.sample(free, len(free) // 5))
+        Room.objects.filter(pk__in=occupied).update(status='OCCUPIED')
+        Room.objects.filter(pk__in=requires_cleaning).update(status='REQUIRES_CLEANING')
+
+    def create_cleaning_schedule(self):
+        position, _ = EmployeePosition.objects.get_or_create(name=CLEANER_POSITION, defaults={'salary': 35000})
+        prefix = _free_passport_prefix(Employee)
+        self._bulk_create(Employee, (
+            Employee(passport_number=f'{prefix}{index:08d}', first_name=self.rng.choice(FIRST_NAMES),
+                     last_name=self.rng.choice(LAST_NAMES))
+            for index in range(self.cleaners_count)
+        ))
+        employee_ids = Employee.objects.filter(passport_number__startswith=prefix).values_list('id', flat=True)
+        self._bulk_create(EmploymentContract, (
+            EmploymentContract(employee_id=employee_id, position=position, contract_type='PERMANENT',
+                               start_date=self.first_day)
+            for employee_id in employee_ids
+        ))
+        contract_ids = list(EmploymentContract.objects.filter(
+            employee_id__in=employee_ids, is_active=True
+        ).order_by('id').values_list('id', flat=True))
+        if not contract_ids:
+            return
+
+        # Каждый день все номера делятся между уборщиками поровну; прошедшие уборки завершены
+        room_ids = [room_id for room_id, _ in self.rooms]
+        assignment = split_evenly(room_ids, contract_ids)
+        first_day = self.today - timedelta(days=self.cleaning_days // 2)
+        self._bulk_create(CleaningSchedule, (
+            CleaningSchedule(cleaner_id=assignment[room_id], room_id=room_id, cleaning_date=day,
+                             status='COMPLETED' if day < self.today else 'PENDING')
+            for day in (first_day + timedelta(days=offset) for offset in range(self.cleaning_days))
+            for room_id in room_ids
+        ))
+
+
+def generate_hotel_data(**options):
+    return HotelDataGenerator(**options).generate()
@@ -3,7 +3,13 @@ from datetime import datetime
 from rest_framework import serializers
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from django.contrib.auth.models import User
-from .models import Client, Room, Employee, EmploymentContract, EmployeePosition, Reservation, CleaningSchedule
+from django.db import models
+from .analytics import BUCKETS
+from .cache import cached_many
+from .fastpath import ValuesMapper
+from .metrics import SerializerTimingMixin
+from .models import Client, Room, Employee, EmploymentContract, EmployeePosition, Reservation, CleaningSchedule, \
+    OutboxEvent
 
 
 class CustomUserSerializer(UserSerializer):
@@ -20,13 +26,17 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         fields = ('id', 'username', 'email', 'password', 'first_name', 'last_name')
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Client
         fields = ['id', 'passport_number', 'first_name', 'last_name', 'middle_name', 'city_from']
 
 
-class RoomSerializer(serializers.ModelSerializer):
+# Быстрый путь ClientSerializer для длинных списков (см. hotel_app.fastpath)
+CLIENT_VALUES = ValuesMapper(Client, {field: field for field in ClientSerializer.Meta.fields})
+
+
+class RoomSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     type_id = serializers.IntegerField(source='type.id', read_only=True)
     type_name = serializers.CharField(source='type.name', read_only=True)
     current_client = serializers.SerializerMethodField()
@@ -40,16 +50,24 @@ class RoomSerializer(serializers.ModelSerializer):
         if obj.status == 'AVAILABLE':
             return None
 
-        reservation = Reservation.objects.filter(
-            room=obj,
-            status__in=['CONFIRMED', 'CHECKED_IN']
-        ).order_by('-arrival_date').first()
+        if hasattr(obj, 'current_reservations'):
+            reservation = next(iter(obj.current_reservations), None)
+        else:
+            reservation = Reservation.objects.filter(
+                room=obj,
+                status__in=Reservation.CURRENT_STATUSES
+            ).select_related('client').order_by('-arrival_date', '-id').first()
 
         if reservation:
             return ClientSerializer(reservation.client).data
 
     def get_last_cleaner(self, obj):
-        last_cleaning = CleaningSchedule.objects.order_by('-cleaning_date').first()
+        if hasattr(obj, 'last_cleanings'):
+            last_cleaning = next(iter(obj.last_cleanings), None)
+        else:
+            last_cleaning = CleaningSchedule.objects.filter(
+                room=obj
+            ).select_related('cleaner__employee').order_by('-cleaning_date', '-id').first()
 
         if last_cleaning:
             cleaner = last_cleaning.cleaner.employee
@@ -64,6 +82,26 @@ class RoomSerializer(serializers.ModelSerializer):
         return None
 
 
+class AvailableRoomSerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    type_id = serializers.IntegerField(source='type.id', read_only=True)
+    type_name = serializers.CharField(source='type.name', read_only=True)
+
+    class Meta:
+        model = Room
+        fields = ['id', 'number', 'type_id', 'type_name', 'phone', 'status']
+
+
+class FreeRoomsSearchSerializer(serializers.Serializer):
+    start_date = serializers.DateField(required=True)
+    end_date = serializers.DateField(required=True)
+    room_type = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if data['end_date'] <= data['start_date']:
+            raise serializers.ValidationError({"end_date": "Дата выезда должна быть позже даты заселения."})
+        return data
+
+
 class ClientStayOverlapSerializer(serializers.Serializer):
     client_id = serializers.IntegerField(required=True)
     start_date = serializers.DateField(required=False)
@@ -79,7 +117,7 @@ class ClientStayOverlapSerializer(serializers.Serializer):
         return data
 
 
-class CleaningEmployeeSerializer(serializers.ModelSerializer):
+class CleaningEmployeeSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Employee
         fields = ['id', 'first_name', 'last_name', 'middle_name']
@@ -104,7 +142,7 @@ class ClientRoomCleaningSerializer(serializers.Serializer):
         return super().to_internal_value(data)
 
 
-class EmploymentContractDetailSerializer(serializers.ModelSerializer):
+class EmploymentContractDetailSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     employee_id = serializers.IntegerField(source='employee.id', read_only=True)
     employee_first_name = serializers.CharField(source='employee.first_name', read_only=True)
     employee_last_name = serializers.CharField(source='employee.last_name', read_only=True)
@@ -245,7 +283,22 @@ class UpdateCleaningScheduleSerializer(serializers.Serializer):
         return value
 
 
-class CreateReservationSerializer(serializers.Serializer):
+class CleaningPlanSerializer(serializers.Serializer):
+    MAX_DAYS = 92
+
+    start_date = serializers.DateField(required=True)
+    end_date = serializers.DateField(required=True)
+    dry_run = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("Дата окончания не может быть раньше даты начала.")
+        if (data['end_date'] - data['start_date']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"Период планирования не может быть длиннее {self.MAX_DAYS} дней.")
+        return data
+
+
+class BookingItemSerializer(serializers.Serializer):
     passport_number = serializers.CharField(max_length=10, required=True)
     first_name = serializers.CharField(max_length=50, required=True)
     last_name = serializers.CharField(max_length=50, required=True)
@@ -257,6 +310,14 @@ class CreateReservationSerializer(serializers.Serializer):
     status = serializers.ChoiceField(choices=Reservation.STATUS_CHOICES, required=False)
     payment_status = serializers.ChoiceField(choices=Reservation.PAYMENT_STATUS_CHOICES, required=False)
 
+    def validate(self, data):
+        # Комнаты пакета проверяются одним запросом в hotel_app.booking
+        if data['departure_date'] <= data['arrival_date']:
+            raise serializers.ValidationError({"departure_date": "Дата выезда должна быть позже даты заселения."})
+        return data
+
+
+class CreateReservationSerializer(BookingItemSerializer):
     def validate(self, data):
         room_number = data['room_number']
         arrival_date = data['arrival_date']
@@ -277,6 +338,14 @@ class CreateReservationSerializer(serializers.Serializer):
         return data
 
 
+class BatchReservationSerializer(serializers.Serializer):
+    MAX_ITEMS = 500
+
+    # Брони проверяются по одной в hotel_app.booking, чтобы ошибка одной не отклоняла весь пакет
+    reservations = serializers.ListField(child=serializers.JSONField(), allow_empty=False, max_length=MAX_ITEMS)
+    all_or_nothing = serializers.BooleanField(required=False, default=False)
+
+
 class UpdateReservationSerializer(serializers.Serializer):
     arrival_date = serializers.DateField(required=False)
     departure_date = serializers.DateField(required=False)
@@ -329,7 +398,25 @@ class QuarterlyReportSerializer(serializers.Serializer):
         return data
 
 
-class ReservationSerializer(serializers.ModelSerializer):
+class OccupancyReportSerializer(serializers.Serializer):
+    # Не больше десяти лет: по дням это 3 660 строк на тип номера
+    MAX_DAYS = 3660
+
+    start_date = serializers.DateField(required=True)
+    end_date = serializers.DateField(required=True)
+    bucket = serializers.ChoiceField(choices=BUCKETS, required=False, default='day')
+    room_type = serializers.IntegerField(min_value=1, required=False)
+    by_room_type = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("Дата окончания не может быть раньше даты начала.")
+        if (data['end_date'] - data['start_date']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"Период не может быть длиннее {self.MAX_DAYS} дней.")
+        return data
+
+
+class ReservationSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     client = ClientSerializer(read_only=True)
     room = RoomSerializer(read_only=True)
 
@@ -353,11 +440,42 @@ class ReservationSerializer(serializers.ModelSerializer):
 
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+POSITION_CACHE_MODELS = [EmploymentContract, EmployeePosition]
+
+
+def position_data(position):
+    return {
+        'id': position.id,
+        'name': position.name,
+        'salary': position.salary,
+    }
+
+
+def active_positions(employee_ids):
+    positions = {}
+    contracts = EmploymentContract.objects.filter(
+        employee_id__in=employee_ids, is_active=True
+    ).select_related('position').order_by('id')
+    for contract in contracts:
+        positions.setdefault(contract.employee_id, position_data(contract.position))
+    return positions
+
+
+class EmployeeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Должности всех сотрудников списка читаются из кэша одним обращением
+        employees = list(data.all() if isinstance(data, models.Manager) else data)
+        if not all(hasattr(employee, 'active_contracts') for employee in employees):
+            self.child.preload_positions(employees)
+        return super().to_representation(employees)
+
+
+class EmployeeSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     position = serializers.SerializerMethodField()
 
     class Meta:
         model = Employee
+        list_serializer_class = EmployeeListSerializer
         fields = [
             'id',
             'passport_number',
@@ -367,18 +485,20 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'position',
         ]
 
+    def preload_positions(self, employees):
+        self._positions = cached_many('employee-position', POSITION_CACHE_MODELS,
+                                      [employee.id for employee in employees], active_positions)
+
     def get_position(self, obj):
-        active_contract = EmploymentContract.objects.filter(employee=obj, is_active=True).first()
-        if active_contract and active_contract.position:
-            return {
-                'id': active_contract.position.id,
-                'name': active_contract.position.name,
-                'salary': active_contract.position.salary,
-            }
-        return None
+        # Employee.objects.with_current_position() уже загрузил активный контракт с должностью
+        if hasattr(obj, 'active_contracts'):
+            return position_data(obj.active_contracts[0].position) if obj.active_contracts else None
+        if obj.id not in getattr(self, '_positions', {}):
+            self.preload_positions([obj])
+        return self._positions[obj.id]
 
 
-class EmployeePositionSerializer(serializers.ModelSerializer):
+class EmployeePositionSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = EmployeePosition
         fields = [
@@ -388,7 +508,7 @@ class EmployeePositionSerializer(serializers.ModelSerializer):
         ]
 
 
-class CleaningScheduleSerializer(serializers.ModelSerializer):
+class CleaningScheduleSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     cleaner = serializers.SerializerMethodField()
     room = serializers.SerializerMethodField()
 
@@ -411,4 +531,48 @@ class CleaningScheduleSerializer(serializers.ModelSerializer):
             'number': obj.room.number,
             'type_id': obj.room.type.id,
             'type_name': obj.room.type.name,
-        }
\ No newline at end of file
+        }
+
+
+# Быстрый путь CleaningScheduleSerializer: сотрудник и комната читаются в той же строке values_list
+CLEANING_SCHEDULE_VALUES = ValuesMapper(CleaningSchedule, {
+    'id': 'id',
+    'cleaner': {
+        'id': 'cleaner__employee__id',
+        'first_name': 'cleaner__employee__first_name',
+        'last_name': 'cleaner__employee__last_name',
+        'middle_name': 'cleaner__employee__middle_name',
+    },
+    'room': {
+        'id': 'room__id',
+        'number': 'room__number',
+        'type_id': 'room__type__id',
+        'type_name': 'room__type__name',
+    },
+    'cleaning_date': 'cleaning_date',
+    'status': 'status',
+})
+
+
+class OutboxEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OutboxEvent
+        fields = ['id', 'topic', 'object_id', 'payload', 'created_at']
+
+
+class ChangeFeedSerializer(serializers.Serializer):
+    MAX_WAIT = 30
+
+    after = serializers.IntegerField(min_value=0, required=False, default=0)
+    # Несколько тем - через запятую
+    topic = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, required=False, default=100)
+    wait = serializers.IntegerField(min_value=0, max_value=MAX_WAIT, required=False, default=25)
+
+    def validate_topic(self, value):
+        topics = [topic.strip() for topic in value.split(',') if topic.strip()]
+        known = {choice[0] for choice in OutboxEvent.TOPIC_CHOICES}
+        unknown = [topic for topic in topics if topic not in known]
+        if unknown:
+            raise serializers.ValidationError(f"Неизвестные темы: {', '.join(unknown)}.")
+        return topics
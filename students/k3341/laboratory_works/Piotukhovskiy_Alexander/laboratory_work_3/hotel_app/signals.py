@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .analytics import refresh_room_nights
+from .cache import invalidate
+from .models import Reservation, Room, RoomType, RoomPriceHistory, Client, CleaningSchedule, Employee, \
+    EmployeePosition, EmploymentContract, bump_price_versions
+from .reports import reservation_cells, refresh_report_cells
+
+# Модели, от которых зависят закэшированные ответы (см. hotel_app.cache). Периоды цен сбрасывают кэш
+# отдельным обработчиком, после коммита
+CACHED_MODELS = [Room, RoomType, EmployeePosition, EmploymentContract, Employee, Client, Reservation, CleaningSchedule]
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def refresh_quarterly_report(sender, instance, **kwargs):
+    refresh_report_cells(reservation_cells(instance))
+    instance._loaded_values = {
+        'room_id': instance.room_id,
+        'arrival_date': instance.arrival_date,
+        'departure_date': instance.departure_date,
+    }
+
+
+@receiver(post_save, sender=Reservation)
+def refresh_reservation_nights(sender, instance, **kwargs):
+    # Удалённая бронь удаляет свои ночи каскадно
+    refresh_room_nights([instance.pk])
+
+
+def invalidate_cache(sender, **kwargs):
+    invalidate(sender)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_cache, sender=model, dispatch_uid=f'invalidate-cache-{model._meta.label_lower}')
+    post_delete.connect(invalidate_cache, sender=model, dispatch_uid=f'invalidate-cache-{model._meta.label_lower}')
+
+
+@receiver(post_save, sender=RoomPriceHistory)
+@receiver(post_delete, sender=RoomPriceHistory)
+def invalidate_price_history(sender, instance, **kwargs):
+    # Сохранение меняет версию цен в check_price_periods, удаление - здесь, в той же транзакции
+    if kwargs['signal'] is post_delete:
+        bump_price_versions([instance.room_type_id])
+    transaction.on_commit(lambda: invalidate(RoomPriceHistory))
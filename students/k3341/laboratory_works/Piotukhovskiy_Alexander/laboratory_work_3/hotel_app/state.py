@@ -0,0 +1,135 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db import connection, transaction
+
+from .cache import invalidate
+from .models import Room, OutboxEvent
+
+# Из какого статуса брони в какие можно перейти
+RESERVATION_TRANSITIONS = {
+    'BOOKED': {'CONFIRMED', 'CHECKED_IN', 'CANCELLED'},
+    'CONFIRMED': {'CHECKED_IN', 'CANCELLED'},
+    'CHECKED_IN': {'CHECKED_OUT'},
+    'CHECKED_OUT': set(),
+    'CANCELLED': set(),
+}
+
+# Поля брони, изменения которых (кроме статуса) пишутся в outbox событием reservation.updated
+RESERVATION_TRACKED_FIELDS = ['room_id', 'arrival_date', 'departure_date', 'payment_status', 'price_at_booking']
+
+# Из какого статуса комнаты в какие можно перейти автоматически. Комнату с обслуживания
+# снимают только вручную (transition_rooms(..., force=True) из RoomViewSet)
+ROOM_TRANSITIONS = {
+    'AVAILABLE': {'OCCUPIED', 'REQUIRES_CLEANING', 'MAINTENANCE'},
+    'OCCUPIED': {'AVAILABLE', 'REQUIRES_CLEANING', 'MAINTENANCE'},
+    'REQUIRES_CLEANING': {'CLEANING_IN_PROGRESS', 'AVAILABLE', 'MAINTENANCE'},
+    'CLEANING_IN_PROGRESS': {'AVAILABLE', 'REQUIRES_CLEANING', 'MAINTENANCE'},
+    'MAINTENANCE': set(),
+}
+
+
+class TransitionError(Exception):
+    pass
+
+
+def check_reservation_transition(current_status, new_status):
+    if new_status != current_status and new_status not in RESERVATION_TRANSITIONS[current_status]:
+        raise TransitionError(f"Недопустимый переход статуса бронирования: {current_status} → {new_status}.")
+
+
+def room_status_after(previous_status, new_status):
+    # Статус комнаты, который следует из смены статуса брони, или None, если комната не меняется
+    if new_status == previous_status:
+        return None
+    if new_status == 'CANCELLED' and previous_status != 'CHECKED_IN':
+        return 'AVAILABLE'
+    if new_status == 'CHECKED_OUT' and previous_status == 'CHECKED_IN':
+        return 'REQUIRES_CLEANING'
+    return None
+
+
+def _room_sources(new_status):
+    return [status for status, targets in ROOM_TRANSITIONS.items() if new_status in targets]
+
+
+def transition_rooms(changes, force=False):
+    """
+    Переводит комнаты в новые статусы: {room_id: статус}. На каждый целевой статус выполняется один
+    UPDATE ... WHERE status IN (допустимые исходные статусы), так что недопустимые переходы
+    (например, комната на обслуживании) пропускаются. force снимает проверку переходов.
+    Для изменённых комнат в outbox пишутся события room.status. Возвращает {room_id: (старый, новый)}.
+    """
+    if not changes:
+        return {}
+
+    with transaction.atomic():
+        rooms = Room.objects.filter(pk__in=changes)
+        if connection.features.has_select_for_update:
+            rooms = rooms.select_for_update()
+        current = dict(rooms.values_list('pk', 'status'))
+        by_target = defaultdict(list)
+        for room_id, new_status in changes.items():
+            old_status = current.get(room_id)
+            if old_status is None or old_status == new_status:
+                continue
+            if force or new_status in ROOM_TRANSITIONS[old_status]:
+                by_target[new_status].append(room_id)
+
+        applied = {}
+        for new_status, room_ids in by_target.items():
+            rooms = Room.objects.filter(pk__in=room_ids)
+            if not force:
+                rooms = rooms.filter(status__in=_room_sources(new_status))
+            rooms.update(status=new_status)
+            applied.update((room_id, (current[room_id], new_status)) for room_id in room_ids)
+
+        if applied:
+            OutboxEvent.objects.bulk_create(
+                OutboxEvent(topic='room.status', object_id=room_id, payload={"from": old, "to": new})
+                for room_id, (old, new) in applied.items()
+            )
+            # update() не отправляет сигналы, поэтому кэш сбрасывается явно
+            invalidate(Room)
+    return applied
+
+
+def record_reservation_status(reservation, previous_status):
+    if reservation.status == previous_status:
+        return None
+    return OutboxEvent.objects.create(
+        topic='reservation.status',
+        object_id=reservation.id,
+        payload={"from": previous_status, "to": reservation.status, "room_id": reservation.room_id},
+    )
+
+
+def record_reservation_statuses(reservations, previous_status=None):
+    # Пакетный вариант record_reservation_status для броней, сохранённых через bulk_create
+    return OutboxEvent.objects.bulk_create(
+        OutboxEvent(
+            topic='reservation.status',
+            object_id=reservation.id,
+            payload={"from": previous_status, "to": reservation.status, "room_id": reservation.room_id},
+        )
+        for reservation in reservations if reservation.status != previous_status
+    )
+
+
+def reservation_snapshot(reservation):
+    return {field: getattr(reservation, field) for field in RESERVATION_TRACKED_FIELDS}
+
+
+def record_reservation_update(reservation, before):
+    # before - reservation_snapshot до изменения; в событие попадают новые значения изменённых полей
+    changes = {
+        field: value.isoformat() if isinstance(value, date) else value
+        for field, value in reservation_snapshot(reservation).items() if value != before[field]
+    }
+    if not changes:
+        return None
+    return OutboxEvent.objects.create(
+        topic='reservation.updated',
+        object_id=reservation.id,
+        payload={"changes": changes, "room_id": reservation.room_id},
+    )
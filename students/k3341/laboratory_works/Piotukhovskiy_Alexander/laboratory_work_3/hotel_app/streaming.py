@@ -0,0 +1,72 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .fastpath import FastJSONRenderer
+
+STREAM_QUERY_PARAM = 'stream'
+
+
+def wants_stream(request):
+    return request.query_params.get(STREAM_QUERY_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def iter_serialized_chunks(queryset, serializer_class, context=None, chunk_size=500):
+    # Строки читаются курсором порциями по chunk_size и сразу сериализуются: таблица целиком в память не попадает
+    renderer = JSONRenderer()
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        data = serializer_class(chunk, many=True, context=context).data
+        yield [renderer.render(item) for item in data]
+
+
+def iter_mapped_chunks(queryset, mapper, chunk_size=500):
+    # То же для представлений с values_mapper: строки читаются через values_list без экземпляров моделей
+    renderer = FastJSONRenderer()
+    rows = queryset.values_list(*mapper.lookups).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield [renderer.render(item) for item in mapper.map_rows(chunk)]
+
+
+def iter_json_list(chunks, results_key=None):
+    yield b'[' if results_key is None else b'{"' + results_key.encode() + b'":['
+
+    count = 0
+    for chunk in chunks:
+        yield (b',' if count else b'') + b','.join(chunk)
+        count += len(chunk)
+
+    yield b']' if results_key is None else b'],"count":' + str(count).encode() + b'}'
+
+
+class StreamingListMixin:
+    stream_chunk_size = 500
+    stream_results_key = None
+
+    def stream_queryset(self, queryset, serializer_class=None):
+        values_mapper = getattr(self, 'values_mapper', None)
+        if values_mapper is not None and serializer_class is None:
+            chunks = iter_mapped_chunks(queryset.order_by('pk'), values_mapper, self.stream_chunk_size)
+        else:
+            chunks = iter_serialized_chunks(
+                queryset.order_by('pk'),
+                serializer_class or self.get_serializer_class(),
+                self.get_serializer_context(),
+                self.stream_chunk_size
+            )
+        return StreamingHttpResponse(
+            iter_json_list(chunks, self.stream_results_key),
+            content_type='application/json'
+        )
+
+    def list(self, request, *args, **kwargs):
+        if wants_stream(request):
+            return self.stream_queryset(self.filter_queryset(self.get_queryset()))
+        return super().list(request, *args, **kwargs)
@@ -1,3 +1,1409 @@
-from django.test import TestCase
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .models import RoomType, RoomPriceHistory, Room, Client, Reservation, Employee, EmployeePosition, OutboxEvent, \
+    EmploymentContract, CleaningSchedule, RoomCleaningRoster, QuarterlyRoomReport, RoomNight, PriceOverlapError
+from . import changefeed, fastpath
+from .analytics import rebuild_room_nights
+from .availability import lock_room, overlapping_reservations
+from .benchmarks import hotel_get_urls, hotel_url
+from .cache import invalidate
+from .fastpath import FastJSONRenderer
+from .metrics import HISTOGRAM
+from .pricing import price_stay, quote_stay, tariff_tables
+from .seeding import HotelDataGenerator
+from .serializers import ClientSerializer, CleaningScheduleSerializer
+from .state import transition_rooms
+from .throttling import EndpointRateThrottle, reset_throttles
+from .reports import read_quarterly_report, live_quarterly_report, quarter_date_range, rebuild_quarterly_report
+
+
+class HotelAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='admin')
+        cls.room_type = RoomType.objects.create(name='Одноместный', capacity=1)
+
+    def setUp(self):
+        # Откат транзакции теста не затрагивает кэш и счётчики ограничения частоты
+        cache.clear()
+        reset_throttles()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_room(self, number, status='AVAILABLE', room_type=None):
+        return Room.objects.create(number=number, type=room_type or self.room_type, status=status, phone='1234567890')
+
+    def create_client(self, passport_number, city_from='Москва'):
+        return Client.objects.create(passport_number=passport_number, first_name='Иван', last_name='Иванов',
+                                     city_from=city_from)
+
+    def create_reservation(self, room, client, arrival_date, departure_date, status='CONFIRMED', **kwargs):
+        kwargs.setdefault('price_at_booking', 1000)
+        kwargs.setdefault('final_price', kwargs['price_at_booking'])
+        return Reservation.objects.create(room=room, client=client, admin=self.admin, arrival_date=arrival_date,
+                                          departure_date=departure_date, status=status, **kwargs)
+
+    def create_cleaner(self, passport_number):
+        position, _ = EmployeePosition.objects.get_or_create(name='Уборщик', defaults={'salary': 30000})
+        employee = Employee.objects.create(passport_number=passport_number, first_name='Анна', last_name='Петрова')
+        return EmploymentContract.objects.create(employee=employee, position=position, contract_type='PERMANENT',
+                                                 start_date=date(2024, 1, 1))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+
+class PriceStayTests(SimpleTestCase):
+    def test_splits_stay_by_periods(self):
+        periods = [
+            (date(2024, 1, 1), date(2024, 1, 10), 1000),
+            (date(2024, 1, 11), None, 1500),
+        ]
+        quote = price_stay(periods, date(2024, 1, 8), date(2024, 1, 13))
+
+        self.assertEqual(quote.total, 3 * 1000 + 2 * 1500)
+        self.assertEqual(
+            [(line.start_date, line.end_date, line.nights) for line in quote.breakdown],
+            [(date(2024, 1, 8), date(2024, 1, 11), 3), (date(2024, 1, 11), date(2024, 1, 13), 2)]
+        )
+
+    def test_first_period_wins_on_overlap(self):
+        periods = [
+            (date(2024, 1, 1), date(2024, 1, 5), 1000),
+            (date(2024, 1, 3), date(2024, 1, 10), 2000),
+        ]
+        quote = price_stay(periods, date(2024, 1, 1), date(2024, 1, 8))
+
+        self.assertEqual(quote.total, 5 * 1000 + 2 * 2000)
+
+    def test_nights_without_price_are_free(self):
+        periods = [(date(2024, 1, 5), date(2024, 1, 5), 1000)]
+        quote = price_stay(periods, date(2024, 1, 1), date(2024, 1, 10))
+
+        self.assertEqual(quote.total, 1000)
+        self.assertEqual(len(quote.breakdown), 1)
+
+
+class ReservationPricingTests(HotelAPITestCase):
+    def test_reservation_price_uses_all_periods(self):
+        RoomPriceHistory.objects.create(room_type=self.room_type, start_date=date(2024, 1, 1),
+                                        end_date=date(2024, 6, 30), price=1000)
+        RoomPriceHistory.objects.create(room_type=self.room_type, start_date=date(2024, 7, 1), price=2000)
+        self.create_room(101)
+
+        response = self.client.post('/hotel/reservation', {
+            'passport_number': '1234567890',
+            'first_name': 'Иван',
+            'last_name': 'Иванов',
+            'city_from': 'Москва',
+            'room_number': 101,
+            'arrival_date': '2024-06-29',
+            'departure_date': '2024-07-03',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['price_at_booking'], 2 * 1000 + 2 * 2000)
+        self.assertEqual([line['nights'] for line in response.data['price_breakdown']], [2, 2])
+
+
+class PriceHistoryTests(HotelAPITestCase):
+    def add_period(self, start_date, end_date, price, room_type=None):
+        return RoomPriceHistory.objects.create(room_type=room_type or self.room_type, start_date=start_date,
+                                               end_date=end_date, price=price)
+
+    def assertOverlapRejected(self, write):
+        with self.assertRaises(PriceOverlapError), transaction.atomic():
+            write()
+
+    def test_periods_of_room_type_cannot_overlap(self):
+        winter = self.add_period(date(2024, 1, 1), date(2024, 2, 29), 1000)
+        spring = self.add_period(date(2024, 3, 1), None, 1500)
+        other_type = RoomType.objects.create(name='Люкс', capacity=2)
+        self.add_period(date(2024, 2, 1), None, 5000, room_type=other_type)
+
+        self.assertOverlapRejected(lambda: self.add_period(date(2024, 2, 20), date(2024, 2, 25), 900))
+        self.assertOverlapRejected(lambda: self.add_period(date(2025, 1, 1), None, 2000))
+        self.assertOverlapRejected(
+            lambda: RoomPriceHistory.objects.filter(pk=winter.pk).update(end_date=date(2024, 3, 1)))
+        self.assertOverlapRejected(lambda: RoomPriceHistory.objects.bulk_create([
+            RoomPriceHistory(room_type=self.room_type, start_date=date(2023, 1, 1), end_date=date(2024, 1, 1), price=1)
+        ]))
+        with self.assertRaises(ValidationError):
+            RoomPriceHistory(room_type=self.room_type, start_date=date(2024, 2, 1), price=1).full_clean()
+
+        # Закрыть бессрочный период и добавить следующий можно
+        spring.end_date = date(2024, 5, 31)
+        spring.save()
+        self.add_period(date(2024, 6, 1), None, 2000)
+
+        body = ("room_type_id,start_date,end_date,price\n"
+                f"{self.room_type.id},2024-06-10,2024-06-20,3000\n")
+        response = self.client.generic('POST', '/hotel/bulk/price-history/import', body.encode(),
+                                       content_type='text/csv')
+        self.assertEqual(response.data['created'], 0)
+        self.assertIn('пересекаются', response.data['errors'][0]['errors']['non_field_errors'][0])
+        self.assertEqual(RoomPriceHistory.objects.filter(room_type=self.room_type).count(), 3)
+
+    def test_quotes_come_from_tariff_tables_in_memory(self):
+        for month in range(1, 13):
+            self.add_period(date(2024, month, 1), date(2024, month, 28), 1000 * month)
+        self.add_period(date(2025, 1, 1), None, 20000)
+        quote_stay(self.room_type.id, date(2024, 1, 1), date(2024, 1, 2))
+
+        # Расчёт сверяет версию цен типа номера одним запросом, периоды берутся из памяти
+        with self.assertNumQueries(3):
+            quote = quote_stay(self.room_type.id, date(2024, 2, 27), date(2024, 3, 2))
+            self.assertEqual(quote.total, 2 * 2000 + 3000)
+            self.assertEqual(quote_stay(self.room_type.id, date(2024, 12, 31), date(2025, 1, 3)).total, 2 * 20000)
+            self.assertEqual(tariff_tables([self.room_type.id])[self.room_type.id].covering(
+                date(2024, 5, 10), date(2024, 7, 1)), [(date(2024, 5, 1), date(2024, 5, 28), 5000),
+                                                       (date(2024, 6, 1), date(2024, 6, 28), 6000)])
+
+        # Изменение цены сбрасывает таблицы по версии в базе
+        RoomPriceHistory.objects.filter(start_date=date(2024, 3, 1)).update(price=3500)
+        self.assertEqual(quote_stay(self.room_type.id, date(2024, 2, 27), date(2024, 3, 2)).total, 2 * 2000 + 3500)
+
+    def test_price_changes_from_other_processes_are_seen(self):
+        period = self.add_period(date(2024, 1, 1), None, 1000)
+        self.assertEqual(quote_stay(self.room_type.id, date(2024, 6, 1), date(2024, 6, 3)).total, 2000)
+
+        # Другой процесс с кэшем в своей памяти: версии в кэше этого процесса не меняются
+        with mock.patch('hotel_app.cache._bump'):
+            RoomPriceHistory.objects.filter(pk=period.pk).update(price=1200)
+            self.assertEqual(quote_stay(self.room_type.id, date(2024, 6, 1), date(2024, 6, 3)).total, 2400)
+            period.refresh_from_db()
+            period.price = 1300
+            period.save()
+            self.assertEqual(quote_stay(self.room_type.id, date(2024, 6, 1), date(2024, 6, 3)).total, 2600)
+            period.delete()
+            self.assertEqual(quote_stay(self.room_type.id, date(2024, 6, 1), date(2024, 6, 3)).total, 0)
+
+    def test_moving_period_to_other_room_type_refreshes_both_tariffs(self):
+        period = self.add_period(date(2024, 1, 1), None, 100)
+        other_type = RoomType.objects.create(name='Люкс', capacity=2)
+        self.assertEqual(quote_stay(self.room_type.id, date(2024, 2, 1), date(2024, 2, 3)).total, 200)
+        self.assertEqual(quote_stay(other_type.id, date(2024, 2, 1), date(2024, 2, 3)).total, 0)
+
+        period.room_type = other_type
+        period.save()
+        self.assertEqual(quote_stay(self.room_type.id, date(2024, 2, 1), date(2024, 2, 3)).total, 0)
+        self.assertEqual(quote_stay(other_type.id, date(2024, 2, 1), date(2024, 2, 3)).total, 200)
+
+
+class RoomStateQueryCountTests(HotelAPITestCase):
+    def add_occupied_rooms(self, count):
+        cleaner = self.create_cleaner(f'C{Room.objects.count():09d}')
+        for _ in range(count):
+            index = Room.objects.count()
+            room = self.create_room(100 + index, status='OCCUPIED')
+            client = self.create_client(f'{index:010d}')
+            self.create_reservation(room, client, date(2024, 1, 1), date(2024, 1, 5))
+            CleaningSchedule.objects.create(cleaner=cleaner, room=room, cleaning_date=date(2024, 1, 2))
+
+    def test_rooms_listing_does_not_scale_queries(self):
+        self.add_occupied_rooms(2)
+        small = self.count_queries('/hotel/rooms')
+        self.add_occupied_rooms(10)
+        self.assertEqual(self.count_queries('/hotel/rooms'), small)
+
+    def test_reservations_listing_does_not_scale_queries(self):
+        self.add_occupied_rooms(2)
+        small = self.count_queries('/hotel/api/reservations/')
+        self.add_occupied_rooms(10)
+        self.assertEqual(self.count_queries('/hotel/api/reservations/'), small)
+
+    def test_room_state_is_per_room(self):
+        self.add_occupied_rooms(2)
+        response = self.client.get('/hotel/rooms')
+
+        for room in response.data['rooms']:
+            reservation = Reservation.objects.get(room_id=room['id'])
+            self.assertEqual(room['current_client']['id'], reservation.client_id)
+            self.assertEqual(room['last_cleaner']['cleaning_date'], date(2024, 1, 2))
+
+
+class PaginationAndStreamingTests(HotelAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            self.create_client(f'{index:010d}')
+
+    def test_full_list_without_pagination_params(self):
+        response = self.client.get('/hotel/api/clients/')
+
+        self.assertEqual(len(response.data), 5)
+
+    def test_cursor_pagination_walks_all_pages(self):
+        ids = []
+        url = '/hotel/api/clients/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            ids += [client['id'] for client in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(ids, sorted(Client.objects.values_list('id', flat=True)))
+
+    def test_custom_list_pagination(self):
+        response = self.client.get('/hotel/clients', {'page_size': 3})
+
+        self.assertEqual(len(response.data['clients']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_stream_matches_regular_list(self):
+        regular = self.client.get('/hotel/api/clients/')
+        streamed = self.client.get('/hotel/api/clients/', {'stream': 'true'})
+
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(json.loads(b''.join(streamed.streaming_content)), json.loads(regular.content))
+
+    def test_custom_list_stream_counts_rows(self):
+        streamed = self.client.get('/hotel/clients', {'stream': 'true'})
+        data = json.loads(b''.join(streamed.streaming_content))
+
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len(data['clients']), 5)
+
+
+class AvailabilityTests(HotelAPITestCase):
+    def booking(self, room_number, arrival_date, departure_date, passport_number='1234567890'):
+        return {
+            'passport_number': passport_number,
+            'first_name': 'Иван',
+            'last_name': 'Иванов',
+            'city_from': 'Москва',
+            'room_number': room_number,
+            'arrival_date': arrival_date,
+            'departure_date': departure_date,
+        }
+
+    def test_overlapping_booking_is_rejected(self):
+        room = self.create_room(101)
+        self.create_reservation(room, self.create_client('0000000001'), date(2024, 5, 1), date(2024, 5, 5),
+                                status='BOOKED')
+
+        response = self.client.post('/hotel/reservation', self.booking(101, '2024-05-04', '2024-05-08'), format='json')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_patch_into_booked_dates_is_rejected(self):
+        room = self.create_room(101)
+        client = self.create_client('0000000001')
+        self.create_reservation(room, client, date(2024, 5, 1), date(2024, 5, 5))
+        other = self.create_reservation(room, client, date(2024, 5, 10), date(2024, 5, 12))
+
+        response = self.client.patch(f'/hotel/reservation/{other.id}', {'arrival_date': '2024-05-03'}, format='json')
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_free_rooms_search(self):
+        double = RoomType.objects.create(name='Двухместный', capacity=2)
+        booked = self.create_room(101)
+        self.create_room(102)
+        self.create_room(201, room_type=double)
+        self.create_reservation(booked, self.create_client('0000000001'), date(2024, 5, 1), date(2024, 5, 5))
+
+        response = self.client.get('/hotel/rooms/free', {'start_date': '2024-05-04', 'end_date': '2024-05-06'})
+        self.assertEqual([room['number'] for room in response.data['rooms']], [102, 201])
+
+        response = self.client.get('/hotel/rooms/free', {'start_date': '2024-05-05', 'end_date': '2024-05-06',
+                                                         'room_type': self.room_type.id})
+        self.assertEqual([room['number'] for room in response.data['rooms']], [101, 102])
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def test_parallel_bookings_never_overlap(self):
+        admin = User.objects.create_user(username='admin', password='admin')
+        room_type = RoomType.objects.create(name='Одноместный', capacity=1)
+        Room.objects.create(number=101, type=room_type, phone='1234567890')
+
+        def book(index):
+            client = APIClient()
+            client.force_authenticate(admin)
+            try:
+                return client.post('/hotel/reservation', {
+                    'passport_number': f'{index:010d}',
+                    'first_name': 'Иван',
+                    'last_name': 'Иванов',
+                    'city_from': 'Москва',
+                    'room_number': 101,
+                    'arrival_date': f'2024-05-{1 + index % 3:02d}',
+                    'departure_date': f'2024-05-{4 + index % 3:02d}',
+                }, format='json').status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = list(executor.map(book, range(24)))
+
+        self.assertEqual(statuses.count(201), 1)
+        reservations = list(Reservation.objects.values_list('arrival_date', 'departure_date'))
+        for index, (arrival_date, departure_date) in enumerate(reservations):
+            for other_arrival, other_departure in reservations[index + 1:]:
+                self.assertFalse(arrival_date < other_departure and other_arrival < departure_date)
+
+
+class QuarterlyReportTests(HotelAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.rooms = [self.create_room(101), self.create_room(102), self.create_room(201)]
+        client = self.create_client('0000000001')
+        self.reservations = [
+            self.create_reservation(self.rooms[0], client, date(2024, 4, 2), date(2024, 4, 5), payment_status='PAID'),
+            self.create_reservation(self.rooms[0], client, date(2024, 5, 2), date(2024, 5, 9), status='CANCELLED',
+                                    payment_status='PREPAID', price_at_booking=700),
+            self.create_reservation(self.rooms[1], client, date(2024, 6, 28), date(2024, 7, 2)),
+            self.create_reservation(self.rooms[2], client, date(2024, 7, 2), date(2024, 7, 5), payment_status='PAID'),
+        ]
+
+    def assertMatchesLive(self, quarter, year):
+        materialized = read_quarterly_report(quarter, year)
+        live = live_quarterly_report(*quarter_date_range(quarter, year))
+        for row in live['rooms_per_floor']:
+            row['floor'] = int(row['floor'])
+        self.assertEqual(materialized, live)
+
+    def test_report_follows_reservation_changes(self):
+        self.assertMatchesLive(2, 2024)
+        self.assertMatchesLive(3, 2024)
+
+        response = self.client.patch(f'/hotel/reservation/{self.reservations[3].id}',
+                                     {'arrival_date': '2024-06-01', 'departure_date': '2024-06-03'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.reservations[0].status = 'CANCELLED'
+        self.reservations[0].save()
+        self.reservations[2].delete()
+
+        self.assertMatchesLive(2, 2024)
+        self.assertMatchesLive(3, 2024)
+
+    def test_rebuild_matches_incremental_updates(self):
+        incremental = read_quarterly_report(2, 2024)
+        rebuild_quarterly_report()
+
+        self.assertEqual(read_quarterly_report(2, 2024), incremental)
+
+    def test_endpoint_reads_materialized_report(self):
+        response = self.client.get('/hotel/reports/quarterly', {'quarter': 2, 'year': 2024})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_income'], 1000 + 700)
+        self.assertEqual(response.data['clients_per_room'], [{"room__number": 101, "client_count": 1}])
+
+
+class OccupancyReportTests(HotelAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.rooms = [self.create_room(101), self.create_room(102)]
+        client = self.create_client('0000000001')
+        self.stay = self.create_reservation(self.rooms[0], client, date(2024, 6, 3), date(2024, 6, 6))
+        self.create_reservation(self.rooms[1], client, date(2024, 6, 5), date(2024, 6, 7), price_at_booking=3000)
+        self.create_reservation(self.rooms[1], client, date(2024, 6, 3), date(2024, 6, 4), status='CANCELLED')
+
+    def nights(self, reservation):
+        return list(RoomNight.objects.filter(reservation=reservation).order_by('date').values_list('date', 'price'))
+
+    def test_nights_follow_reservation_changes(self):
+        # Остаток от деления цены достаётся первым ночам
+        self.assertEqual(self.nights(self.stay), [(date(2024, 6, 3), 334), (date(2024, 6, 4), 333),
+                                                  (date(2024, 6, 5), 333)])
+        self.assertEqual(RoomNight.objects.count(), 5)
+
+        self.stay.departure_date, self.stay.final_price = date(2024, 6, 5), 900
+        self.stay.save()
+        self.assertEqual(self.nights(self.stay), [(date(2024, 6, 3), 450), (date(2024, 6, 4), 450)])
+
+        incremental = sorted(RoomNight.objects.values_list('reservation_id', 'room_id', 'date', 'price'))
+        self.assertEqual(rebuild_room_nights(), 4)
+        self.assertEqual(sorted(RoomNight.objects.values_list('reservation_id', 'room_id', 'date', 'price')),
+                         incremental)
+
+        self.stay.delete()
+        self.assertEqual(RoomNight.objects.count(), 2)
+
+    def test_endpoint_rolls_up_periods(self):
+        response = self.client.get('/hotel/reports/occupancy',
+                                   {'start_date': '2024-06-01', 'end_date': '2024-06-09', 'bucket': 'week'})
+
+        self.assertEqual(response.status_code, 200)
+        # 1 июня 2024 - суббота: первая неделя обрезана началом диапазона
+        self.assertEqual([(row['start_date'], row['end_date'], row['nights_available'], row['nights_sold'])
+                          for row in response.data['periods']],
+                         [(date(2024, 6, 1), date(2024, 6, 2), 4, 0), (date(2024, 6, 3), date(2024, 6, 9), 14, 5)])
+        self.assertEqual(response.data['total'], {'nights_available': 18, 'nights_sold': 5, 'revenue': 4000,
+                                                  'occupancy': 0.2778, 'adr': 800.0, 'revpar': 222.22})
+
+        # Ответ кэшируется, новая бронь сбрасывает кэш
+        self.create_reservation(self.rooms[0], self.stay.client, date(2024, 6, 8), date(2024, 6, 9))
+        response = self.client.get('/hotel/reports/occupancy',
+                                   {'start_date': '2024-06-01', 'end_date': '2024-06-09', 'bucket': 'week'})
+        self.assertEqual(response.data['total']['nights_sold'], 6)
+
+    def test_rollup_by_room_type(self):
+        suite = RoomType.objects.create(name='Люкс', capacity=2)
+        self.create_room(301, room_type=suite)
+
+        response = self.client.get('/hotel/reports/occupancy', {'start_date': '2024-06-01', 'end_date': '2024-06-30',
+                                                                'bucket': 'month', 'by_room_type': 'true'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row['room_type'], row['nights_available'], row['nights_sold'], row['occupancy'])
+                          for row in response.data['total']],
+                         [(self.room_type.id, 60, 5, 0.0833), (suite.id, 30, 0, 0.0)])
+        self.assertEqual(len(response.data['periods']), 2)
+
+    def test_rejects_invalid_range(self):
+        response = self.client.get('/hotel/reports/occupancy', {'start_date': '2024-06-10', 'end_date': '2024-06-01'})
+
+        self.assertEqual(response.status_code, 422)
+
+
+class ClientSearchTests(HotelAPITestCase):
+    def search(self, **params):
+        return [client['id'] for client in self.client.get('/hotel/clients', params).data['clients']]
+
+    def test_room_and_dates_match_one_stay_in_one_query(self):
+        first, second = self.create_room(101), self.create_room(102)
+        guest, neighbour = self.create_client('0000000001'), self.create_client('0000000002', city_from='Казань')
+        self.create_reservation(first, guest, date(2024, 5, 1), date(2024, 5, 5))
+        self.create_reservation(second, guest, date(2024, 6, 1), date(2024, 6, 5))
+        self.create_reservation(first, neighbour, date(2024, 6, 2), date(2024, 6, 4))
+
+        with self.assertNumQueries(1):
+            found = self.search(room=101, start_date='2024-06-01', end_date='2024-06-30')
+        # Гость жил в 101 в мае, а в июне - в 102: под фильтр комнаты и дат попадает только сосед
+        self.assertEqual(found, [neighbour.id])
+        self.assertEqual(self.search(room=101), [guest.id, neighbour.id])
+        self.assertEqual(self.search(room=101, city='каз'), [neighbour.id])
+
+    def test_city_search_uses_normalized_prefix(self):
+        orel = self.create_client('0000000001', city_from='Орёл')
+        piter = self.create_client('0000000002', city_from='Санкт-Петербург')
+        self.create_client('0000000003', city_from='Москва')
+
+        self.assertEqual(self.search(city='  ОРЕЛ'), [orel.id])
+        self.assertEqual(self.search(city='санкт-'), [piter.id])
+        self.assertEqual(self.client.get('/hotel/clients', {'city': 'петербург'}).status_code, 404)
+
+        # Массовые операции обновляют нормализованный город так же, как save()
+        Client.objects.filter(pk=piter.pk).update(city_from='Тверь')
+        orel.city_from = 'Казань'
+        Client.objects.bulk_update([orel], ['city_from'])
+        Client.objects.bulk_create([Client(passport_number='0000000003', first_name='Иван', last_name='Иванов',
+                                           city_from='Тула')], update_conflicts=True,
+                                   unique_fields=['passport_number'], update_fields=['city_from'])
+        self.assertEqual(dict(Client.objects.values_list('passport_number', 'city_normalized')),
+                         {'0000000001': 'казань', '0000000002': 'тверь', '0000000003': 'тула'})
+
+
+class ClientStayOverlapTests(HotelAPITestCase):
+    def test_overlapping_clients_in_one_query_set(self):
+        room = self.create_room(101)
+        target, neighbour, early, other = (self.create_client(f'{index:010d}') for index in range(4))
+        self.create_reservation(room, target, date(2024, 5, 1), date(2024, 5, 5))
+        self.create_reservation(room, target, date(2024, 6, 1), date(2024, 6, 5))
+        self.create_reservation(room, neighbour, date(2024, 6, 4), date(2024, 6, 8))
+        self.create_reservation(room, early, date(2024, 4, 28), date(2024, 5, 2))
+        self.create_reservation(room, other, date(2024, 5, 5), date(2024, 5, 7))
+
+        response = self.client.get('/hotel/clients/stay-overlap', {'client_id': target.id})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([client['id'] for client in response.data['clients']], [neighbour.id, early.id])
+
+        response = self.client.get('/hotel/clients/stay-overlap', {'client_id': target.id,
+                                                                   'start_date': '2024-06-01'})
+        self.assertEqual([client['id'] for client in response.data['clients']], [neighbour.id])
+
+
+class BulkImportExportTests(HotelAPITestCase):
+    def post_import(self, entity, body, content_type):
+        return self.client.generic('POST', f'/hotel/bulk/{entity}/import', body.encode(), content_type=content_type)
+
+    def test_csv_import_creates_updates_and_reports_errors(self):
+        self.create_client('0000000001')
+        body = (
+            "passport_number,first_name,last_name,middle_name,city_from\n"
+            "0000000001,Пётр,Петров,,Казань\n"
+            "0000000002,Анна,Смирнова,Игоревна,Москва\n"
+            ",Без,Паспорта,,Москва\n"
+            "0000000002,Дубль,Дублев,,Москва\n"
+        )
+
+        response = self.post_import('clients', body, 'text/csv')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual([error['line'] for error in response.data['errors']], [4, 5])
+        updated = Client.objects.get(passport_number='0000000001')
+        self.assertEqual((updated.first_name, updated.middle_name), ('Пётр', None))
+
+    def test_ndjson_import_checks_foreign_keys_in_batch(self):
+        body = "\n".join([
+            json.dumps({"number": 101, "type_id": self.room_type.id, "status": "AVAILABLE", "phone": "1"}),
+            json.dumps({"number": 102, "type_id": 999999, "status": "AVAILABLE", "phone": "2"}),
+            "{not json",
+        ])
+
+        response = self.post_import('rooms', body, 'application/x-ndjson')
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 3])
+        self.assertEqual(list(Room.objects.values_list('number', flat=True)), [101])
+
+    def test_unknown_entity_and_content_type(self):
+        self.assertEqual(self.post_import('guests', '', 'text/csv').status_code, 404)
+        self.assertEqual(self.post_import('clients', '[]', 'application/json').status_code, 415)
+
+    def test_export_round_trip(self):
+        self.create_client('0000000001')
+        self.create_client('0000000002', city_from='Казань')
+
+        for file_format, content_type in (('csv', 'text/csv'), ('ndjson', 'application/x-ndjson')):
+            response = self.client.get('/hotel/bulk/clients/export', {'file_format': file_format})
+            self.assertEqual(response.status_code, 200)
+            body = b''.join(response.streaming_content).decode()
+
+            response = self.post_import('clients', body, content_type)
+            self.assertEqual((response.data['created'], response.data['updated'], response.data['error_count']),
+                             (0, 2, 0))
+
+
+class FastPathTests(HotelAPITestCase):
+    def test_fast_lists_match_model_serializer(self):
+        for index, city in enumerate(['Москва', 'Санкт-"Петербург"\\', 'Тверь\u2028\x1f', 'Казань']):
+            self.create_client(f'000000000{index}', city_from=city)
+        Client.objects.filter(passport_number='0000000001').update(middle_name='Иванович')
+        contract = self.create_cleaner('0000000001')
+        room = self.create_room(101)
+        for day in (1, 2, 3):
+            CleaningSchedule.objects.create(cleaner=contract, room=room, cleaning_date=date(2024, 6, day))
+
+        renderer = JSONRenderer()
+        clients = ClientSerializer(Client.objects.order_by('id'), many=True).data
+        schedules = CleaningScheduleSerializer(CleaningSchedule.objects.order_by('id'), many=True).data
+        cases = [
+            ('/hotel/clients', {}, {'count': 4, 'clients': clients}),
+            ('/hotel/api/clients/', {}, clients),
+            ('/hotel/api/cleaning-schedules/', {}, schedules),
+            ('/hotel/api/cleaning-schedules/', {'stream': 'true'}, schedules),
+        ]
+        for path, params, data in cases:
+            with self.subTest(path=path, params=params):
+                response = self.client.get(path, params)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                self.assertEqual(content, renderer.render(data))
+
+        response = self.client.get('/hotel/api/cleaning-schedules/', {'page_size': 2})
+        self.assertEqual(response.content, renderer.render(
+            {'next': response.data['next'], 'previous': None, 'results': schedules[:2]}))
+        response = self.client.get('/hotel/clients', {'page_size': 3})
+        self.assertEqual(response.content, renderer.render(
+            {'next': response.data['next'], 'previous': None, 'clients': clients[:3]}))
+
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            'text': 'Гостиница "Север"\\\u2028\u2029\x00\n',
+            'when': datetime(2024, 6, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'day': date(2024, 6, 1),
+            'price': Decimal('1500.50'),
+            'items': [1, None, True, {'nested': []}],
+        }
+        # Числовые ключи orjson не принимает: их рендерит JSONRenderer
+        for data, media_type in ((data, None), (data, 'application/json; indent=4'), ({2: 'ключ-число'}, None)):
+            expected = JSONRenderer().render(data, media_type)
+            self.assertEqual(FastJSONRenderer().render(data, media_type), expected)
+            with mock.patch.object(fastpath, 'orjson', None):
+                self.assertEqual(FastJSONRenderer().render(data, media_type), expected)
+
+
+class ReadCacheTests(HotelAPITestCase):
+    def test_room_list_is_cached_until_room_changes(self):
+        room = self.create_room(101)
+        self.assertGreater(self.count_queries('/hotel/rooms'), 1)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/hotel/rooms')
+        # Из базы читаются только версии моделей и отметки изменения для ETag
+        self.assertTrue(all(query['sql'].startswith('SELECT MAX(') or 'hotel_app_modelversion' in query['sql']
+                            for query in context.captured_queries))
+
+        room.phone = '5555555555'
+        room.save()
+        response = self.client.get('/hotel/rooms')
+        self.assertEqual(response.data['rooms'][0]['phone'], '5555555555')
+
+        room.status = 'OCCUPIED'
+        room.save()
+        self.client.get('/hotel/rooms')
+        self.create_reservation(room, self.create_client('0000000001'), date(2024, 6, 1), date(2024, 6, 5))
+        response = self.client.get('/hotel/rooms')
+        self.assertEqual(response.data['rooms'][0]['current_client']['passport_number'], '0000000001')
+
+    def test_employee_positions_follow_position_changes(self):
+        contract = self.create_cleaner('0000000001')
+        self.client.get('/hotel/api/employees/')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/hotel/api/employees/')
+        self.assertFalse(any('hotel_app_employmentcontract' in query['sql'] for query in context.captured_queries))
+        self.assertEqual(response.data[0]['position']['name'], 'Уборщик')
+
+        contract.position.name = 'Старший уборщик'
+        contract.position.save()
+        response = self.client.get(f'/hotel/api/employees/{contract.employee_id}/')
+        self.assertEqual(response.data['position']['name'], 'Старший уборщик')
+
+    def test_bulk_import_invalidates_and_stats_are_reported(self):
+        self.create_client('0000000001')
+        self.assertEqual(self.client.get('/hotel/clients').data['count'], 1)
+
+        self.client.generic('POST', '/hotel/bulk/clients/import',
+                            'passport_number,first_name,last_name,middle_name,city_from\n'
+                            '0000000002,Анна,Смирнова,,Москва\n'.encode(), content_type='text/csv')
+        self.assertEqual(self.client.get('/hotel/clients').data['count'], 2)
+        self.client.get('/hotel/clients')
+
+        stats = self.client.get('/hotel/cache/stats').data['clients-list']
+        self.assertGreaterEqual(stats['hits'], 1)
+        self.assertGreaterEqual(stats['misses'], 2)
+
+
+class RequestMetricsTests(HotelAPITestCase):
+    def setUp(self):
+        super().setUp()
+        HISTOGRAM.reset()
+
+    def test_server_timing_and_histogram(self):
+        self.create_room(101)
+
+        response = self.client.get('/hotel/rooms')
+
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timing), {'total', 'sql', 'serializer'})
+        self.assertRegex(timing['sql'], r'desc="[1-9]\d* queries"')
+        self.assertNotIn('X-Query-Budget-Exceeded', response)
+
+        routes = self.client.get('/hotel/metrics').data['routes']
+        self.assertEqual(routes['GET hotel/rooms']['count'], 1)
+        self.assertEqual(routes['GET hotel/rooms']['latency_ms']['buckets']['+Inf'], 1)
+
+    @override_settings(HOTEL_QUERY_BUDGET=0)
+    def test_requests_over_query_budget_are_flagged(self):
+        self.create_room(101)
+
+        response = self.client.get('/hotel/rooms')
+
+        self.assertRegex(response['X-Query-Budget-Exceeded'], r'^[1-9]\d*/0$')
+        self.assertEqual(self.client.get('/hotel/metrics').data['routes']['GET hotel/rooms']['over_budget'], 1)
+
+
+class AsyncReadPathTests(TransactionTestCase):
+    # Отчёт читается параллельно из других потоков, поэтому данные должны быть закоммичены
+    def setUp(self):
+        cache.clear()
+        reset_throttles()
+        admin = User.objects.create_user(username='admin', password='admin')
+        self.headers = {'Authorization': f'Token {Token.objects.create(user=admin).key}'}
+        room_type = RoomType.objects.create(name='Одноместный', capacity=1)
+        rooms = [Room.objects.create(number=number, type=room_type, status=status, phone='1234567890')
+                 for number, status in ((101, 'OCCUPIED'), (102, 'AVAILABLE'), (201, 'OCCUPIED'))]
+        clients = [Client.objects.create(passport_number=f'{index:010d}', first_name='Иван', last_name='Иванов',
+                                         city_from=city) for index, city in enumerate(['Москва', 'Казань', 'Москва'])]
+        for room, client, arrival_day in zip(rooms, clients, (1, 3, 5)):
+            Reservation.objects.create(room=room, client=client, admin=admin, arrival_date=date(2024, 5, arrival_day),
+                                       departure_date=date(2024, 5, arrival_day + 4), status='CHECKED_IN',
+                                       payment_status='PAID', price_at_booking=1000, final_price=1000)
+        self.first_client = clients[0]
+
+    def test_async_endpoints_match_sync_responses(self):
+        cases = [
+            ('clients', {'city': 'моск'}),
+            ('clients', {'room': 999}),
+            ('rooms', {'status': 'occupied'}),
+            ('rooms', {'status': 'BROKEN'}),
+            ('clients/stay-overlap', {'client_id': self.first_client.id}),
+            ('clients/stay-overlap', {'client_id': 0}),
+            ('reports/quarterly', {'quarter': 2, 'year': 2024}),
+            ('reports/quarterly', {'quarter': 5, 'year': 2024}),
+        ]
+        for path, params in cases:
+            with self.subTest(path=path, params=params):
+                cache.clear()
+                sync_response = self.client.get(f'/hotel/{path}', params, headers=self.headers)
+                cache.clear()
+                async_response = self.client.get(f'/hotel/async/{path}', params, headers=self.headers)
+
+                self.assertEqual(async_response.status_code, sync_response.status_code)
+                self.assertEqual(async_response.content, sync_response.content)
+
+    def test_async_endpoints_are_throttled(self):
+        rates = {'client': '1/min', 'endpoint': '10/min'}
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+            self.assertEqual(self.client.get('/hotel/async/rooms', headers=self.headers).status_code, 200)
+            response = self.client.get('/hotel/async/rooms', headers=self.headers)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    async def test_async_client_requires_authentication(self):
+        response = await self.async_client.get('/hotel/async/rooms')
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get('/hotel/async/reports/quarterly', {'quarter': 2, 'year': 2024},
+                                               headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_income'], 3000)
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+
+class ChangeFeedTests(TransactionTestCase):
+    # Лента читается из потоков со своими соединениями, поэтому события должны быть закоммичены
+    def setUp(self):
+        cache.clear()
+        reset_throttles()
+        admin = User.objects.create_user(username='admin', password='admin')
+        self.headers = {'Authorization': f'Token {Token.objects.create(user=admin).key}'}
+        for name, value in (('POLL_INTERVAL', 0.02), ('HEARTBEAT', 0.05), ('STREAM_DURATION', 0.2)):
+            patcher = mock.patch.object(changefeed, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def create_event(self, topic, object_id):
+        return OutboxEvent.objects.create(topic=topic, object_id=object_id, payload={"from": None, "to": "BOOKED"})
+
+    def test_long_poll_returns_events_after_cursor(self):
+        first = self.create_event('room.status', 1)
+        self.create_event('reservation.status', 2)
+        last = self.create_event('room.status', 3)
+
+        response = self.client.get('/hotel/async/events', {'after': first.id, 'topic': 'room.status', 'wait': 0},
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event['id'] for event in response.json()['events']], [last.id])
+        self.assertEqual(response.json()['last_id'], last.id)
+
+        # Без событий нужных тем курсор всё равно сдвигается за просмотренные
+        response = self.client.get('/hotel/async/events', {'topic': 'reservation.updated', 'wait': 0},
+                                   headers=self.headers)
+        self.assertEqual(response.json(), {'last_id': last.id, 'events': []})
+
+        response = self.client.get('/hotel/async/events', {'topic': 'room.status,room.price'}, headers=self.headers)
+        self.assertEqual(response.status_code, 422)
+
+    def test_cursor_stops_before_uncommitted_ids(self):
+        first = self.create_event('room.status', 1)
+        # Пропуск в id: событие транзакции, которая ещё не закоммичена (в PostgreSQL) или откатилась
+        recent = OutboxEvent.objects.create(id=first.id + 2, topic='room.status', object_id=2, payload={})
+        self.assertEqual(changefeed._settled_after_gaps(0), first.id)
+        OutboxEvent.objects.filter(pk=recent.pk).update(created_at=datetime.now(dt_timezone.utc) - timedelta(minutes=1))
+        self.assertEqual(changefeed._settled_after_gaps(0), recent.id)
+
+        with mock.patch.object(changefeed, 'settled_event_id', changefeed._settled_after_gaps):
+            OutboxEvent.objects.filter(pk=recent.pk).update(created_at=datetime.now(dt_timezone.utc))
+            response = self.client.get('/hotel/events', {'topic': 'reservation.status'}, headers=self.headers)
+            self.assertEqual(response.json(), {'last_id': first.id, 'events': []})
+            response = self.client.get('/hotel/async/events', {'after': first.id, 'wait': 0}, headers=self.headers)
+            self.assertEqual(response.json(), {'last_id': first.id, 'events': []})
+
+            # Транзакция закоммитила пропущенное событие: оно приходит после курсора
+            missing = OutboxEvent.objects.create(id=first.id + 1, topic='room.status', object_id=3, payload={})
+            response = self.client.get('/hotel/async/events', {'after': first.id, 'wait': 0}, headers=self.headers)
+            self.assertEqual([event['id'] for event in response.json()['events']], [missing.id, recent.id])
+            self.assertEqual(response.json()['last_id'], recent.id)
+
+    async def test_long_poll_waits_for_new_event(self):
+        request = asyncio.create_task(self.async_client.get('/hotel/async/events', {'wait': 5}, headers=self.headers))
+        await asyncio.sleep(0.1)
+        self.assertFalse(request.done())
+        event = await sync_to_async(self.create_event)('room.status', 1)
+
+        response = await asyncio.wait_for(request, 2)
+        self.assertEqual([item['id'] for item in response.json()['events']], [event.id])
+
+    async def test_stream_resumes_from_last_event_id(self):
+        first = await sync_to_async(self.create_event)('room.status', 1)
+        second = await sync_to_async(self.create_event)('reservation.status', 2)
+
+        response = await self.async_client.get('/hotel/async/events/stream',
+                                               headers={**self.headers, 'Last-Event-ID': str(first.id)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        messages = [message for message in body.split('\n\n') if 'data: ' in message]
+        self.assertEqual(len(messages), 1)
+        self.assertTrue(messages[0].startswith(f'id: {second.id}\nevent: reservation.status\ndata: '))
+        self.assertEqual(json.loads(messages[0].split('data: ')[1])['object_id'], 2)
+        self.assertIn(': ping', body)
+
+
+class BatchReservationTests(HotelAPITestCase):
+    def booking(self, passport_number, room_number, arrival_date, departure_date, **extra):
+        return {'passport_number': passport_number, 'first_name': 'Пётр', 'last_name': 'Сидоров',
+                'city_from': 'Казань', 'room_number': room_number, 'arrival_date': arrival_date,
+                'departure_date': departure_date, **extra}
+
+    def post_batch(self, reservations, **extra):
+        return self.client.post('/hotel/reservation/batch', {'reservations': reservations, **extra}, format='json')
+
+    def test_creates_valid_items_and_reports_errors(self):
+        RoomPriceHistory.objects.create(room_type=self.room_type, start_date=date(2024, 1, 1),
+                                        end_date=date(2024, 6, 30), price=1000)
+        RoomPriceHistory.objects.create(room_type=self.room_type, start_date=date(2024, 7, 1), price=2000)
+        room, busy_room = self.create_room(101), self.create_room(102)
+        existing = self.create_client('1111111111')
+        self.create_reservation(busy_room, existing, date(2024, 5, 1), date(2024, 5, 10))
+
+        response = self.post_batch([
+            self.booking('1111111111', 101, '2024-06-29', '2024-07-03'),
+            self.booking('2222222222', 101, '2024-07-01', '2024-07-05'),
+            self.booking('3333333333', 101, '2024-05-01', '2024-05-03', status='CONFIRMED'),
+            self.booking('4444444444', 102, '2024-05-05', '2024-05-07'),
+            self.booking('5555555555', 999, '2024-05-05', '2024-05-07'),
+            self.booking('6666666666', 101, '2024-05-07', '2024-05-05'),
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 4))
+        results = response.data['results']
+        self.assertEqual([result['index'] for result in results], list(range(6)))
+        self.assertEqual(results[0]['price_at_booking'], 2 * 1000 + 2 * 2000)
+        self.assertIn('бронью 0 пакета', results[1]['errors']['room_number'][0])
+        self.assertEqual(results[2]['status'], 'CONFIRMED')
+        self.assertIn('уже забронирована', results[3]['errors']['room_number'][0])
+        self.assertIn('не найдена', results[4]['errors']['room_number'][0])
+        self.assertIn('departure_date', results[5]['errors'])
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.first_name, existing.city_from), ('Пётр', 'Казань'))
+        self.assertEqual(results[0]['client_id'], existing.id)
+        self.assertFalse(Client.objects.filter(passport_number='2222222222').exists())
+        room.refresh_from_db()
+        self.assertEqual(room.status, 'OCCUPIED')
+        self.assertEqual(OutboxEvent.objects.filter(topic='reservation.status').count(), 2)
+        # Бронь 0 переходит через границу квартала и в отчёт не попадает
+        self.assertEqual(list(QuarterlyRoomReport.objects.filter(room=room).values_list('quarter', 'client_count')),
+                         [(2, 1)])
+        self.assertEqual(RoomNight.objects.filter(room=room).count(), 4 + 2)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        RoomPriceHistory.objects.create(room_type=self.room_type, start_date=date(2024, 1, 1), price=1000)
+        for number in range(201, 241):
+            self.create_room(number)
+        # Тарифы загружаются в память процесса первым расчётом цены
+        quote_stay(self.room_type.id, date(2024, 3, 1), date(2024, 3, 4))
+
+        def queries(rooms, passport_prefix):
+            with CaptureQueriesContext(connection) as context:
+                response = self.post_batch([
+                    self.booking(f'{passport_prefix}{number:04d}', number, '2024-03-01', '2024-03-04')
+                    for number in rooms
+                ])
+            self.assertEqual(response.data['created'], len(rooms))
+            return len(context.captured_queries)
+
+        self.assertEqual(queries(range(201, 203), 'AA'), queries(range(203, 241), 'BB'))
+
+    def test_all_or_nothing(self):
+        self.create_room(101)
+
+        response = self.post_batch([
+            self.booking('1111111111', 101, '2024-03-01', '2024-03-04'),
+            self.booking('2222222222', 999, '2024-03-01', '2024-03-04'),
+        ], all_or_nothing=True)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.data['created'], 0)
+        self.assertIn('non_field_errors', response.data['results'][0]['errors'])
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(Client.objects.exists())
+
+
+class ConditionalGetTests(HotelAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.room = self.create_room(101, status='OCCUPIED')
+        self.reservation = self.create_reservation(self.room, self.create_client('1234567890'), date(2024, 5, 1),
+                                                   date(2024, 5, 5), status='CHECKED_IN')
+
+    def assertNotModifiedUntilChange(self, url, change):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+
+        with CaptureQueriesContext(connection) as context:
+            cached = self.client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        # Только версии моделей и максимумы отметок изменения комнат и броней
+        self.assertEqual(len(context.captured_queries), 3)
+        self.assertEqual(
+            self.client.get(url, headers={'If-Modified-Since': first['Last-Modified']}).status_code, 304)
+
+        change()
+        changed = self.client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_rooms_list_changes_with_room_status(self):
+        self.assertNotModifiedUntilChange('/hotel/rooms?status=occupied',
+                                          lambda: transition_rooms({self.room.id: 'REQUIRES_CLEANING'}))
+
+    def test_rooms_list_changes_with_nested_client(self):
+        def rename_client():
+            Client.objects.filter(pk=self.reservation.client_id).update(first_name='Пётр')
+            invalidate(Client)
+
+        self.assertNotModifiedUntilChange('/hotel/api/rooms/', rename_client)
+
+    def test_reservations_change_with_reservation(self):
+        def confirm():
+            self.reservation.payment_status = 'PAID'
+            self.reservation.save()
+
+        self.assertNotModifiedUntilChange('/hotel/api/reservations/', confirm)
+
+    def test_delete_in_other_worker_changes_etag(self):
+        other_room = self.create_room(102)
+        # Удаляется не последняя изменённая комната: максимум updated_at после удаления прежний
+        self.room.save()
+        first = self.client.get('/hotel/api/rooms/')
+        self.assertEqual(self.client.get('/hotel/api/rooms/', headers={'If-None-Match': first['ETag']}).status_code,
+                         304)
+
+        # Другой воркер с кэшем в своей памяти: версии в кэше этого процесса не меняются
+        with mock.patch('hotel_app.cache._bump'), self.captureOnCommitCallbacks(execute=True):
+            other_room.delete()
+        changed = self.client.get('/hotel/api/rooms/', headers={'If-None-Match': first['ETag']})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual([room['number'] for room in changed.data], [101])
+        self.assertEqual(self.client.get('/hotel/api/rooms/', headers={'If-None-Match': changed['ETag']}).status_code,
+                         304)
+
+    def test_query_params_are_part_of_etag(self):
+        etag = self.client.get('/hotel/api/reservations/')['ETag']
+        self.assertEqual(self.client.get('/hotel/api/reservations/', {'page_size': 1},
+                                         headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_update_stamps_follow_bulk_writes(self):
+        before = Room.objects.get(pk=self.room.pk).updated_at
+        Room.objects.filter(pk=self.room.pk).update(phone='0987654321')
+        self.assertGreater(Room.objects.get(pk=self.room.pk).updated_at, before)
+
+        before = Room.objects.get(pk=self.room.pk).updated_at
+        with transaction.atomic():
+            lock_room(self.room)
+        self.assertEqual(Room.objects.get(pk=self.room.pk).updated_at, before)
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class ThrottlingTests(HotelAPITestCase):
+    @throttle_rates(client='5/min', endpoint='100/min')
+    def test_client_budget_returns_retry_after(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get('/hotel/rooms').status_code, 200)
+
+        response = self.client.get('/hotel/api/rooms/')
+        self.assertEqual(response.status_code, 429)
+        # Следующий запрос пройдёт, когда вес этих 5 запросов упадёт до 4: не позже 0.2 следующего окна
+        self.assertTrue(1 <= int(response['Retry-After']) <= 72)
+
+    @throttle_rates(client='100/min', endpoint='25/min')
+    def test_expensive_endpoint_has_own_weighted_budget(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get('/hotel/reports/quarterly', {'quarter': 2, 'year': 2024}).status_code, 200)
+
+        self.assertEqual(self.client.get('/hotel/reports/quarterly', {'quarter': 2, 'year': 2024}).status_code, 429)
+        self.assertEqual(self.client.get('/hotel/rooms').status_code, 200)
+
+    @throttle_rates(anon='1/min')
+    def test_anonymous_requests_use_anon_rate(self):
+        client = APIClient()
+        self.assertEqual(client.get('/hotel/health').status_code, 200)
+        self.assertEqual(client.get('/hotel/health').status_code, 429)
+
+    def test_previous_window_is_weighted(self):
+        request = Request(APIRequestFactory().get('/hotel/rooms'))
+        request.user = self.admin
+        now = 30.0
+
+        def allow():
+            throttle = type('Throttle', (EndpointRateThrottle,), {'rate': '10/min'})()
+            throttle.timer = lambda: now
+            return throttle.allow_request(request, None), throttle
+
+        self.assertTrue(all(allow()[0] for _ in range(10)))
+        self.assertFalse(allow()[0])
+
+        # Середина следующего окна: 10 запросов прошлого окна весят 5
+        now = 90.0
+        self.assertTrue(all(allow()[0] for _ in range(4)))
+        allowed, throttle = allow()
+        self.assertTrue(allowed)
+        allowed, throttle = allow()
+        self.assertFalse(allowed)
+        # Место под ещё один запрос появится, когда вес прошлого окна упадёт до 4: через 0.1 окна
+        self.assertAlmostEqual(throttle.wait(), 6.0)
+
+
+class StatusStateMachineTests(HotelAPITestCase):
+    def events(self, **params):
+        return [(event['topic'], event['object_id'], event['payload'].get('from'), event['payload'].get('to'))
+                for event in self.client.get('/hotel/events', params).data['events']]
+
+    def test_cancellation_frees_room_and_is_logged(self):
+        room = self.create_room(101, status='OCCUPIED')
+        reservation = self.create_reservation(room, self.create_client('0000000001'), date(2024, 6, 1),
+                                              date(2024, 6, 5))
+
+        response = self.client.patch(f'/hotel/reservation/{reservation.id}', {'status': 'CANCELLED'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        room.refresh_from_db()
+        self.assertEqual(room.status, 'AVAILABLE')
+        self.assertEqual(self.events(), [
+            ('reservation.status', reservation.id, 'CONFIRMED', 'CANCELLED'),
+            ('room.status', room.id, 'OCCUPIED', 'AVAILABLE'),
+        ])
+        self.assertEqual(self.events(topic='room.status', after=OutboxEvent.objects.order_by('id').first().id),
+                         [('room.status', room.id, 'OCCUPIED', 'AVAILABLE')])
+
+    def test_invalid_transition_is_rejected(self):
+        room = self.create_room(101, status='REQUIRES_CLEANING')
+        reservation = self.create_reservation(room, self.create_client('0000000001'), date(2024, 6, 1),
+                                              date(2024, 6, 5), status='CHECKED_OUT')
+
+        response = self.client.patch(f'/hotel/reservation/{reservation.id}', {'status': 'CONFIRMED'}, format='json')
+
+        self.assertEqual(response.status_code, 422)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, 'CHECKED_OUT')
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_booking_and_room_move_are_logged(self):
+        first, second = self.create_room(101), self.create_room(102)
+        response = self.client.post('/hotel/reservation', {
+            'passport_number': '0000000001', 'first_name': 'Иван', 'last_name': 'Иванов', 'city_from': 'Москва',
+            'room_number': 101, 'arrival_date': '2024-06-01', 'departure_date': '2024-06-05',
+        }, format='json')
+        reservation_id = response.data['reservation_id']
+
+        self.client.patch(f'/hotel/reservation/{reservation_id}', {'room_number': 102}, format='json')
+
+        self.assertEqual(list(Room.objects.order_by('number').values_list('status', flat=True)),
+                         ['AVAILABLE', 'OCCUPIED'])
+        self.assertEqual(self.events(), [
+            ('reservation.status', reservation_id, None, 'BOOKED'),
+            ('room.status', first.id, 'AVAILABLE', 'OCCUPIED'),
+            ('reservation.updated', reservation_id, None, None),
+            ('room.status', first.id, 'OCCUPIED', 'AVAILABLE'),
+            ('room.status', second.id, 'AVAILABLE', 'OCCUPIED'),
+        ])
+
+    def test_reservation_updates_are_logged(self):
+        room = self.create_room(101, status='OCCUPIED')
+        reservation = self.create_reservation(room, self.create_client('0000000001'), date(2024, 6, 1),
+                                              date(2024, 6, 5))
+
+        self.client.patch(f'/hotel/reservation/{reservation.id}', {'departure_date': '2024-06-04'}, format='json')
+        self.client.patch(f'/hotel/api/reservations/{reservation.id}/', {'payment_status': 'PAID'}, format='json')
+        self.client.patch(f'/hotel/reservation/{reservation.id}', {'payment_status': 'PAID'}, format='json')
+
+        events = self.client.get('/hotel/events', {'topic': 'reservation.updated'}).data['events']
+        self.assertEqual([event['payload'] for event in events], [
+            {'changes': {'departure_date': '2024-06-04', 'price_at_booking': 0}, 'room_id': room.id},
+            {'changes': {'payment_status': 'PAID'}, 'room_id': room.id},
+        ])
+
+    def test_room_transitions_are_batched_and_guarded(self):
+        rooms = [self.create_room(101, status='OCCUPIED'), self.create_room(102, status='REQUIRES_CLEANING'),
+                 self.create_room(103, status='MAINTENANCE'), self.create_room(104, status='CLEANING_IN_PROGRESS')]
+
+        with CaptureQueriesContext(connection) as context:
+            applied = transition_rooms({room.id: 'AVAILABLE' for room in rooms[:3]} | {rooms[3].id: 'OCCUPIED'})
+
+        updates = [query for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(set(applied), {rooms[0].id, rooms[1].id})
+        self.assertEqual(list(Room.objects.order_by('number').values_list('status', flat=True)),
+                         ['AVAILABLE', 'AVAILABLE', 'MAINTENANCE', 'CLEANING_IN_PROGRESS'])
+
+
+class CleaningPlannerTests(HotelAPITestCase):
+    def plan(self, **data):
+        return self.client.post('/hotel/cleaning-schedules/plan',
+                                {'start_date': '2024-06-01', 'end_date': '2024-06-02', **data}, format='json')
+
+    def schedule(self):
+        return set(CleaningSchedule.objects.values_list('cleaner_id', 'room__number', 'cleaning_date', 'status'))
+
+    def test_plan_balances_rooms_and_keeps_started_cleanings(self):
+        rooms = [self.create_room(101 + index, status='REQUIRES_CLEANING') for index in range(5)]
+        self.create_room(110)
+        first, second = self.create_cleaner('0000000001'), self.create_cleaner('0000000002')
+        CleaningSchedule.objects.create(cleaner=second, room=rooms[0], cleaning_date=date(2024, 6, 1),
+                                        status='COMPLETED')
+
+        response = self.plan()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['deleted']), (9, 0))
+        self.assertEqual(self.schedule(), {
+            (second.id, 101, date(2024, 6, 1), 'COMPLETED'),
+            (first.id, 102, date(2024, 6, 1), 'PENDING'), (first.id, 103, date(2024, 6, 1), 'PENDING'),
+            (second.id, 104, date(2024, 6, 1), 'PENDING'), (second.id, 105, date(2024, 6, 1), 'PENDING'),
+            (first.id, 101, date(2024, 6, 2), 'PENDING'), (first.id, 102, date(2024, 6, 2), 'PENDING'),
+            (first.id, 103, date(2024, 6, 2), 'PENDING'),
+            (second.id, 104, date(2024, 6, 2), 'PENDING'), (second.id, 105, date(2024, 6, 2), 'PENDING'),
+        })
+
+        response = self.plan()
+        self.assertEqual((response.data['created'], response.data['deleted'], response.data['unchanged']),
+                         (0, 0, 9))
+
+    def test_replan_moves_only_changed_rows(self):
+        for index in range(4):
+            self.create_room(101 + index, status='REQUIRES_CLEANING')
+        first, second = self.create_cleaner('0000000001'), self.create_cleaner('0000000002')
+        self.plan()
+        second.end_date = date(2024, 6, 1)
+        second.save()
+
+        dry_run = self.plan(dry_run=True)
+        self.assertEqual((dry_run.data['created'], dry_run.data['deleted'], dry_run.data['unchanged']), (2, 2, 6))
+        self.assertEqual(CleaningSchedule.objects.filter(cleaner=second).count(), 4)
+
+        response = self.plan()
+        self.assertEqual((response.data['created'], response.data['deleted'], response.data['unchanged']), (2, 2, 6))
+        self.assertEqual(response.data['load'], [{'contract_id': first.id, 'cleanings': 6},
+                                                 {'contract_id': second.id, 'cleanings': 2}])
+
+    def test_days_without_cleaners_are_rejected(self):
+        self.create_room(101, status='REQUIRES_CLEANING')
+        cleaner = self.create_cleaner('0000000001')
+        cleaner.end_date = date(2024, 6, 1)
+        cleaner.save()
+
+        response = self.plan()
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.data['unassigned_dates'], [date(2024, 6, 2)])
+        self.assertFalse(CleaningSchedule.objects.exists())
+
+    def test_manual_schedule_update_keeps_existing_rows(self):
+        room = self.create_room(101)
+        self.create_room(102)
+        cleaner = self.create_cleaner('0000000001')
+        done = CleaningSchedule.objects.create(cleaner=cleaner, room=room, cleaning_date=date(2024, 6, 1),
+                                               status='COMPLETED')
+
+        response = self.client.patch('/hotel/cleaning-schedules/manage', {
+            'cleaner_id': cleaner.employee_id, 'cleaning_dates': ['2024-06-01', '2024-06-02'], 'room_ids': [101, 102],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(CleaningSchedule.objects.filter(cleaner=cleaner).count(), 4)
+        done.refresh_from_db()
+        self.assertEqual(done.status, 'COMPLETED')
+
+
+class EmployeeRosterTests(HotelAPITestCase):
+    def test_roster_loads_current_positions_in_two_queries(self):
+        cleaners = [self.create_cleaner(f'000000000{index}') for index in range(3)]
+        manager = EmployeePosition.objects.create(name='Управляющий', salary=90000)
+        cleaners[2].terminate_contract()
+        EmploymentContract.objects.create(employee=cleaners[2].employee, position=manager, contract_type='PERMANENT',
+                                          start_date=date(2024, 6, 1))
+        unemployed = Employee.objects.create(passport_number='0000000009', first_name='Иван', last_name='Иванов')
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/hotel/employees/roster')
+
+        employees = response.data['employees']
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual([(employee['id'], employee['position'] and employee['position']['name'])
+                          for employee in employees],
+                         [(cleaners[0].employee_id, 'Уборщик'), (cleaners[1].employee_id, 'Уборщик'),
+                          (cleaners[2].employee_id, 'Управляющий'), (unemployed.id, None)])
+        # Ответ совпадает с /hotel/api/employees/, который берёт должности из кэша
+        self.assertEqual(employees, self.client.get('/hotel/api/employees/').data)
+        streamed = self.client.get('/hotel/employees/roster', {'stream': 'true'})
+        self.assertEqual(json.loads(b''.join(streamed.streaming_content)), {'employees': employees, 'count': 4})
+
+        response = self.client.get('/hotel/employees/roster', {'position': manager.id})
+        self.assertEqual([employee['id'] for employee in response.data['employees']], [cleaners[2].employee_id])
+        self.assertEqual(self.client.get('/hotel/employees/roster', {'position': 'x'}).status_code, 422)
+
+
+class RoomCleanerLookupTests(HotelAPITestCase):
+    def roster(self):
+        return set(RoomCleaningRoster.objects.values_list('room__number', 'weekday', 'cleaner_id', 'cleanings'))
+
+    def test_lookup_uses_roster_in_constant_queries(self):
+        room = self.create_room(101)
+        client = self.create_client('0000000001')
+        self.create_reservation(room, client, date(2024, 6, 1), date(2024, 6, 5))
+        cleaners = [self.create_cleaner(f'00000000{index:02d}') for index in range(5)]
+        # Все понедельники июня, каждый уборщик по два раза
+        CleaningSchedule.objects.bulk_create(
+            CleaningSchedule(cleaner=cleaner, room=room, cleaning_date=day)
+            for cleaner in cleaners for day in [date(2024, 6, 3), date(2024, 6, 10)]
+        )
+        CleaningSchedule.objects.create(cleaner=cleaners[0], room=room, cleaning_date=date(2024, 6, 4))
+
+        url = f'/hotel/clients/room-cleaner?client_id={client.id}&day_of_week=monday'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([employee['id'] for employee in response.data['employees']],
+                         [cleaner.employee_id for cleaner in cleaners])
+        tuesday = self.client.get(f'/hotel/clients/room-cleaner?client_id={client.id}&day_of_week=TUESDAY')
+        self.assertEqual([employee['id'] for employee in tuesday.data['employees']], [cleaners[0].employee_id])
+
+    def test_roster_follows_schedule_writes(self):
+        first, second = self.create_room(101), self.create_room(102)
+        cleaner = self.create_cleaner('0000000001')
+        schedule = CleaningSchedule.objects.create(cleaner=cleaner, room=first, cleaning_date=date(2024, 6, 3))
+        CleaningSchedule.objects.create(cleaner=cleaner, room=first, cleaning_date=date(2024, 6, 10))
+        self.assertEqual(schedule.weekday, 1)
+        self.assertEqual(self.roster(), {(101, 1, cleaner.id, 2)})
+
+        schedule.room = second
+        schedule.cleaning_date = date(2024, 6, 7)
+        schedule.save()
+        self.assertEqual(self.roster(), {(101, 1, cleaner.id, 1), (102, 5, cleaner.id, 1)})
+
+        CleaningSchedule.objects.filter(room=first).update(cleaning_date=date(2024, 6, 9))
+        self.assertEqual(self.roster(), {(101, 7, cleaner.id, 1), (102, 5, cleaner.id, 1)})
+
+        # Фильтр по прежней комнате после переноса уже ничего не находит, но сводка новой комнаты обновляется
+        CleaningSchedule.objects.filter(room=first).update(room=second,
+                                                           cleaning_date=F('cleaning_date') + timedelta(days=1))
+        self.assertEqual(self.roster(), {(102, 1, cleaner.id, 1), (102, 5, cleaner.id, 1)})
+        CleaningSchedule.objects.filter(room=second, cleaning_date=date(2024, 6, 10)).update(
+            room=first, cleaning_date=F('cleaning_date') - timedelta(days=1))
+        self.assertEqual(self.roster(), {(101, 7, cleaner.id, 1), (102, 5, cleaner.id, 1)})
+
+        CleaningSchedule.objects.filter(room=second).delete()
+        self.assertEqual(self.roster(), {(101, 7, cleaner.id, 1)})
+
+        cleaner.delete()
+        self.assertEqual(self.roster(), set())
+
+    def test_unknown_client_and_client_without_reservations(self):
+        client = self.create_client('0000000001')
+
+        missing = self.client.get('/hotel/clients/room-cleaner?client_id=999&day_of_week=MONDAY')
+        no_stays = self.client.get(f'/hotel/clients/room-cleaner?client_id={client.id}&day_of_week=MONDAY')
+
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(missing.data['detail'], "Клиент с id 999 не найден.")
+        self.assertEqual(no_stays.status_code, 404)
+
+
+class QueryPlanTests(TestCase):
+    # Строки плана, означающие полный просмотр таблицы
+    FULL_SCAN_PATTERNS = {
+        'sqlite': r'\bSCAN (\w+)',
+        'postgresql': r'Seq Scan on (\w+)',
+    }
+
+    def assertUsesIndexes(self, queryset):
+        if connection.vendor == 'postgresql':
+            # На почти пустых таблицах PostgreSQL выбирает Seq Scan и при наличии индекса
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertEqual(re.findall(self.FULL_SCAN_PATTERNS.get(connection.vendor, r'(?!)'), plan), [], plan)
+
+    def test_hot_queries_use_indexes(self):
+        day = date(2024, 1, 1)
+        hot_queries = {
+            'комнаты по статусу': Room.objects.filter(status__in=['AVAILABLE', 'REQUIRES_CLEANING']),
+            'брони клиента': Reservation.objects.filter(client_id=1, arrival_date__gte=day),
+            'пересечение броней номера': overlapping_reservations(day, date(2024, 1, 5), 1),
+            'брони за период': Reservation.objects.filter(arrival_date__gte=day, departure_date__lte=date(2024, 3, 31)),
+            'поиск клиентов по датам': Client.objects.search(start_date=day, end_date=date(2024, 2, 1)),
+            'последняя уборка номера': CleaningSchedule.objects.filter(room_id=1).order_by('-cleaning_date', '-id')[:1],
+            'окно планировщика уборок': CleaningSchedule.objects.filter(room_id__in=[1, 2],
+                                                                        cleaning_date__range=(day, day)),
+            'уборщики номера по дню недели': RoomCleaningRoster.objects.filter(room_id=1, weekday=1),
+            'активный контракт': EmploymentContract.objects.filter(employee_id=1, is_active=True),
+            'журнал событий': OutboxEvent.objects.filter(topic='room.status', id__gt=0).order_by('id'),
+            'квартальный отчёт': QuarterlyRoomReport.objects.filter(year=2024, quarter=1),
+        }
+        for name, queryset in hot_queries.items():
+            with self.subTest(name):
+                self.assertUsesIndexes(queryset)
+
+    def test_one_active_contract_per_employee(self):
+        position = EmployeePosition.objects.create(name='Уборщик', salary=30000)
+        employee = Employee.objects.create(passport_number='0000000001', first_name='Анна', last_name='Петрова')
+        contract = EmploymentContract.objects.create(employee=employee, position=position, contract_type='PERMANENT',
+                                                     start_date=date(2024, 1, 1))
+        EmploymentContract.objects.create(employee=employee, position=position, contract_type='PERMANENT',
+                                          start_date=date(2023, 1, 1), is_active=False)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            EmploymentContract.objects.create(employee=employee, position=position, contract_type='PERMANENT',
+                                              start_date=date(2024, 6, 1))
+
+        contract.is_active = False
+        contract.save()
+        EmploymentContract.objects.create(employee=employee, position=position, contract_type='FIXED_TERM',
+                                          start_date=date(2024, 6, 1))
+
+
+class SeedDataTests(TestCase):
+    def test_generated_data_is_consistent(self):
+        counts = HotelDataGenerator(rooms=6, clients=20, reservations=120, cleaners=2, cleaning_days=4,
+                                    today=date(2024, 6, 15), batch_size=50).generate()
+
+        self.assertEqual((counts['room'], counts['client'], counts['reservation'], counts['cleaningschedule']),
+                         (6, 20, 120, 24))
+        for reservation in Reservation.objects.exclude(status='CANCELLED'):
+            self.assertFalse(overlapping_reservations(reservation.arrival_date, reservation.departure_date,
+                                                      reservation.room_id).exclude(pk=reservation.pk).exists())
+            if reservation.departure_date <= date(2024, 6, 15):
+                self.assertEqual(reservation.status, 'CHECKED_OUT')
+        self.assertEqual(set(Room.objects.filter(status='OCCUPIED').values_list('id', flat=True)),
+                         set(Reservation.objects.filter(status='CHECKED_IN').values_list('room_id', flat=True)))
+        self.assertTrue(QuarterlyRoomReport.objects.exists())
+
+        # Повторный запуск дописывает данные, не нарушая уникальность номеров и паспортов
+        HotelDataGenerator(rooms=2, clients=5, reservations=10, cleaners=1, cleaning_days=1).generate()
+        self.assertEqual(Room.objects.count(), 8)
+
+    def test_url_suite_covers_get_routes(self):
+        paths = {hotel_url(name, {'pk': 1} if 'pk' in kwargs else {'entity': 'clients'} if kwargs else {})
+                 for name, _, kwargs in hotel_get_urls()}
+
+        self.assertTrue({'/hotel/', '/hotel/rooms', '/hotel/async/rooms', '/hotel/api/reservations/1/',
+                         '/hotel/bulk/clients/export'} <= paths)
+        self.assertFalse({'/hotel/reservation', '/hotel/cleaning-schedules/manage',
+                          '/hotel/bulk/clients/import', '/hotel/async/events/stream'} & paths)
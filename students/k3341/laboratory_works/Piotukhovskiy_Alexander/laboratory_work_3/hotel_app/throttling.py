@@ -0,0 +1,180 @@
+"""
+Ограничение частоты запросов к API скользящим окном. Если кэш Django общий для воркеров (Redis,
+Memcached), счётчики лежат в нём; при LocMemCache кэш и так свой у каждого процесса, поэтому
+счётчики хранятся в словаре процесса без сериализации. Дорогие представления задают throttle_cost:
+запрос расходует столько единиц бюджета. Частоты берутся из REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'];
+если частота для scope не задана, ограничение выключено.
+"""
+import inspect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+DEFAULT_COST = 1
+
+
+def throttle_cost(view):
+    return getattr(view, 'throttle_cost', DEFAULT_COST)
+
+
+def endpoint_name(view):
+    return view.__name__ if inspect.isfunction(view) else type(view).__name__
+
+
+class CacheCounters:
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def incr(self, key, amount, timeout):
+        if not self.cache.add(key, amount, timeout):
+            try:
+                self.cache.incr(key, amount)
+            except ValueError:
+                # Запись истекла между add и incr
+                self.cache.set(key, amount, timeout)
+
+    def clear(self):
+        # Счётчики сбрасываются вместе с кэшем (cache.clear())
+        pass
+
+
+class MemoryCounters:
+    PURGE_EVERY = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {ключ: [счётчик, время истечения]}
+        self._counters = {}
+        self._writes = 0
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            counter = self._counters.get(key)
+            if counter is not None and counter[1] > now:
+                found[key] = counter[0]
+        return found
+
+    def incr(self, key, amount, timeout):
+        now = time.monotonic()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or counter[1] <= now:
+                self._counters[key] = [amount, now + timeout]
+            else:
+                counter[0] += amount
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._counters = {key: counter for key, counter in self._counters.items() if counter[1] > now}
+
+    def clear(self):
+        with self._lock:
+            self._counters = {}
+
+
+def _default_counters():
+    if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+        return MemoryCounters()
+    return CacheCounters(default_cache)
+
+
+_counters = _default_counters()
+
+
+def reset_throttles():
+    _counters.clear()
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Счётчик скользящего окна: в кэше только суммы за текущее и предыдущее окно, а предыдущее
+    учитывается с весом непрошедшей доли окна. В отличие от SimpleRateThrottle, который хранит
+    и фильтрует список отметок времени всех запросов, проверка стоит одно чтение и одну запись
+    независимо от частоты.
+    """
+    counters = _counters
+    cache_format = 'hotel:throttle:%(scope)s:%(ident)s'
+    timer = time.time
+
+    def get_rate(self):
+        # Частоты читаются при создании троттла, а не при импорте: override_settings действует в тестах
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        return f'ip-{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        # Запрос дороже всего бюджета иначе не прошёл бы никогда
+        self.cost = min(throttle_cost(view), self.num_requests)
+        position = self.timer() / self.duration
+        window = int(position)
+        self.elapsed = position - window
+        keys = [f'{self.key}:{window - 1}', f'{self.key}:{window}']
+        counts = self.counters.get_many(keys)
+        self.previous = counts.get(keys[0], 0)
+        self.current = counts.get(keys[1], 0)
+
+        if self.previous * (1 - self.elapsed) + self.current + self.cost > self.num_requests:
+            return False
+        # Запись живёт два окна: в следующем окне она станет предыдущей
+        self.counters.incr(keys[1], self.cost, 2 * self.duration)
+        return True
+
+    def wait(self):
+        room = self.num_requests - self.current - self.cost
+        if room >= 0:
+            # Место освободится, когда вес предыдущего окна упадёт до previous * (1 - f) <= room
+            return max(0.0, 1 - room / self.previous - self.elapsed) * self.duration
+        # В текущем окне места нет: в следующем оно станет предыдущим и будет убывать так же
+        return (1 - self.elapsed + max(0.0, 1 - (self.num_requests - self.cost) / self.current)) * self.duration
+
+
+class ClientRateThrottle(SlidingWindowThrottle):
+    """
+    Общий бюджет клиента на все эндпоинты: по токену (пользователю), для анонимных запросов -
+    по IP с частотой scope anon.
+    """
+    scope = 'client'
+
+    def allow_request(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            self.scope = 'anon'
+            self.rate = self.get_rate()
+            self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident_key(request)}
+
+
+class EndpointRateThrottle(SlidingWindowThrottle):
+    """Бюджет клиента на отдельный эндпоинт: одна интеграция не выбирает весь общий бюджет одним отчётом."""
+    scope = 'endpoint'
+
+    def get_cache_key(self, request, view):
+        ident = f'{self.get_ident_key(request)}:{endpoint_name(view)}'
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+def throttle_wait(request, view):
+    # То же, что APIView.check_throttles, для async-представлений вне DRF: None, если запрос разрешён
+    waits = [throttle.wait() for throttle in [throttle_class() for throttle_class in
+                                              api_settings.DEFAULT_THROTTLE_CLASSES]
+             if not throttle.allow_request(request, view)]
+    return max(waits) if waits else None
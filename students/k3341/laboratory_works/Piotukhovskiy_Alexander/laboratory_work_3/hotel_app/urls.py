@@ -1,21 +1,40 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
+from hotel_app import async_views
 from hotel_app.views import ClientsListView, RoomsByStatusView, ClientStayOverlapView, ClientRoomCleaningView, \
     EmployeeManagementView, CleaningScheduleManagementView, ReservationManagementView, QuarterlyReportView, \
     ClientViewSet, RoomViewSet, ReservationViewSet, EmployeeViewSet, CleaningScheduleViewSet, PublicEndpoint, \
-    EmployeePositionsViewSet, EmploymentContractViewSet
+    EmployeePositionsViewSet, EmploymentContractViewSet, FreeRoomsView, BulkImportView, BulkExportView, \
+    CacheStatsView, MetricsView, OutboxEventsView, CleaningPlanView, BatchReservationView, EmployeeRosterView, \
+    OccupancyReportView
 
 urlpatterns = [
     path('clients', ClientsListView.as_view(), name='clients-list'),
     path('rooms', RoomsByStatusView.as_view(), name='available-rooms-count'),
+    path('rooms/free', FreeRoomsView.as_view(), name='free-rooms'),
     path('clients/stay-overlap', ClientStayOverlapView.as_view(), name='client-stay-overlap'),
     path('clients/room-cleaner', ClientRoomCleaningView.as_view(), name='client-room-cleaning'),
     path('employees/manage', EmployeeManagementView.as_view(), name='employee-management'),
+    path('employees/roster', EmployeeRosterView.as_view(), name='employee-roster'),
     path('cleaning-schedules/manage', CleaningScheduleManagementView.as_view(), name='update-cleaning-schedule'),
+    path('cleaning-schedules/plan', CleaningPlanView.as_view(), name='plan-cleaning-schedule'),
     path('reservation', ReservationManagementView.as_view(), name='create-reservation'),
+    path('reservation/batch', BatchReservationView.as_view(), name='batch-create-reservation'),
     path('reservation/<int:reservation_id>', ReservationManagementView.as_view(), name='update-reservation'),
     path('reports/quarterly', QuarterlyReportView.as_view(), name='quarterly-report'),
+    path('reports/occupancy', OccupancyReportView.as_view(), name='occupancy-report'),
+    path('bulk/<str:entity>/import', BulkImportView.as_view(), name='bulk-import'),
+    path('bulk/<str:entity>/export', BulkExportView.as_view(), name='bulk-export'),
+    path('cache/stats', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('events', OutboxEventsView.as_view(), name='outbox-events'),
+    path('async/clients', async_views.clients_list, name='async-clients-list'),
+    path('async/rooms', async_views.rooms_by_status, name='async-rooms-by-status'),
+    path('async/clients/stay-overlap', async_views.client_stay_overlap, name='async-client-stay-overlap'),
+    path('async/reports/quarterly', async_views.quarterly_report, name='async-quarterly-report'),
+    path('async/events', async_views.change_feed, name='async-change-feed'),
+    path('async/events/stream', async_views.change_stream, name='async-change-stream'),
     path("health", PublicEndpoint.as_view(), name='hello-world')
 ]
 
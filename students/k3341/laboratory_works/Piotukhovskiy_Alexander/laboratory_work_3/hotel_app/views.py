@@ -1,24 +1,70 @@
 import calendar
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from django.core.exceptions import ValidationError as DRFValidationError
-from django.db import transaction
-from django.db.models import Q, Sum, Count, F, ExpressionWrapper, IntegerField
-from django.db.models.functions import Cast, Substr
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, viewsets
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
-from .models import Reservation, Client, Room, CleaningSchedule, Employee, EmployeePosition, EmploymentContract, \
-    RoomPriceHistory
+from .models import Reservation, Client, Room, RoomType, CleaningSchedule, Employee, EmployeePosition, \
+    EmploymentContract, OutboxEvent, RoomCleaningRoster
+from .analytics import ANALYTICS_CACHE_MODELS, occupancy_report
+from .availability import lock_room, is_room_free, free_rooms
+from .booking import book_batch
+from .cache import cached, cache_stats
+from .changefeed import read_feed
+from .cleaning import PlanningError, apply_schedule, plan_cleaning
+from .conditional import ConditionalGetMixin, conditional_get, request_params
+from .fastpath import ValuesListMixin
+from .bulk import BULK_ENTITIES, PARSERS, CSV_CONTENT_TYPE, NDJSON_CONTENT_TYPE, import_rows, iter_export
+from .metrics import HISTOGRAM, LATENCY_BUCKETS_MS, query_budget
+from .pricing import quote_stay
+from .reports import read_quarterly_report
+from .state import TransitionError, check_reservation_transition, room_status_after, transition_rooms, \
+    record_reservation_status, record_reservation_update, reservation_snapshot
+from .streaming import StreamingListMixin, wants_stream
 from .serializers import ClientSerializer, RoomSerializer, ClientStayOverlapSerializer, CleaningEmployeeSerializer, \
     ClientRoomCleaningSerializer, HireEmployeeSerializer, FireEmployeeSerializer, EmploymentContractDetailSerializer, \
     UpdateEmployeeSerializer, UpdateCleaningScheduleSerializer, CreateReservationSerializer, \
     UpdateReservationSerializer, QuarterlyReportSerializer, ReservationSerializer, EmployeeSerializer, \
-    CleaningScheduleSerializer, EmployeePositionSerializer
+    CleaningScheduleSerializer, EmployeePositionSerializer, AvailableRoomSerializer, FreeRoomsSearchSerializer, \
+    OutboxEventSerializer, CleaningPlanSerializer, BatchReservationSerializer, OccupancyReportSerializer, \
+    CLIENT_VALUES, CLEANING_SCHEDULE_VALUES
+
+
+stream_parameter = openapi.Parameter(
+    'stream',
+    openapi.IN_QUERY,
+    description="Потоковая выдача (true/false). Строки читаются из базы порциями и отправляются по мере сериализации.",
+    type=openapi.TYPE_BOOLEAN,
+    required=False,
+)
+
+pagination_parameters = [
+    openapi.Parameter(
+        'cursor',
+        openapi.IN_QUERY,
+        description="Курсор страницы из полей next/previous предыдущего ответа.",
+        type=openapi.TYPE_STRING,
+        required=False,
+    ),
+    openapi.Parameter(
+        'page_size',
+        openapi.IN_QUERY,
+        description="Размер страницы (не больше 1000). Если не указан ни cursor, ни page_size, возвращается полный список.",
+        type=openapi.TYPE_INTEGER,
+        required=False,
+    ),
+    stream_parameter,
+]
+
+stream_list_schema = method_decorator(name='list', decorator=swagger_auto_schema(manual_parameters=[stream_parameter]))
 
 
 class PublicEndpoint(generics.GenericAPIView):
@@ -31,19 +77,66 @@ class PublicEndpoint(generics.GenericAPIView):
         return Response({"message": "Hello POST world!"})
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+def client_search_params(query_params):
+    return {name: query_params.get(name) for name in ('room', 'start_date', 'end_date', 'city')}
+
+
+def parse_room_statuses(statuses):
+    # Возвращает отсортированный список статусов (None, если фильтр не задан) и тело ошибки
+    if not statuses:
+        return None, None
+
+    status_list = sorted({status.strip().upper() for status in statuses.split(',') if status.strip()})
+    valid_statuses = [choice[0] for choice in Room.STATUS_CHOICES]
+    invalid_statuses = [status for status in status_list if status not in valid_statuses]
+    if invalid_statuses:
+        return None, {"detail": f"Недопустимые статусы: {invalid_statuses}. Доступные статусы: {valid_statuses}"}
+    return status_list, None
+
+
+# Модели, от которых зависят закэшированные списки: их изменение сбрасывает кэш (см. signals.py)
+CLIENT_LIST_CACHE_MODELS = [Client, Room, Reservation]
+ROOM_LIST_CACHE_MODELS = [Room, RoomType, Reservation, Client, CleaningSchedule, EmploymentContract, Employee]
+
+
+@stream_list_schema
+class ClientViewSet(StreamingListMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
+    values_mapper = CLIENT_VALUES
 
 
-class RoomViewSet(viewsets.ModelViewSet):
-    queryset = Room.objects.all()
+@stream_list_schema
+class RoomViewSet(ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    queryset = Room.objects.with_current_state()
     serializer_class = RoomSerializer
+    conditional_models = ROOM_LIST_CACHE_MODELS
+
+    def perform_update(self, serializer):
+        # Ручная смена статуса не проверяет переходы, но попадает в журнал статусов
+        new_status = serializer.validated_data.pop('status', None)
+        with transaction.atomic():
+            room = serializer.save()
+            if new_status is not None:
+                transition_rooms({room.id: new_status}, force=True)
+                room.status = new_status
 
 
-class ReservationViewSet(viewsets.ModelViewSet):
-    queryset = Reservation.objects.all()
+@stream_list_schema
+class ReservationViewSet(ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    queryset = Reservation.objects.with_room_state()
     serializer_class = ReservationSerializer
+    # В брони вложены клиент и комната со своим состоянием
+    conditional_models = ROOM_LIST_CACHE_MODELS
+
+    def perform_update(self, serializer):
+        # Правки через CRUD попадают в ленту изменений так же, как через reservation/<id>
+        previous_status = serializer.instance.status
+        before = reservation_snapshot(serializer.instance)
+        with transaction.atomic():
+            reservation = serializer.save()
+            record_reservation_status(reservation, previous_status)
+            record_reservation_update(reservation, before)
 
 
 class EmployeeViewSet(viewsets.ModelViewSet):
@@ -61,57 +154,30 @@ class EmployeePositionsViewSet(viewsets.ModelViewSet):
     serializer_class = EmployeePositionSerializer
 
 
-class CleaningScheduleViewSet(viewsets.ModelViewSet):
+@stream_list_schema
+class CleaningScheduleViewSet(StreamingListMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = CleaningSchedule.objects.all()
     serializer_class = CleaningScheduleSerializer
+    values_mapper = CLEANING_SCHEDULE_VALUES
 
 
-class ClientsListView(generics.ListAPIView):
+class ClientsListView(StreamingListMixin, ValuesListMixin, generics.ListAPIView):
     serializer_class = ClientSerializer
+    values_mapper = CLIENT_VALUES
+    stream_results_key = 'clients'
 
     def get_queryset(self):
-        room_number = self.request.query_params.get('room', None)
-        start_date = self.request.query_params.get('start_date', None)
-        end_date = self.request.query_params.get('end_date', None)
-        city_name = self.request.query_params.get('city', None)
-
-        queryset = Client.objects.all()
-
-        if room_number:
-            try:
-                room_number = Room.objects.get(number=room_number)
-            except Room.DoesNotExist:
-                return Client.objects.none()
-
-            reservations = Reservation.objects.filter(room=room_number)
-            client_ids = reservations.values_list('client_id', flat=True)
-            queryset = queryset.filter(id__in=client_ids)
-
-        if start_date or end_date:
-            date_filter = Q()
-
-            if start_date:
-                date_filter &= Q(departure_date__gte=start_date)
-
-            if end_date:
-                date_filter &= Q(arrival_date__lte=end_date)
-
-            reservations = Reservation.objects.filter(date_filter)
-            client_ids = reservations.values_list('client_id', flat=True)
-            queryset = queryset.filter(id__in=client_ids)
-
-        if city_name:
-            queryset = queryset.filter(city_from__icontains=city_name)
-
-        return queryset
+        return Client.objects.search(**client_search_params(self.request.query_params))
 
     @swagger_auto_schema(
-        operation_description="Получить список клиентов с возможностью фильтрации по номеру комнаты, датам проживания и городу.",
+        operation_description="Получить список клиентов с возможностью фильтрации по номеру комнаты, датам проживания и "
+                              "городу. Все фильтры проверяются одним запросом к базе.",
         manual_parameters=[
             openapi.Parameter(
                 'room',
                 openapi.IN_QUERY,
-                description="Номер комнаты для фильтрации. Возвращаются клиенты, проживавшие в указанной комнате.",
+                description="Номер комнаты для фильтрации. Возвращаются клиенты, проживавшие в указанной комнате "
+                            "(вместе с датами - в этой комнате в указанный период).",
                 type=openapi.TYPE_INTEGER,
                 required=False,
             ),
@@ -134,11 +200,11 @@ class ClientsListView(generics.ListAPIView):
             openapi.Parameter(
                 'city',
                 openapi.IN_QUERY,
-                description="Город, из которого приехал клиент. Фильтрация клиентов по городу.",
+                description="Начало названия города, из которого приехал клиент, без учёта регистра и различия е/ё.",
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
-        ],
+        ] + pagination_parameters,
         responses={
             200: openapi.Response(
                 description="Список клиентов, соответствующих критериям фильтрации.",
@@ -181,13 +247,25 @@ class ClientsListView(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
 
-        clients_count = queryset.count()
+        if wants_stream(request):
+            return self.stream_queryset(queryset)
+
+        page = self.paginate_queryset(self.values_mapper.values(queryset))
+        if page is not None:
+            return Response({
+                "next": self.paginator.get_next_link(),
+                "previous": self.paginator.get_previous_link(),
+                "clients": self.values_mapper.map_dicts(page)
+            })
+
+        clients = cached('clients-list', CLIENT_LIST_CACHE_MODELS, client_search_params(request.query_params),
+                         lambda: self.values_mapper.serialize(queryset))
+        clients_count = len(clients)
 
         if clients_count > 0:
-            serializer = self.get_serializer(queryset, many=True)
             return Response({
                 "count": clients_count,
-                "clients": serializer.data
+                "clients": clients
             })
         else:
             return Response({
@@ -197,7 +275,9 @@ class ClientsListView(generics.ListAPIView):
             }, status=404)
 
 
-class RoomsByStatusView(generics.GenericAPIView):
+class RoomsByStatusView(StreamingListMixin, generics.GenericAPIView):
+    serializer_class = RoomSerializer
+    stream_results_key = 'rooms'
 
     @swagger_auto_schema(
         operation_description="Получить список комнат по их статусам. Возвращает комнаты с указанными статусами и общее их количество.",
@@ -209,7 +289,7 @@ class RoomsByStatusView(generics.GenericAPIView):
                 type=openapi.TYPE_STRING,
                 required=True,
             ),
-        ],
+        ] + pagination_parameters,
         responses={
             200: openapi.Response(
                 description="Список комнат с указанными статусами.",
@@ -248,6 +328,9 @@ class RoomsByStatusView(generics.GenericAPIView):
                     }
                 },
             ),
+            304: openapi.Response(
+                description="Список не изменился с версии из заголовков If-None-Match (ETag) или If-Modified-Since.",
+            ),
             422: openapi.Response(
                 description="Ошибки валидации. Например, отсутствует обязательный параметр или указаны недопустимые статусы.",
                 examples={
@@ -262,27 +345,115 @@ class RoomsByStatusView(generics.GenericAPIView):
         },
     )
     def get(self, request, *args, **kwargs):
-        statuses = request.query_params.get('status', None)
-        rooms_queryset = Room.objects.all()
-        if statuses:
-            status_list = [status.strip().upper() for status in statuses.split(',') if status.strip()]
-            valid_statuses = [choice[0] for choice in Room.STATUS_CHOICES]
-            invalid_statuses = [status for status in status_list if status not in valid_statuses]
-            if invalid_statuses:
-                return Response(
-                    {"detail": f"Недопустимые статусы: {invalid_statuses}. Доступные статусы: {valid_statuses}"},
-                    status=422
-                )
+        return conditional_get(request, ROOM_LIST_CACHE_MODELS, request_params(request.query_params),
+                               lambda: self.rooms_response(request))
+
+    def rooms_response(self, request):
+        status_list, error = parse_room_statuses(request.query_params.get('status', None))
+        if error:
+            return Response(error, status=422)
+
+        rooms_queryset = Room.objects.with_current_state()
+        if status_list is not None:
             rooms_queryset = rooms_queryset.filter(status__in=status_list)
-        rooms_count = rooms_queryset.count()
-        rooms_data = RoomSerializer(rooms_queryset, many=True).data
+
+        if wants_stream(request):
+            return self.stream_queryset(rooms_queryset)
+
+        page = self.paginate_queryset(rooms_queryset)
+        if page is not None:
+            return Response({
+                "next": self.paginator.get_next_link(),
+                "previous": self.paginator.get_previous_link(),
+                "rooms": RoomSerializer(page, many=True).data
+            })
+
+        rooms_data = cached('rooms-by-status', ROOM_LIST_CACHE_MODELS, status_list,
+                            lambda: RoomSerializer(rooms_queryset, many=True).data)
 
         return Response({
-            "count": rooms_count,
+            "count": len(rooms_data),
             "rooms": rooms_data
         })
 
 
+class FreeRoomsView(generics.GenericAPIView):
+    serializer_class = FreeRoomsSearchSerializer
+
+    @swagger_auto_schema(
+        operation_description="Найти номера, свободные на весь указанный период, с фильтрацией по типу номера.",
+        manual_parameters=[
+            openapi.Parameter(
+                'start_date',
+                openapi.IN_QUERY,
+                description="Дата заселения (формат YYYY-MM-DD).",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=True,
+            ),
+            openapi.Parameter(
+                'end_date',
+                openapi.IN_QUERY,
+                description="Дата выезда (формат YYYY-MM-DD).",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=True,
+            ),
+            openapi.Parameter(
+                'room_type',
+                openapi.IN_QUERY,
+                description="ID типа номера для фильтрации.",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Список свободных номеров.",
+                examples={
+                    "application/json": {
+                        "count": 1,
+                        "rooms": [
+                            {
+                                "id": 1,
+                                "number": 101,
+                                "type_id": 1,
+                                "type_name": "Одноместный",
+                                "phone": "1234567890",
+                                "status": "AVAILABLE"
+                            }
+                        ]
+                    }
+                },
+            ),
+            422: openapi.Response(
+                description="Ошибки валидации данных. Например, дата выезда раньше даты заселения.",
+                examples={
+                    "application/json": {
+                        "end_date": ["Дата выезда должна быть позже даты заселения."]
+                    }
+                },
+            ),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        search_serializer = self.get_serializer(data=request.query_params)
+        if not search_serializer.is_valid():
+            return Response(search_serializer.errors, status=422)
+
+        validated_data = search_serializer.validated_data
+        rooms = list(free_rooms(
+            validated_data['start_date'],
+            validated_data['end_date'],
+            validated_data.get('room_type')
+        ))
+
+        return Response({
+            "count": len(rooms),
+            "rooms": AvailableRoomSerializer(rooms, many=True).data
+        })
+
+
 class ClientStayOverlapView(generics.GenericAPIView):
     serializer_class = ClientStayOverlapSerializer
 
@@ -378,33 +549,13 @@ class ClientStayOverlapView(generics.GenericAPIView):
                 status=404
             )
 
-        client_reservations = Reservation.objects.filter(client=target_client)
-
-        date_filter = Q()
-        if start_date:
-            date_filter &= Q(arrival_date__gte=start_date)
-        if end_date:
-            date_filter &= Q(departure_date__lte=end_date)
-
-        if date_filter:
-            client_reservations = client_reservations.filter(date_filter)
-
-        overlapping_filter = Q()
-        for reservation in client_reservations:
-            overlapping_filter |= Q(arrival_date__lt=reservation.departure_date) & Q(
-                departure_date__gt=reservation.arrival_date)
-
-        if overlapping_filter:
-            overlapping_reservations = Reservation.objects.filter(overlapping_filter).exclude(client=target_client)
-            overlapping_clients_ids = overlapping_reservations.values_list('client_id', flat=True).distinct()
-            overlapping_clients = Client.objects.filter(id__in=overlapping_clients_ids)
-        else:
-            overlapping_clients = Client.objects.none()
-
+        overlapping_clients = list(
+            Client.objects.overlapping_with(target_client.id, start_date, end_date).order_by('id')
+        )
         clients_data = ClientSerializer(overlapping_clients, many=True).data
 
         return Response({
-            "count": overlapping_clients.count(),
+            "count": len(overlapping_clients),
             "clients": clients_data
         })
 
@@ -484,29 +635,26 @@ class ClientRoomCleaningView(generics.GenericAPIView):
         client_id = validated_data['client_id']
         day_of_week = validated_data['day_of_week']
 
-        try:
-            target_client = Client.objects.get(id=client_id)
-        except Client.DoesNotExist:
-            return Response(
-                {"detail": f"Клиент с id {client_id} не найден."},
-                status=404
-            )
-
-        try:
-            reservation = Reservation.objects.filter(client=target_client).latest('departure_date')
-            room = reservation.room
-        except Reservation.DoesNotExist:
+        # Комната последнего бронирования клиента; существование клиента проверяется, только если броней нет
+        room_id = Reservation.objects.filter(client_id=client_id).order_by('-departure_date').values_list(
+            'room_id', flat=True).first()
+        if room_id is None:
+            if not Client.objects.filter(id=client_id).exists():
+                return Response(
+                    {"detail": f"Клиент с id {client_id} не найден."},
+                    status=404
+                )
             return Response(
                 {"detail": f"Нет активных или завершённых бронирований для клиента с id {client_id}."},
                 status=404
             )
 
-        cleaning_schedules = CleaningSchedule.objects.filter(
-            room=room,
-            cleaning_date__week_day=self.get_day_number(day_of_week)
-        )
+        roster = RoomCleaningRoster.objects.filter(
+            room_id=room_id,
+            weekday=self.get_day_number(day_of_week)
+        ).select_related('cleaner__employee').order_by('cleaner__employee_id')
 
-        employees = [schedule.cleaner.employee for schedule in cleaning_schedules]
+        employees = list({entry.cleaner.employee_id: entry.cleaner.employee for entry in roster}.values())
         employees_data = CleaningEmployeeSerializer(employees, many=True).data
 
         return Response({
@@ -515,18 +663,95 @@ class ClientRoomCleaningView(generics.GenericAPIView):
         })
 
     def get_day_number(self, day_of_week):
+        # Нумерация ISO, как в CleaningSchedule.weekday
         days = {
-            'MONDAY': 2,
-            'TUESDAY': 3,
-            'WEDNESDAY': 4,
-            'THURSDAY': 5,
-            'FRIDAY': 6,
-            'SATURDAY': 7,
-            'SUNDAY': 1,
+            'MONDAY': 1,
+            'TUESDAY': 2,
+            'WEDNESDAY': 3,
+            'THURSDAY': 4,
+            'FRIDAY': 5,
+            'SATURDAY': 6,
+            'SUNDAY': 7,
         }
         return days.get(day_of_week.upper(), None)
 
 
+class EmployeeRosterView(StreamingListMixin, generics.GenericAPIView):
+    serializer_class = EmployeeSerializer
+    stream_results_key = 'employees'
+
+    def get_queryset(self):
+        # Два запроса на весь список: сотрудники и их активные контракты с должностями
+        return Employee.objects.with_current_position().order_by('id')
+
+    @swagger_auto_schema(
+        operation_description="Список всех сотрудников с текущей должностью (по активному контракту).",
+        manual_parameters=[
+            openapi.Parameter(
+                'position',
+                openapi.IN_QUERY,
+                description="ID должности. Возвращаются только сотрудники с активным контрактом на этой должности.",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+            stream_parameter,
+        ],
+        responses={
+            200: openapi.Response(
+                description="Сотрудники с текущей должностью. У сотрудника без активного контракта position равен null.",
+                examples={
+                    "application/json": {
+                        "count": 2,
+                        "employees": [
+                            {
+                                "id": 1,
+                                "passport_number": "1234567890",
+                                "first_name": "Анна",
+                                "last_name": "Петрова",
+                                "middle_name": None,
+                                "position": {"id": 1, "name": "Уборщик", "salary": 30000}
+                            },
+                            {
+                                "id": 2,
+                                "passport_number": "0987654321",
+                                "first_name": "Иван",
+                                "last_name": "Иванов",
+                                "middle_name": "Иванович",
+                                "position": None
+                            }
+                        ]
+                    }
+                },
+            ),
+            422: openapi.Response(
+                description="Некорректный ID должности.",
+                examples={
+                    "application/json": {
+                        "detail": "Параметр position должен быть целым числом."
+                    }
+                },
+            ),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        position = request.query_params.get('position')
+        if position is not None:
+            if not position.isdigit():
+                return Response({"detail": "Параметр position должен быть целым числом."}, status=422)
+            queryset = queryset.filter(employmentcontract__is_active=True,
+                                       employmentcontract__position_id=int(position))
+
+        if wants_stream(request):
+            return self.stream_queryset(queryset)
+
+        employees = self.get_serializer(queryset, many=True).data
+        return Response({
+            "count": len(employees),
+            "employees": employees
+        })
+
+
 class EmployeeManagementView(generics.GenericAPIView):
     serializer_classes = {
         'post': HireEmployeeSerializer,
@@ -637,13 +862,21 @@ class EmployeeManagementView(generics.GenericAPIView):
                     status=422
                 )
             position = EmployeePosition.objects.get(id=validated_data['position_id'])
-            contract = EmploymentContract.objects.create(
-                employee=employee,
-                position=position,
-                contract_type=validated_data['contract_type'],
-                start_date=validated_data['start_date'],
-                end_date=validated_data.get('end_date')
-            )
+            try:
+                # Параллельный найм мог успеть создать контракт после проверки выше: его отсекает уникальный индекс
+                with transaction.atomic():
+                    contract = EmploymentContract.objects.create(
+                        employee=employee,
+                        position=position,
+                        contract_type=validated_data['contract_type'],
+                        start_date=validated_data['start_date'],
+                        end_date=validated_data.get('end_date')
+                    )
+            except IntegrityError:
+                return Response(
+                    {"detail": "У сотрудника уже есть активный контракт."},
+                    status=422
+                )
 
             contract_serializer = EmploymentContractDetailSerializer(contract)
             return Response(contract_serializer.data, status=201)
@@ -895,30 +1128,90 @@ class CleaningScheduleManagementView(generics.GenericAPIView):
             room_numbers = validated_data['room_ids']
 
             with transaction.atomic():
-                rooms = Room.objects.filter(number__in=room_numbers)
-
-                CleaningSchedule.objects.filter(
-                    cleaner_id=cleaner_id,
+                # Расписание привязано к контракту, а в запросе передаётся id сотрудника
+                contract_id = EmploymentContract.objects.filter(
+                    employee_id=cleaner_id, is_active=True
+                ).order_by('-start_date', '-id').values_list('id', flat=True).first()
+                room_ids = list(Room.objects.filter(number__in=room_numbers).values_list('id', flat=True))
+
+                scope = CleaningSchedule.objects.filter(
+                    cleaner_id=contract_id,
                     cleaning_date__in=cleaning_dates,
-                    room__in=rooms
-                ).delete()
-
-                schedules = [
-                    CleaningSchedule(
-                        cleaner_id=cleaner_id,
-                        room=room,
-                        cleaning_date=cleaning_date
-                    )
+                    room_id__in=room_ids
+                )
+                apply_schedule(scope, {
+                    (contract_id, room_id, cleaning_date)
                     for cleaning_date in cleaning_dates
-                    for room in rooms
-                ]
-                CleaningSchedule.objects.bulk_create(schedules)
+                    for room_id in room_ids
+                })
 
             return Response({"detail": "Расписание успешно обновлено."})
 
         return Response(serializer.errors, status=422)
 
 
+class CleaningPlanView(generics.GenericAPIView):
+    # Сколько единиц бюджета запросов расходует вызов (см. hotel_app.throttling)
+    throttle_cost = 10
+    serializer_class = CleaningPlanSerializer
+
+    @swagger_auto_schema(
+        operation_description="Распределить комнаты, требующие уборки, между уборщиками с действующими контрактами "
+                              "на каждый день периода. Существующее расписание обновляется по разнице: новые уборки "
+                              "добавляются, снятые удаляются, совпадающие и уже начатые не меняются.",
+        request_body=CleaningPlanSerializer,
+        responses={
+            200: openapi.Response(
+                description="Расписание составлено.",
+                examples={
+                    "application/json": {
+                        "start_date": "2024-12-01",
+                        "end_date": "2024-12-07",
+                        "rooms": 12,
+                        "created": 60,
+                        "deleted": 4,
+                        "unchanged": 20,
+                        "load": [
+                            {"contract_id": 3, "cleanings": 42},
+                            {"contract_id": 5, "cleanings": 42}
+                        ]
+                    }
+                },
+            ),
+            422: openapi.Response(
+                description="Ошибки валидации или дни, в которые некому убирать.",
+                examples={
+                    "application/json": {
+                        "unassigned_dates": ["2024-12-06", "2024-12-07"]
+                    }
+                },
+            ),
+        },
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=422)
+
+        try:
+            plan, diff = plan_cleaning(**serializer.validated_data)
+        except PlanningError as error:
+            return Response(error.errors, status=422)
+
+        return Response({
+            "start_date": plan.start_date,
+            "end_date": plan.end_date,
+            "rooms": len(plan.rooms),
+            "created": diff.created,
+            "deleted": diff.deleted,
+            "unchanged": diff.unchanged,
+            "load": [
+                {"contract_id": contract_id, "cleanings": count}
+                for contract_id, count in sorted(plan.load().items())
+            ],
+        })
+
+
 class ReservationManagementView(generics.GenericAPIView):
     serializer_classes = {
         'post': CreateReservationSerializer,
@@ -995,7 +1288,11 @@ class ReservationManagementView(generics.GenericAPIView):
                         "arrival_date": "2024-12-10",
                         "departure_date": "2024-12-15",
                         "status": "BOOKED",
-                        "price_at_booking": 5000
+                        "price_at_booking": 5000,
+                        "price_breakdown": [
+                            {"start_date": "2024-12-10", "end_date": "2024-12-15", "nights": 5, "price": 1000,
+                             "subtotal": 5000}
+                        ]
                     }
                 },
             ),
@@ -1027,6 +1324,13 @@ class ReservationManagementView(generics.GenericAPIView):
             payment_status = request.data.get('payment_status', None)
 
             with transaction.atomic():
+                room = lock_room(room)
+                if not is_room_free(room, arrival_date, departure_date):
+                    return Response(
+                        {"room_number": f"Комната {room.number} уже забронирована на указанные даты."},
+                        status=422
+                    )
+
                 client, created = Client.objects.get_or_create(
                     passport_number=passport_number,
                     defaults={
@@ -1044,7 +1348,7 @@ class ReservationManagementView(generics.GenericAPIView):
                     client.city_from = city_from
                     client.save()
 
-                total_price = self.calculate_total_price(room, arrival_date, departure_date)
+                quote = self.calculate_total_price(room, arrival_date, departure_date)
 
                 reservation = Reservation.objects.create(
                     client=client,
@@ -1055,12 +1359,12 @@ class ReservationManagementView(generics.GenericAPIView):
                     departure_date=departure_date,
                     status=status or Reservation._meta.get_field('status').get_default(),
                     payment_status=payment_status or Reservation._meta.get_field('payment_status').get_default(),
-                    price_at_booking=total_price,
-                    final_price=total_price,
+                    price_at_booking=quote.total,
+                    final_price=quote.total,
                 )
 
-                room.status = 'OCCUPIED'
-                room.save()
+                record_reservation_status(reservation, None)
+                transition_rooms({room.id: 'OCCUPIED'})
 
             return Response(
                 {
@@ -1070,7 +1374,8 @@ class ReservationManagementView(generics.GenericAPIView):
                     "arrival_date": reservation.arrival_date,
                     "departure_date": reservation.departure_date,
                     "status": reservation.status,
-                    "price_at_booking": reservation.price_at_booking
+                    "price_at_booking": reservation.price_at_booking,
+                    "price_breakdown": [line.as_dict() for line in quote.breakdown]
                 },
                 status=201
             )
@@ -1126,7 +1431,13 @@ class ReservationManagementView(generics.GenericAPIView):
                         "departure_date": "2024-12-18",
                         "status": "CONFIRMED",
                         "payment_status": "PAID",
-                        "price_at_booking": 7000
+                        "price_at_booking": 7000,
+                        "price_breakdown": [
+                            {"start_date": "2024-12-12", "end_date": "2024-12-16", "nights": 4, "price": 1000,
+                             "subtotal": 4000},
+                            {"start_date": "2024-12-16", "end_date": "2024-12-18", "nights": 2, "price": 1500,
+                             "subtotal": 3000}
+                        ]
                     }
                 },
             ),
@@ -1139,10 +1450,12 @@ class ReservationManagementView(generics.GenericAPIView):
                 },
             ),
             422: openapi.Response(
-                description="Ошибки валидации данных. Например, некорректные даты или комната недоступна.",
+                description="Ошибки валидации данных. Например, некорректные даты, комната недоступна "
+                            "или недопустимый переход статуса.",
                 examples={
                     "application/json": {
                         "departure_date": "Дата выезда должна быть позже даты заселения.",
+                        "status": "Недопустимый переход статуса бронирования: CHECKED_OUT → CONFIRMED.",
                         "room_number": "Комната с номером 102 недоступна для бронирования."
                     }
                 },
@@ -1152,91 +1465,185 @@ class ReservationManagementView(generics.GenericAPIView):
     def patch(self, request, *args, **kwargs):
         reservation_id = kwargs.get('reservation_id')
 
-        try:
-            reservation = Reservation.objects.select_for_update().get(id=reservation_id)
-        except Reservation.DoesNotExist:
-            return Response(
-                {"detail": "Бронирование с указанным ID не найдено."},
-                status=404
-            )
+        with transaction.atomic():
+            try:
+                reservation = Reservation.objects.select_for_update().get(id=reservation_id)
+            except Reservation.DoesNotExist:
+                return Response(
+                    {"detail": "Бронирование с указанным ID не найдено."},
+                    status=404
+                )
+            before = reservation_snapshot(reservation)
 
-        serializer = self.get_serializer(data=request.data)
-        if serializer.is_valid():
-            validated_data = serializer.validated_data
+            serializer = self.get_serializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=422)
 
-            with transaction.atomic():
-                if 'arrival_date' in validated_data:
-                    reservation.arrival_date = validated_data['arrival_date']
-                if 'departure_date' in validated_data:
-                    reservation.departure_date = validated_data['departure_date']
-
-                previous_status = reservation.status
-                if 'status' in validated_data:
-                    reservation.status = validated_data['status']
-
-                    if validated_data['status'] in ['CANCELED', 'CHECKED_OUT']:
-                        if validated_data['status'] == 'CANCELED' and previous_status != 'CHECKED_IN':
-                            reservation.room.status = 'AVAILABLE'
-                        elif validated_data['status'] == 'CHECKED_OUT' and previous_status == 'CHECKED_IN':
-                            reservation.room.status = 'REQUIRES_CLEANING'
-                        reservation.room.save()
-
-                if 'payment_status' in validated_data:
-                    reservation.payment_status = validated_data['payment_status']
-                if 'room' in validated_data:
-                    reservation.room.status = 'AVAILABLE'
-                    reservation.room.save()
-                    reservation.room = validated_data['room']
-                    reservation.room.status = 'OCCUPIED'
-                    reservation.room.save()
-
-                if 'arrival_date' in validated_data or 'departure_date' in validated_data or 'room' in validated_data:
-                    reservation.price_at_booking = self.calculate_total_price(
-                        reservation.room,
-                        reservation.arrival_date,
-                        reservation.departure_date
-                    )
+            validated_data = serializer.validated_data
 
-                reservation.updated_by = request.user
-                reservation.last_updated_date = timezone.now()
-                reservation.save()
+            if 'arrival_date' in validated_data:
+                reservation.arrival_date = validated_data['arrival_date']
+            if 'departure_date' in validated_data:
+                reservation.departure_date = validated_data['departure_date']
 
-            return Response(
-                {
-                    "reservation_id": reservation.id,
-                    "client_id": reservation.client.id,
-                    "room_number": reservation.room.number,
-                    "arrival_date": reservation.arrival_date,
-                    "departure_date": reservation.departure_date,
-                    "status": reservation.status,
-                    "payment_status": reservation.payment_status,
-                    "price_at_booking": reservation.price_at_booking,
-                },
-                status=200
-            )
+            if reservation.departure_date <= reservation.arrival_date:
+                return Response(
+                    {"departure_date": "Дата выезда должна быть позже даты прибытия."},
+                    status=422
+                )
 
-        return Response(serializer.errors, status=422)
+            if 'arrival_date' in validated_data or 'departure_date' in validated_data or 'room' in validated_data:
+                target_room = lock_room(validated_data.get('room', reservation.room))
+                if not is_room_free(target_room, reservation.arrival_date, reservation.departure_date,
+                                    exclude_reservation=reservation):
+                    return Response(
+                        {"room_number": f"Комната {target_room.number} уже забронирована на указанные даты."},
+                        status=422
+                    )
+                if 'room' in validated_data:
+                    validated_data['room'] = target_room
+
+            previous_status = reservation.status
+            if 'status' in validated_data:
+                try:
+                    check_reservation_transition(previous_status, validated_data['status'])
+                except TransitionError as error:
+                    return Response({"status": str(error)}, status=422)
+                reservation.status = validated_data['status']
+
+            if 'payment_status' in validated_data:
+                reservation.payment_status = validated_data['payment_status']
+
+            # Все изменения статусов комнат применяются одним пакетом после сохранения брони
+            room_changes = {}
+            if 'room' in validated_data:
+                room_changes[reservation.room_id] = 'AVAILABLE'
+                reservation.room = validated_data['room']
+                room_changes[reservation.room_id] = 'OCCUPIED'
+            room_status = room_status_after(previous_status, reservation.status)
+            if room_status:
+                room_changes[reservation.room_id] = room_status
+
+            quote = None
+            if 'arrival_date' in validated_data or 'departure_date' in validated_data or 'room' in validated_data:
+                quote = self.calculate_total_price(
+                    reservation.room,
+                    reservation.arrival_date,
+                    reservation.departure_date
+                )
+                reservation.price_at_booking = quote.total
+
+            reservation.updated_by = request.user
+            reservation.last_updated_date = timezone.now()
+            reservation.save()
+            record_reservation_status(reservation, previous_status)
+            record_reservation_update(reservation, before)
+            transition_rooms(room_changes)
+
+        return Response(
+            {
+                "reservation_id": reservation.id,
+                "client_id": reservation.client.id,
+                "room_number": reservation.room.number,
+                "arrival_date": reservation.arrival_date,
+                "departure_date": reservation.departure_date,
+                "status": reservation.status,
+                "payment_status": reservation.payment_status,
+                "price_at_booking": reservation.price_at_booking,
+                "price_breakdown": [line.as_dict() for line in quote.breakdown] if quote else None,
+            },
+            status=200
+        )
 
     def calculate_total_price(self, room, arrival_date, departure_date):
-        total_price = 0
-        current_date = arrival_date
+        return quote_stay(room.type_id, arrival_date, departure_date)
 
-        price_history = RoomPriceHistory.objects.filter(
-            room_type=room.type
-        ).order_by('start_date')
 
-        while current_date < departure_date:
-            for price_period in price_history:
-                if price_period.start_date <= current_date and (
-                        price_period.end_date is None or price_period.end_date >= current_date):
-                    total_price += price_period.price
-                    break
+class BatchReservationView(generics.GenericAPIView):
+    throttle_cost = 10
+    serializer_class = BatchReservationSerializer
+
+    @swagger_auto_schema(
+        operation_description="Создать пакет бронирований (группы, турагентства) одним запросом. Каждая бронь "
+                              "описывается так же, как в POST /reservation. Клиенты создаются или обновляются по "
+                              "номеру паспорта, все брони сохраняются в одной транзакции. Ошибочные брони "
+                              "пропускаются, если не указан all_or_nothing.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'reservations': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                    description=f"Брони пакета (не больше {BatchReservationSerializer.MAX_ITEMS}) с полями "
+                                "passport_number, first_name, last_name, middle_name, city_from, room_number, "
+                                "arrival_date, departure_date, status, payment_status.",
+                ),
+                'all_or_nothing': openapi.Schema(
+                    type=openapi.TYPE_BOOLEAN,
+                    description="Не сохранять ни одной брони, если в пакете есть ошибки. По умолчанию false.",
+                ),
+            },
+            required=['reservations'],
+        ),
+        responses={
+            201: openapi.Response(
+                description="Создана хотя бы одна бронь. results содержит результат для каждой брони в порядке запроса.",
+                examples={
+                    "application/json": {
+                        "created": 1,
+                        "failed": 1,
+                        "results": [
+                            {
+                                "index": 0,
+                                "reservation_id": 1,
+                                "client_id": 10,
+                                "room_number": 101,
+                                "arrival_date": "2024-12-10",
+                                "departure_date": "2024-12-15",
+                                "status": "BOOKED",
+                                "price_at_booking": 5000,
+                                "price_breakdown": [
+                                    {"start_date": "2024-12-10", "end_date": "2024-12-15", "nights": 5,
+                                     "price": 1000, "subtotal": 5000}
+                                ]
+                            },
+                            {
+                                "index": 1,
+                                "errors": {"room_number": ["Комната 101 на эти даты уже занята бронью 0 пакета."]}
+                            }
+                        ]
+                    }
+                },
+            ),
+            422: openapi.Response(
+                description="Некорректный запрос или ни одна бронь пакета не сохранена.",
+                examples={
+                    "application/json": {
+                        "created": 0,
+                        "failed": 1,
+                        "results": [
+                            {"index": 0, "errors": {"departure_date": ["Дата выезда должна быть позже даты заселения."]}}
+                        ]
+                    }
+                },
+            ),
+        },
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=422)
 
-            current_date += timedelta(days=1)
-        return total_price
+        created, results = book_batch(serializer.validated_data['reservations'], request.user,
+                                      all_or_nothing=serializer.validated_data['all_or_nothing'])
+        return Response(
+            {"created": created, "failed": len(results) - created, "results": results},
+            status=201 if created else 422
+        )
 
 
 class QuarterlyReportView(generics.GenericAPIView):
+    throttle_cost = 10
 
     @swagger_auto_schema(
         operation_description="Сформировать отчет о работе гостиницы за указанный квартал текущего или прошлого года.",
@@ -1299,61 +1706,10 @@ class QuarterlyReportView(generics.GenericAPIView):
 
         start_date, end_date = self.get_quarter_date_range(quarter, year)
 
-        # Число клиентов за период в каждом номере
-        clients_per_room = (
-            Reservation.objects.filter(
-                arrival_date__gte=start_date,
-                departure_date__lte=end_date,
-                status__in=['BOOKED', 'CONFIRMED', 'CHECKED_IN', 'CHECKED_OUT']
-            )
-            .values('room__number')
-            .annotate(client_count=Count('id'))
-            .order_by('room__number')
-        )
-
-        # Количество номеров на каждом этаже
-        rooms_per_floor = (
-            Room.objects.annotate(
-                floor=ExpressionWrapper(
-                    Substr(F('number'), 1, 1),
-                    output_field=IntegerField()
-                )
-            )
-            .values('floor')
-            .annotate(room_count=Count('id'))
-            .order_by('floor')
-        )
-
-        # Общая сумма дохода за каждый номер
-        income_per_room = (
-            Reservation.objects.filter(
-                arrival_date__gte=start_date,
-                departure_date__lte=end_date,
-                payment_status__in=['PREPAID', 'PAID'],
-            )
-            .values('room__number')
-            .annotate(total_income=Sum('price_at_booking'))
-            .order_by('room__number')
-        )
-
-        # Суммарный доход по всей гостинице
-        total_income = (
-                           Reservation.objects.filter(
-                               arrival_date__gte=start_date,
-                               departure_date__lte=end_date,
-                               payment_status__in=['PREPAID', 'PAID']
-                           )
-                           .aggregate(total_income=Sum('price_at_booking'))['total_income']
-                       ) or 0
-
-        report = {
-            "clients_per_room": list(clients_per_room),
-            "rooms_per_floor": list(rooms_per_floor),
-            "income_per_room": list(income_per_room),
-            "total_income": total_income,
-            "start_date": start_date,
-            "end_date": end_date
-        }
+        # Отчёт читается из предрасчитанной таблицы, которую обновляют сигналы бронирований
+        report = read_quarterly_report(quarter, year)
+        report["start_date"] = start_date
+        report["end_date"] = end_date
 
         return Response(report, status=200)
 
@@ -1366,3 +1722,371 @@ class QuarterlyReportView(generics.GenericAPIView):
         end_date = datetime(year, end_month, last_day)
 
         return start_date, end_date
+
+
+class OccupancyReportView(generics.GenericAPIView):
+    throttle_cost = 10
+
+    @swagger_auto_schema(
+        operation_description="Загрузка номеров и выручка за период по дням, неделям или месяцам: доля проданных "
+                              "ночей (occupancy), средняя цена проданной ночи (ADR) и выручка на доступную ночь "
+                              "(RevPAR). Отменённые брони не учитываются, стоимость брони делится между ночами "
+                              "поровну.",
+        manual_parameters=[
+            openapi.Parameter('start_date', openapi.IN_QUERY, description="Первый день периода (YYYY-MM-DD).",
+                              type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, required=True),
+            openapi.Parameter('end_date', openapi.IN_QUERY, description="Последний день периода (YYYY-MM-DD).",
+                              type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, required=True),
+            openapi.Parameter('bucket', openapi.IN_QUERY,
+                              description="Шаг сводки: day, week (недели с понедельника) или month. По умолчанию day.",
+                              type=openapi.TYPE_STRING, enum=['day', 'week', 'month'], required=False),
+            openapi.Parameter('room_type', openapi.IN_QUERY, description="ID типа номера: только номера этого типа.",
+                              type=openapi.TYPE_INTEGER, required=False),
+            openapi.Parameter('by_room_type', openapi.IN_QUERY,
+                              description="true - отдельные строки для каждого типа номера.",
+                              type=openapi.TYPE_BOOLEAN, required=False),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Показатели по периодам и за весь диапазон. Первый и последний периоды обрезаются "
+                            "границами диапазона; доступные ночи - число номеров на число дней периода.",
+                examples={
+                    "application/json": {
+                        "start_date": "2024-06-01",
+                        "end_date": "2024-06-30",
+                        "bucket": "month",
+                        "periods": [
+                            {
+                                "start_date": "2024-06-01",
+                                "end_date": "2024-06-30",
+                                "nights_available": 300,
+                                "nights_sold": 240,
+                                "revenue": 1200000,
+                                "occupancy": 0.8,
+                                "adr": 5000.0,
+                                "revpar": 4000.0
+                            }
+                        ],
+                        "total": {
+                            "nights_available": 300,
+                            "nights_sold": 240,
+                            "revenue": 1200000,
+                            "occupancy": 0.8,
+                            "adr": 5000.0,
+                            "revpar": 4000.0
+                        }
+                    }
+                },
+            ),
+            422: openapi.Response(
+                description="Ошибки валидации параметров.",
+                examples={
+                    "application/json": {
+                        "non_field_errors": ["Дата окончания не может быть раньше даты начала."]
+                    }
+                },
+            ),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = OccupancyReportSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=422)
+
+        params = serializer.validated_data
+        report = cached('occupancy-report', ANALYTICS_CACHE_MODELS, params,
+                        lambda: occupancy_report(**params))
+        return Response(report, status=200)
+
+
+bulk_entity_parameter = openapi.Parameter(
+    'entity',
+    openapi.IN_PATH,
+    description=f"Сущность: {', '.join(BULK_ENTITIES)}.",
+    type=openapi.TYPE_STRING,
+    enum=list(BULK_ENTITIES),
+    required=True,
+)
+
+
+def unknown_bulk_entity(entity):
+    return Response(
+        {"detail": f"Неизвестная сущность '{entity}'. Доступные сущности: {list(BULK_ENTITIES)}."},
+        status=404
+    )
+
+
+class BulkImportView(generics.GenericAPIView):
+    throttle_cost = 20
+
+    @swagger_auto_schema(
+        operation_description=(
+                "Массовая загрузка клиентов, номеров, истории цен или расписаний уборок. "
+                f"Тело запроса - CSV с заголовком ({CSV_CONTENT_TYPE}) или NDJSON ({NDJSON_CONTENT_TYPE}). "
+                "Строки проверяются и сохраняются пачками; ошибочные строки пропускаются и перечисляются в ответе. "
+                "Клиенты сопоставляются по номеру паспорта, номера - по номеру комнаты, остальные сущности - по id."
+        ),
+        manual_parameters=[bulk_entity_parameter],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description="Содержимое CSV или NDJSON.",
+        ),
+        responses={
+            200: openapi.Response(
+                description="Отчёт о загрузке.",
+                examples={
+                    "application/json": {
+                        "created": 2,
+                        "updated": 1,
+                        "error_count": 1,
+                        "errors": [
+                            {"line": 3, "errors": {"passport_number": ["Это поле не может быть пустым."]}}
+                        ],
+                        "errors_truncated": False
+                    }
+                },
+            ),
+            404: openapi.Response(
+                description="Неизвестная сущность.",
+                examples={
+                    "application/json": {
+                        "detail": "Неизвестная сущность 'guests'. Доступные сущности: ['clients', 'rooms', "
+                                  "'price-history', 'cleaning-schedules']."
+                    }
+                },
+            ),
+            415: openapi.Response(
+                description="Неподдерживаемый формат тела запроса.",
+                examples={
+                    "application/json": {
+                        "detail": "Поддерживаются только text/csv и application/x-ndjson."
+                    }
+                },
+            ),
+        },
+    )
+    def post(self, request, entity, *args, **kwargs):
+        bulk_entity = BULK_ENTITIES.get(entity)
+        if bulk_entity is None:
+            return unknown_bulk_entity(entity)
+
+        parser = PARSERS.get(request.content_type.split(';')[0].strip())
+        if parser is None:
+            return Response(
+                {"detail": f"Поддерживаются только {CSV_CONTENT_TYPE} и {NDJSON_CONTENT_TYPE}."},
+                status=415
+            )
+
+        report = import_rows(bulk_entity, parser(request.stream or []))
+        return Response(report.as_dict(), status=200)
+
+
+class BulkExportView(generics.GenericAPIView):
+    throttle_cost = 20
+
+    @swagger_auto_schema(
+        operation_description="Потоковая выгрузка всех записей сущности в CSV или NDJSON в формате, принимаемом загрузкой.",
+        manual_parameters=[
+            bulk_entity_parameter,
+            openapi.Parameter(
+                'file_format',
+                openapi.IN_QUERY,
+                description="Формат выгрузки: csv (по умолчанию) или ndjson.",
+                type=openapi.TYPE_STRING,
+                enum=['csv', 'ndjson'],
+                required=False,
+            ),
+        ],
+        responses={
+            200: openapi.Response(description="Файл выгрузки."),
+            404: openapi.Response(description="Неизвестная сущность."),
+            422: openapi.Response(
+                description="Неизвестный формат выгрузки.",
+                examples={
+                    "application/json": {
+                        "detail": "Недопустимый формат 'xml'. Доступные форматы: ['csv', 'ndjson']."
+                    }
+                },
+            ),
+        },
+    )
+    def get(self, request, entity, *args, **kwargs):
+        bulk_entity = BULK_ENTITIES.get(entity)
+        if bulk_entity is None:
+            return unknown_bulk_entity(entity)
+
+        export_format = request.query_params.get('file_format', 'csv').lower()
+        content_types = {'csv': CSV_CONTENT_TYPE, 'ndjson': NDJSON_CONTENT_TYPE}
+        if export_format not in content_types:
+            return Response(
+                {"detail": f"Недопустимый формат '{export_format}'. Доступные форматы: {list(content_types)}."},
+                status=422
+            )
+
+        response = StreamingHttpResponse(
+            iter_export(bulk_entity, export_format),
+            content_type=f'{content_types[export_format]}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{entity}.{export_format}"'
+        return response
+
+
+class CacheStatsView(generics.GenericAPIView):
+
+    @swagger_auto_schema(
+        operation_description=(
+                "Счётчики попаданий и промахов кэша по каждому закэшированному ответу. "
+                "Счётчики ведутся в памяти процесса и обнуляются при его перезапуске."
+        ),
+        responses={
+            200: openapi.Response(
+                description="Статистика кэша.",
+                examples={
+                    "application/json": {
+                        "clients-list": {"hits": 40, "misses": 2, "hit_ratio": 0.9524},
+                        "employee-position": {"hits": 118, "misses": 12, "hit_ratio": 0.9077},
+                        "rooms-by-status": {"hits": 15, "misses": 5, "hit_ratio": 0.75}
+                    }
+                },
+            ),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats())
+
+
+class MetricsView(generics.GenericAPIView):
+
+    @swagger_auto_schema(
+        operation_description=(
+                "Метрики запросов по маршрутам с момента запуска процесса: число запросов, гистограмма задержек "
+                "(накопительные корзины в мс), число и время SQL-запросов, время сериализации и число запросов "
+                "сверх бюджета SQL. Те же значения для отдельного запроса передаются в заголовке Server-Timing."
+        ),
+        responses={
+            200: openapi.Response(
+                description="Метрики по маршрутам.",
+                examples={
+                    "application/json": {
+                        "query_budget": 30,
+                        "latency_buckets_ms": [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000],
+                        "routes": {
+                            "GET hotel/rooms": {
+                                "count": 12,
+                                "latency_ms": {
+                                    "avg": 14.2,
+                                    "max": 71.5,
+                                    "buckets": {"5": 7, "10": 9, "25": 11, "50": 11, "100": 12, "250": 12,
+                                                "500": 12, "1000": 12, "2500": 12, "5000": 12, "+Inf": 12}
+                                },
+                                "sql": {"avg_count": 1.5, "max_count": 3, "avg_ms": 2.1},
+                                "serializer_avg_ms": 6.4,
+                                "over_budget": 0
+                            }
+                        },
+                        "cache": {
+                            "rooms-by-status": {"hits": 7, "misses": 5, "hit_ratio": 0.5833}
+                        }
+                    }
+                },
+            ),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        return Response({
+            "query_budget": query_budget(),
+            "latency_buckets_ms": LATENCY_BUCKETS_MS,
+            "routes": HISTOGRAM.snapshot(),
+            "cache": cache_stats(),
+        })
+
+
+class OutboxEventsView(generics.GenericAPIView):
+    serializer_class = OutboxEventSerializer
+    max_limit = 1000
+
+    @swagger_auto_schema(
+        operation_description=(
+                "События изменений комнат и бронирований по возрастанию id. Потребитель запоминает "
+                "last_id из ответа и передаёт его в after при следующем запросе: last_id не уходит дальше "
+                "событий ещё не закоммиченных транзакций, поэтому они не пропускаются. Под ASGI ждать новых "
+                "событий можно через /hotel/async/events (long-poll) и /hotel/async/events/stream (SSE)."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'after',
+                openapi.IN_QUERY,
+                description="Вернуть события с id больше указанного (по умолчанию 0).",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+            openapi.Parameter(
+                'topic',
+                openapi.IN_QUERY,
+                description="Тема событий: room.status, reservation.status или reservation.updated.",
+                type=openapi.TYPE_STRING,
+                enum=[choice[0] for choice in OutboxEvent.TOPIC_CHOICES],
+                required=False,
+            ),
+            openapi.Parameter(
+                'limit',
+                openapi.IN_QUERY,
+                description="Максимальное число событий (не больше 1000, по умолчанию 100).",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="События после указанного id.",
+                examples={
+                    "application/json": {
+                        "last_id": 42,
+                        "events": [
+                            {
+                                "id": 41,
+                                "topic": "reservation.status",
+                                "object_id": 7,
+                                "payload": {"from": "CHECKED_IN", "to": "CHECKED_OUT", "room_id": 3},
+                                "created_at": "2024-06-05T12:00:00Z"
+                            },
+                            {
+                                "id": 42,
+                                "topic": "room.status",
+                                "object_id": 3,
+                                "payload": {"from": "OCCUPIED", "to": "REQUIRES_CLEANING"},
+                                "created_at": "2024-06-05T12:00:00Z"
+                            }
+                        ]
+                    }
+                },
+            ),
+            422: openapi.Response(
+                description="Некорректные параметры.",
+                examples={
+                    "application/json": {
+                        "detail": "Параметры after и limit должны быть целыми неотрицательными числами."
+                    }
+                },
+            ),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = min(int(request.query_params.get('limit', 100)), self.max_limit)
+        except ValueError:
+            after = limit = -1
+        if after < 0 or limit < 0:
+            return Response(
+                {"detail": "Параметры after и limit должны быть целыми неотрицательными числами."},
+                status=422
+            )
+
+        topic = request.query_params.get('topic')
+        events, last_id = read_feed(after, [topic] if topic else None, limit)
+
+        return Response({
+            "last_id": last_id,
+            "events": self.get_serializer(events, many=True).data,
+        })
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,6 +53,18 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'hotel_app.pagination.HotelCursorPagination',
+    'PAGE_SIZE': 100,
+    # Скользящее окно, см. hotel_app.throttling; пустое значение переменной выключает ограничение
+    'DEFAULT_THROTTLE_CLASSES': [
+        'hotel_app.throttling.ClientRateThrottle',
+        'hotel_app.throttling.EndpointRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'client': os.environ.get('HOTEL_THROTTLE_CLIENT_RATE', '1200/min') or None,
+        'anon': os.environ.get('HOTEL_THROTTLE_ANON_RATE', '120/min') or None,
+        'endpoint': os.environ.get('HOTEL_THROTTLE_ENDPOINT_RATE', '300/min') or None,
+    },
 }
 
 DJOSER = {
@@ -60,6 +75,7 @@ DJOSER = {
 }
 
 MIDDLEWARE = [
+    'hotel_app.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -93,12 +109,73 @@ WSGI_APPLICATION = 'hotel_drf_app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# Профиль базы выбирается переменной HOTEL_DB_ENGINE: sqlite (по умолчанию, один узел) или postgresql
+HOTEL_DB_ENGINE = os.environ.get('HOTEL_DB_ENGINE', 'sqlite')
+
+if HOTEL_DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('HOTEL_DB_NAME', 'hotel'),
+            'USER': os.environ.get('HOTEL_DB_USER', 'hotel'),
+            'PASSWORD': os.environ.get('HOTEL_DB_PASSWORD', ''),
+            'HOST': os.environ.get('HOTEL_DB_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('HOTEL_DB_PORT', '5432'),
+            # Постоянные соединения переиспользуются между запросами и проверяются перед повторным использованием
+            'CONN_MAX_AGE': int(os.environ.get('HOTEL_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('HOTEL_DB_POOL_MAX_SIZE'):
+        # Пул соединений Django (нужен psycopg 3 с psycopg_pool) несовместим с постоянными соединениями
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('HOTEL_DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ['HOTEL_DB_POOL_MAX_SIZE']),
+            'timeout': int(os.environ.get('HOTEL_DB_POOL_TIMEOUT', 10)),
+        }
+elif HOTEL_DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('HOTEL_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            # Тестовая база в файле, а не в памяти: параллельные соединения в тестах ждут блокировку, а не падают
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('HOTEL_SQLITE_TUNING', '1') == '1':
+        DATABASES['default']['OPTIONS'] = {
+            # WAL: читатели не блокируют писателя; synchronous=NORMAL достаточно для WAL
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            # Сколько секунд писатель ждёт блокировку, прежде чем получить "database is locked"
+            'timeout': int(os.environ.get('HOTEL_SQLITE_BUSY_TIMEOUT', 20)),
+            # Транзакция сразу берёт блокировку на запись: SQLite не поддерживает select_for_update,
+            # а повышение блокировки посреди транзакции приводит к ошибкам вместо ожидания
+            'transaction_mode': 'IMMEDIATE',
+        }
+else:
+    raise ImproperlyConfigured(f"Неизвестный HOTEL_DB_ENGINE '{HOTEL_DB_ENGINE}': ожидается sqlite или postgresql.")
+
+# Запросы, выполнившие больше SQL-запросов, помечаются заголовком X-Query-Budget-Exceeded и в /hotel/metrics
+HOTEL_QUERY_BUDGET = int(os.environ.get('HOTEL_QUERY_BUDGET', 30))
+
+# Кэш ответов hotel_app. По умолчанию LocMemCache в памяти процесса (вытеснение LRU при MAX_ENTRIES);
+# для нескольких процессов задайте общий бэкенд, например
+# HOTEL_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache HOTEL_CACHE_LOCATION=redis://127.0.0.1:6379
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('HOTEL_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('HOTEL_CACHE_LOCATION', 'hotel-app'),
+        'TIMEOUT': int(os.environ.get('HOTEL_CACHE_TIMEOUT', 300)),
     }
 }
+if not CACHES['default']['BACKEND'].endswith(('RedisCache', 'PyMemcacheCache', 'PyLibMCCache')):
+    # Ограничение числа записей действует только для бэкендов Django с собственным вытеснением
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('HOTEL_CACHE_MAX_ENTRIES', 5000))}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators